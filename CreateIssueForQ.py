@@ -1,5 +1,6 @@
 import json, os, urllib.request, urllib.error
 from datetime import datetime
+from instrumentation import instrumented, timed
 
 OWNER = os.getenv("GITHUB_OWNER")
 REPO  = os.getenv("GITHUB_REPO")
@@ -19,7 +20,8 @@ def gh_post(url, payload, timeout=15):
         }
     )
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
+        with timed("github.post") as metric, urllib.request.urlopen(req, timeout=timeout) as resp:
+            metric.bytes = len(data)
             return resp.getcode(), json.loads(resp.read().decode("utf-8"))
     except urllib.error.HTTPError as e:
         body = e.read().decode("utf-8")
@@ -33,9 +35,10 @@ def gh_get(url, timeout=10):
             "User-Agent": UA
         }
     )
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
+    with timed("github.get"), urllib.request.urlopen(req, timeout=timeout) as resp:
         return resp.getcode(), json.loads(resp.read().decode("utf-8"))
 
+@instrumented('create_issue')
 def lambda_handler(event, context):
     # sanity check token
     code, me = gh_get("https://api.github.com/user")
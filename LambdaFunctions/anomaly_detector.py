@@ -0,0 +1,193 @@
+import json
+import math
+import re
+from datetime import datetime
+from time_series import RESOLUTIONS, DEFAULT_RESOLUTION, bucket_label, parse_bucket_label
+
+BASELINE_PREFIX = 'baselines'
+BASELINE_VERSION = 1
+
+# Weight of the newest bucket in the moving mean and variance
+EWMA_ALPHA = 0.1
+# Buckets folded in before deviations are trusted over the static thresholds
+MIN_BASELINE_BUCKETS = 30
+# Empty buckets filled between observations; the baseline has decayed by then anyway
+MAX_GAP_BUCKETS = 120
+# Deviation (in baseline standard deviations) at which each severity starts
+SEVERITY_Z_SCORES = (('critical', 8.0), ('high', 5.0), ('medium', 3.0))
+# Static error-count cutoffs used until a service has a warm baseline
+STATIC_THRESHOLDS = (('critical', 10), ('high', 5), ('medium', 1))
+
+class EwmaBaseline:
+    """
+    Exponentially weighted mean and variance of per-bucket error counts.
+
+    update() is O(1) and keeps nothing but the running moments, so the baseline
+    can be persisted between runs as a handful of numbers. Spikes are folded in
+    clipped to the medium threshold so one incident does not inflate the
+    baseline that the next incident is judged against.
+    """
+
+    def __init__(self, alpha=EWMA_ALPHA, mean=0.0, variance=0.0, buckets=0, last_bucket=None):
+        self.alpha = alpha
+        self.mean = mean
+        self.variance = variance
+        self.buckets = buckets
+        self.last_bucket = last_bucket
+
+    @property
+    def std(self):
+        # Poisson noise floor: a quiet service should not page on one stray error
+        return max(math.sqrt(self.variance), math.sqrt(self.mean), 1.0)
+
+    @property
+    def warm(self):
+        return self.buckets >= MIN_BASELINE_BUCKETS
+
+    def z_score(self, count):
+        return (count - self.mean) / self.std
+
+    def update(self, count):
+        """Score a bucket against the baseline, then fold it in"""
+        z = self.z_score(count)
+        medium_z = SEVERITY_Z_SCORES[-1][1]
+        if z > medium_z:
+            count = self.mean + medium_z * self.std
+
+        delta = count - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        self.variance = (1 - self.alpha) * (self.variance + delta * increment)
+        self.buckets += 1
+        return z
+
+    def to_dict(self):
+        return {
+            'alpha': self.alpha,
+            'mean': self.mean,
+            'variance': self.variance,
+            'buckets': self.buckets,
+            'last_bucket': self.last_bucket
+        }
+
+class SpikeDetector:
+    """Online spike detection over one service's error series at a fixed resolution"""
+
+    def __init__(self, service, resolution=DEFAULT_RESOLUTION, baseline=None):
+        self.service = service
+        self.resolution = resolution
+        self.width = RESOLUTIONS[resolution]
+        self.baseline = baseline or EwmaBaseline()
+
+    def observe(self, counts):
+        """
+        Fold bucket start (epoch seconds) -> count into the baseline in time order
+        and return the anomaly report for the buckets not seen before.
+
+        The newest bucket is usually still filling when a run ends, so it is
+        scored but not folded in; a later run that has its full count folds it.
+        """
+        baseline = self.baseline
+        peak = None
+        anomalous = 0
+        warm = baseline.warm
+        starts = sorted(counts)
+
+        for start in starts:
+            if baseline.last_bucket is not None:
+                if start <= baseline.last_bucket:
+                    continue
+                empty = (start - baseline.last_bucket) // self.width - 1
+                for _ in range(min(empty, MAX_GAP_BUCKETS)):
+                    baseline.update(0)
+                if empty > 0:
+                    baseline.last_bucket = start - self.width
+
+            count = counts[start]
+            if start == starts[-1]:
+                z = baseline.z_score(count)
+            else:
+                z = baseline.update(count)
+                baseline.last_bucket = start
+            if warm:
+                if z >= SEVERITY_Z_SCORES[-1][1]:
+                    anomalous += 1
+                if peak is None or z > peak[0]:
+                    peak = (z, start, count)
+            warm = baseline.warm
+
+        report = {
+            'service': self.service,
+            'resolution': self.resolution,
+            'method': 'ewma' if peak else 'static',
+            'severity': severity_for_z_score(peak[0]) if peak else None,
+            'anomalous_buckets': anomalous,
+            'baseline_mean': round(baseline.mean, 3),
+            'baseline_std': round(baseline.std, 3),
+            'baseline_buckets': baseline.buckets
+        }
+        if peak:
+            report.update({
+                'peak_z_score': round(peak[0], 2),
+                'peak_bucket': bucket_label(peak[1], self.width),
+                'peak_count': peak[2]
+            })
+        return report
+
+    def observe_series(self, series):
+        """observe() over a labelled series such as generate_error_series output"""
+        return self.observe({
+            int(parse_bucket_label(label).timestamp()): count for label, count in series
+        })
+
+def severity_for_z_score(z):
+    for severity, threshold in SEVERITY_Z_SCORES:
+        if z >= threshold:
+            return severity
+    return 'low'
+
+def static_severity(total_errors):
+    for severity, threshold in STATIC_THRESHOLDS:
+        if total_errors >= threshold:
+            return severity
+    return 'low'
+
+def determine_severity(analyzer_output, anomaly=None):
+    """
+    Incident severity from the error series' deviation from its service baseline,
+    or from static error-count thresholds while no warm baseline exists.
+    """
+    if anomaly and anomaly.get('severity'):
+        return anomaly['severity']
+    return static_severity(analyzer_output.get('basic_stats', {}).get('total_errors', 0))
+
+def baseline_key(service):
+    return f"{BASELINE_PREFIX}/{re.sub(r'[^A-Za-z0-9._-]+', '_', service).strip('_')}.json"
+
+def load_detector(s3_client, bucket, service, resolution=DEFAULT_RESOLUTION):
+    """Detector resuming from the service's stored baseline, or a cold one"""
+    key = baseline_key(service)
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return SpikeDetector(service, resolution)
+
+    data = json.loads(response['Body'].read())
+    if data.get('version') != BASELINE_VERSION or data.get('resolution') != resolution:
+        print(f"Ignoring baseline {key} with version {data.get('version')} at {data.get('resolution')}")
+        return SpikeDetector(service, resolution)
+    return SpikeDetector(service, resolution, EwmaBaseline(**data['baseline']))
+
+def save_detector(s3_client, bucket, detector):
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=baseline_key(detector.service),
+        Body=json.dumps({
+            'version': BASELINE_VERSION,
+            'service': detector.service,
+            'resolution': detector.resolution,
+            'updated_at': datetime.utcnow().isoformat(),
+            'baseline': detector.baseline.to_dict()
+        }),
+        ContentType='application/json'
+    )
@@ -0,0 +1,109 @@
+import codecs
+import json
+import mmap
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+
+class ArchiveReader:
+    """
+    Streams the events of an exported log archive without loading the document.
+
+    The file is memory-mapped and decoded a chunk at a time, and
+    JSONDecoder.raw_decode pulls one event object at a time off the front of the
+    buffer, so memory holds a chunk plus the event being parsed whatever the size
+    of the archive. Top-level keys other than the events array (logGroupName,
+    deploy, ...) are parsed whole into metadata as they are passed.
+    """
+
+    def __init__(self, path, array_key='logEvents', chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.array_key = array_key
+        self.chunk_size = chunk_size
+        self.metadata = {}
+        self.bytes_read = 0
+        self._decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self._mapped = mapped
+                self._text = codecs.getincrementaldecoder('utf-8')()
+                self._buffer, self._pos, self.bytes_read = '', 0, 0
+                yield from self._walk()
+
+    def _walk(self):
+        self._expect('{')
+        if self._peek() == '}':
+            return
+
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == self.array_key:
+                yield from self._array()
+            else:
+                self.metadata[key] = self._value()
+
+            if self._peek() != ',':
+                self._expect('}')
+                return
+            self._pos += 1
+
+    def _array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+
+        while True:
+            yield self._value()
+            if self._peek() != ',':
+                self._expect(']')
+                return
+            self._pos += 1
+
+    def _value(self):
+        """Decode the next JSON value, pulling in more chunks while it is cut off"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number that ends the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _peek(self):
+        """Next non-whitespace character, or None at the end of the file"""
+        while True:
+            buffer, pos = self._buffer, self._pos
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return None
+
+    def _expect(self, char):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r} near byte {self.bytes_read} of {self.path}")
+        self._pos += 1
+
+    def _fill(self):
+        """Drop the consumed prefix and decode the next chunk of the file"""
+        if self.bytes_read >= len(self._mapped):
+            return False
+        chunk = self._mapped[self.bytes_read:self.bytes_read + self.chunk_size]
+        self.bytes_read += len(chunk)
+        final = self.bytes_read >= len(self._mapped)
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk, final)
+        self._pos = 0
+        return True
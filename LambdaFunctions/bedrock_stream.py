@@ -0,0 +1,101 @@
+import json
+import time
+from datetime import datetime
+from s3_writer import put_objects
+from instrumentation import record, timed
+
+# Partial text is written at most this often while a response streams
+FLUSH_INTERVAL_SECONDS = 1.0
+# Exception events Bedrock can send in place of a chunk
+STREAM_ERRORS = ('internalServerException', 'modelStreamErrorException', 'throttlingException',
+                 'validationException', 'modelTimeoutException', 'serviceUnavailableException')
+
+def partial_key(incident_id):
+    return f"incidents/{incident_id}-partial.json"
+
+class PartialSummaryWriter:
+    """
+    Progressive copy of a summary that is still being generated.
+
+    Text is appended as it streams in and written to incidents/<id>-partial.json
+    at most once per flush interval, so the dashboard
+    can show the summary growing without an S3 write per token. close() always
+    writes the final text with the stream's outcome.
+    """
+
+    def __init__(self, s3_client, bucket, incident_id, interval=FLUSH_INTERVAL_SECONDS, clock=time.monotonic):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.incident_id = incident_id
+        self.interval = interval
+        self.clock = clock
+        self.parts = []
+        self.flushes = 0
+        self.started_at = datetime.now().isoformat()
+        self.last_flush = clock()
+
+    @property
+    def text(self):
+        return ''.join(self.parts)
+
+    def add(self, text):
+        self.parts.append(text)
+        if self.clock() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self, status='streaming'):
+        self.last_flush = self.clock()
+        body = json.dumps({
+            'incident_id': self.incident_id,
+            'update_type': 'partial',
+            'status': status,
+            'executive_summary': self.text,
+            'started_at': self.started_at,
+            'updated_at': datetime.now().isoformat()
+        })
+        try:
+            put_objects(self.s3, self.bucket, [
+                {'Key': partial_key(self.incident_id), 'Body': body, 'ContentType': 'application/json'}
+            ])
+            self.flushes += 1
+        except Exception as e:
+            # The partial copy is a convenience; the stream carries on without it
+            print(f"Error writing partial summary for {self.incident_id}: {str(e)}")
+
+    def close(self, status='complete'):
+        self.flush(status)
+
+def iter_text_deltas(response):
+    """Text of each content delta in an invoke_model_with_response_stream response"""
+    for event in response['body']:
+        for error in STREAM_ERRORS:
+            if error in event:
+                raise RuntimeError(f"Bedrock stream {error}: {event[error].get('message', '')}")
+        chunk = event.get('chunk')
+        if not chunk:
+            continue
+        data = json.loads(chunk['bytes'])
+        if data.get('type') == 'content_block_delta' and data.get('delta', {}).get('type') == 'text_delta':
+            yield data['delta']['text']
+
+def stream_completion(bedrock_client, model_id, body, writer):
+    """
+    Stream one completion into writer and return its full text. On any error
+    the partial copy is closed as failed and the error is raised for the
+    caller's fallback.
+    """
+    try:
+        with timed('bedrock.invoke_model_stream') as metric:
+            started = time.perf_counter()
+            response = bedrock_client.invoke_model_with_response_stream(modelId=model_id, body=body)
+            for text in iter_text_deltas(response):
+                if not writer.parts:
+                    record('bedrock.first_token', (time.perf_counter() - started) * 1000)
+                writer.add(text)
+            metric.bytes = len(writer.text.encode('utf-8'))
+            metric.items = writer.flushes
+    except Exception:
+        writer.close('failed')
+        raise
+    writer.close('complete')
+    return writer.text
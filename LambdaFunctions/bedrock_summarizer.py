@@ -1,11 +1,19 @@
 import json
 import boto3
 from datetime import datetime
+from claim_check import array_length, fetch_slice
+from s3_writer import s3_client, put_objects
+from incident_index import link_incident
+from llm_cache import ResponseCache, fingerprinted
+from instrumentation import instrumented, timed
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
+MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+RESPONSE_CACHE = ResponseCache(s3, BUCKET_NAME)
 
+@instrumented('bedrock_summarizer')
 def lambda_handler(event, context):
     try:
         analyzer_output = event.get('error_analyzer_output', {})
@@ -14,7 +22,7 @@ def lambda_handler(event, context):
         recommendations = analyzer_output.get('analysis_results', {}).get('recommendations', [])
         
         # Create human summary using Bedrock
-        human_summary = generate_bedrock_summary(error_summary, critical_errors, recommendations)
+        human_summary = generate_bedrock_summary(error_summary, fetch_slice(s3, critical_errors, 0, 3), recommendations)
         
         # Store in S3
         report_key = f"human-reports/{datetime.utcnow().strftime('%Y/%m/%d')}/report-{context.aws_request_id}.json"
@@ -27,12 +35,10 @@ def lambda_handler(event, context):
             'generated_at': datetime.utcnow().isoformat()
         }
         
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=report_key,
-            Body=json.dumps(report, indent=2),
-            ContentType='application/json'
-        )
+        put_objects(s3, BUCKET_NAME, [
+            {'Key': report_key, 'Body': json.dumps(report, indent=2), 'ContentType': 'application/json'}
+        ])
+        link_incident(s3, BUCKET_NAME, analyzer_output.get('s3_analysis_location'), 'report', report_key)
         
         return {
             'error_summarizer_output': {
@@ -43,7 +49,7 @@ def lambda_handler(event, context):
                     'title': f"Critical System Errors - {error_summary.get('total_errors', 0)} Issues",
                     'body': human_summary,
                     'labels': ['bug', 'critical', 'devangel'],
-                    'priority': 'high' if len(critical_errors) > 0 else 'medium'
+                    'priority': 'high' if array_length(critical_errors) > 0 else 'medium'
                 }
             }
         }
@@ -56,9 +62,9 @@ def lambda_handler(event, context):
             }
         }
 
-def generate_bedrock_summary(error_summary, critical_errors, recommendations):
-    try:
-        prompt = f"""
+def build_summary_prompt(error_summary, critical_errors, recommendations):
+    """Bedrock prompt for the executive summary"""
+    return f"""
 Create a concise executive summary for this system error analysis:
 
 ERRORS: {error_summary.get('total_errors', 0)} total, {error_summary.get('critical_count', 0)} critical
@@ -74,17 +80,30 @@ RECOMMENDATIONS:
 Write a 3-paragraph executive summary: 1) What happened, 2) Impact and urgency, 3) Next steps. Keep under 300 words.
 """
 
+def invoke_summary_model(prompt):
+    with timed('bedrock.invoke_model') as metric:
         response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-sonnet-20240229-v1:0',
+            modelId=MODEL_ID,
             body=json.dumps({
                 'anthropic_version': 'bedrock-2023-05-31',
                 'max_tokens': 500,
                 'messages': [{'role': 'user', 'content': prompt}]
             })
         )
+        body = response['body'].read()
+        metric.bytes = len(body)
+    
+    result = json.loads(body)
+    return result['content'][0]['text']
+
+def generate_bedrock_summary(error_summary, critical_errors, recommendations):
+    try:
+        prompt = build_summary_prompt(error_summary, critical_errors, recommendations)
+        key_prompt = build_summary_prompt(
+            error_summary, [dict(e, message=fingerprinted(e.get('message'))) for e in critical_errors], recommendations
+        )
         
-        result = json.loads(response['body'].read())
-        return result['content'][0]['text']
+        return RESPONSE_CACHE.complete(MODEL_ID, key_prompt, lambda: invoke_summary_model(prompt))
         
     except Exception as e:
         return f"""
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+from datetime import datetime
+
+CHECKPOINT_PREFIX = 'checkpoints'
+CHECKPOINT_VERSION = 1
+
+class Checkpoint:
+    """
+    Progress and mergeable aggregates carried between SourceAdapter invocations.
+
+    last_timestamp is the newest event already folded into state. boundary_keys
+    identify the events seen at exactly that millisecond, so a window that starts
+    on the boundary again does not count them twice. Events older than the
+    boundary are treated as already processed; events without a timestamp cannot
+    be placed and are always processed.
+    """
+
+    def __init__(self, key, last_timestamp=0, boundary_keys=None, state=None, runs=0):
+        self.key = key
+        self.last_timestamp = last_timestamp
+        self.boundary_keys = set(boundary_keys or [])
+        self.state = state
+        self.runs = runs
+        self.skipped_events = 0
+
+    def new_events(self, log_events):
+        """Yield only events newer than the checkpoint, advancing the boundary as they pass"""
+        last_timestamp = self.last_timestamp
+        boundary_keys = self.boundary_keys
+        newest, newest_keys = last_timestamp, set(boundary_keys)
+
+        for log_event in log_events:
+            timestamp = log_event.get('timestamp')
+            if timestamp:
+                if timestamp < last_timestamp:
+                    self.skipped_events += 1
+                    continue
+                key = event_key(log_event)
+                if timestamp == last_timestamp and key in boundary_keys:
+                    self.skipped_events += 1
+                    continue
+                if timestamp > newest:
+                    newest, newest_keys = timestamp, {key}
+                elif timestamp == newest:
+                    newest_keys.add(key)
+            yield log_event
+
+        self.last_timestamp, self.boundary_keys = newest, newest_keys
+
+    def to_dict(self):
+        return {
+            'version': CHECKPOINT_VERSION,
+            'last_timestamp': self.last_timestamp,
+            'boundary_keys': sorted(self.boundary_keys),
+            'runs': self.runs,
+            'updated_at': datetime.utcnow().isoformat(),
+            'state': self.state
+        }
+
+def event_key(log_event):
+    """Stable identity for an event within one millisecond"""
+    identity = f"{log_event.get('requestId')}|{log_event.get('message')}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+def checkpoint_key(log_group):
+    return f"{CHECKPOINT_PREFIX}/{re.sub(r'[^A-Za-z0-9._-]+', '_', log_group).strip('_')}.json"
+
+def load_checkpoint(s3_client, bucket, key):
+    """Checkpoint stored at key, or an empty one on the first run"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return Checkpoint(key)
+
+    data = json.loads(response['Body'].read())
+    if data.get('version') != CHECKPOINT_VERSION:
+        print(f"Ignoring checkpoint {key} with version {data.get('version')}")
+        return Checkpoint(key)
+    return Checkpoint(
+        key,
+        last_timestamp=data.get('last_timestamp', 0),
+        boundary_keys=data.get('boundary_keys'),
+        state=data.get('state'),
+        runs=data.get('runs', 0)
+    )
+
+def save_checkpoint(s3_client, bucket, checkpoint):
+    checkpoint.runs += 1
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=checkpoint.key,
+        Body=json.dumps(checkpoint.to_dict(), default=str),
+        ContentType='application/json'
+    )
@@ -0,0 +1,124 @@
+import json
+from datetime import datetime
+
+CLAIM_CHECK_PREFIX = 'claim-checks'
+# Arrays up to this many items stay inline in the Step Functions payload
+INLINE_LIMIT = 100
+# One byte offset is kept per this many items, so a slice is one ranged GET
+INDEX_STRIDE = 256
+READ_CHUNK_SIZE = 1 << 20
+
+def claim_check_key(request_id, name):
+    return f"{CLAIM_CHECK_PREFIX}/{datetime.utcnow().strftime('%Y/%m/%d')}/{request_id}/{name}.ndjson"
+
+def inline_limit_for(event):
+    """Inline limit for a run: claimCheck true always stores arrays, false never does"""
+    mode = event.get('claimCheck')
+    if mode is None:
+        return INLINE_LIMIT
+    return 0 if mode else None
+
+def check_in(s3_client, bucket, key, items, inline_limit=INLINE_LIMIT):
+    """
+    Return items unchanged when they are small enough to travel inline (always
+    when inline_limit is None), otherwise store them once as NDJSON at key and
+    return a compact reference.
+
+    The reference carries the item count, the object size and a sparse index of
+    the byte offset of every INDEX_STRIDE-th line, so consumers can fetch any
+    slice with a single ranged GET instead of downloading the whole array.
+    """
+    value, obj = prepare_check_in(bucket, key, items, inline_limit)
+    if obj:
+        s3_client.put_object(Bucket=bucket, **obj)
+    return value
+
+def prepare_check_in(bucket, key, items, inline_limit=INLINE_LIMIT):
+    """
+    check_in() without the write: the payload value and the put_object keywords
+    to store it with (None when the items stay inline), for batching with other writes.
+    items may be an EventBatch, whose rows are serialized from its columns
+    """
+    if not hasattr(items, 'json_lines'):
+        items = list(items)
+    if inline_limit is None or len(items) <= inline_limit:
+        return (items.to_dicts() if hasattr(items, 'to_dicts') else items), None
+
+    lines = []
+    offsets = []
+    size = 0
+    for index, line in enumerate(_json_lines(items)):
+        if index % INDEX_STRIDE == 0:
+            offsets.append(size)
+        lines.append(line)
+        size += len(line)
+
+    reference = {
+        'claim_check': 'ndjson',
+        'bucket': bucket,
+        'key': key,
+        'count': len(items),
+        'bytes': size,
+        'stride': INDEX_STRIDE,
+        'offsets': offsets
+    }
+    return reference, {'Key': key, 'Body': b''.join(lines), 'ContentType': 'application/x-ndjson'}
+
+def _json_lines(items):
+    if hasattr(items, 'json_lines'):
+        return items.json_lines()
+    return (json.dumps(item, default=str).encode('utf-8') + b'\n' for item in items)
+
+def is_claim_check(value):
+    return isinstance(value, dict) and value.get('claim_check') == 'ndjson'
+
+def array_length(value):
+    """Item count of an inline array or a claim-check reference"""
+    if is_claim_check(value):
+        return value['count']
+    return len(value or [])
+
+def fetch_slice(s3_client, value, start=0, stop=None):
+    """items[start:stop] of an inline array or a claim-check reference"""
+    if not is_claim_check(value):
+        return list(value or [])[start:stop]
+
+    count = value['count']
+    start, stop, _ = slice(start, stop).indices(count)
+    if start >= stop:
+        return []
+
+    stride, offsets = value['stride'], value['offsets']
+    first_block = start // stride
+    end_block = -(-stop // stride)
+    first_byte = offsets[first_block]
+    end_byte = offsets[end_block] if end_block < len(offsets) else value['bytes']
+
+    response = s3_client.get_object(
+        Bucket=value['bucket'],
+        Key=value['key'],
+        Range=f"bytes={first_byte}-{end_byte - 1}"
+    )
+    lines = response['Body'].read().splitlines()
+    skip = start - first_block * stride
+    return [json.loads(line) for line in lines[skip:skip + stop - start]]
+
+def iter_items(s3_client, value):
+    """Stream every item of an inline array or a claim-check reference"""
+    if not is_claim_check(value):
+        yield from value or []
+        return
+
+    body = s3_client.get_object(Bucket=value['bucket'], Key=value['key'])['Body']
+    pending = b''
+    while True:
+        chunk = body.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            if line:
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
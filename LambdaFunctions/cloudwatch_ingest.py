@@ -0,0 +1,118 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from input_adapters import infer_level, infer_request_id, infer_error_type, source_for_log_group, ERROR_LEVELS
+
+# Pushed down to FilterLogEvents so INFO lines never leave CloudWatch
+ERROR_FILTER_PATTERN = '?ERROR ?WARN'
+# FilterLogEvents accepts at most 100 stream names per call
+MAX_STREAMS_PER_CALL = 100
+DEFAULT_MAX_WORKERS = 4
+
+_DONE = object()
+
+def list_log_streams(logs_client, log_group, start_ms=None):
+    """Names of the streams in a log group that have events at or after start_ms"""
+    stream_names = []
+    kwargs = {'logGroupName': log_group, 'orderBy': 'LastEventTime', 'descending': True}
+
+    while True:
+        response = logs_client.describe_log_streams(**kwargs)
+        for stream in response.get('logStreams', []):
+            # Streams come newest first, so the rest are all older than the window
+            if start_ms and stream.get('lastEventTimestamp', 0) < start_ms:
+                return stream_names
+            stream_names.append(stream['logStreamName'])
+
+        next_token = response.get('nextToken')
+        if not next_token:
+            return stream_names
+        kwargs['nextToken'] = next_token
+
+def iter_log_group_events(logs_client, log_group, start_ms, end_ms, filter_pattern=ERROR_FILTER_PATTERN,
+                          stream_names=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Yield a log group's events for a time range in the logEvents schema.
+
+    Streams are split into batches that a bounded thread pool paginates through
+    FilterLogEvents concurrently. Pages are handed over through a bounded queue as
+    they arrive, so aggregation starts on the first page and slow consumers apply
+    backpressure instead of buffering the whole window. Events from different
+    batches arrive interleaved rather than in timestamp order.
+    """
+    if stream_names is None:
+        stream_names = list_log_streams(logs_client, log_group, start_ms)
+    if not stream_names:
+        return
+
+    batch_size = min(MAX_STREAMS_PER_CALL, -(-len(stream_names) // max_workers))
+    batches = [stream_names[i:i + batch_size] for i in range(0, len(stream_names), batch_size)]
+    source = source_for_log_group(log_group)
+
+    pages = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(batch):
+        try:
+            kwargs = {
+                'logGroupName': log_group,
+                'logStreamNames': batch,
+                'startTime': start_ms,
+                'endTime': end_ms
+            }
+            if filter_pattern:
+                kwargs['filterPattern'] = filter_pattern
+
+            while True:
+                response = logs_client.filter_log_events(**kwargs)
+                if response.get('events') and not put(response['events']):
+                    return
+                next_token = response.get('nextToken')
+                if not next_token:
+                    return
+                kwargs['nextToken'] = next_token
+        finally:
+            put(_DONE)
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(batches)))
+    futures = [pool.submit(fetch, batch) for batch in batches]
+    try:
+        remaining = len(futures)
+        while remaining:
+            page = pages.get()
+            if page is _DONE:
+                remaining -= 1
+                continue
+            for log_event in page:
+                yield to_log_event(log_event, source)
+
+        # Surface any FilterLogEvents failure once every batch has drained
+        for future in futures:
+            future.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=True)
+
+def to_log_event(log_event, source=None):
+    """Convert a FilterLogEvents event into the logEvents schema"""
+    message = log_event.get('message', '').rstrip('\n')
+    level = infer_level(message)
+
+    return {
+        'timestamp': log_event.get('timestamp'),
+        'message': message,
+        'logLevel': level,
+        'requestId': infer_request_id(message),
+        'source': source,
+        'errorType': infer_error_type(message) if level in ERROR_LEVELS else None,
+        'logStream': log_event.get('logStreamName')
+    }
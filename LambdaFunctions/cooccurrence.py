@@ -0,0 +1,192 @@
+import math
+from collections import Counter, deque
+from event_batch import EventBatch
+
+COOCCURRENCE_WINDOW_SECONDS = 60
+# Pairs need this much window support and this share of the rarer side's
+# events to link two failures into one cluster
+MIN_SUPPORT = 2
+MIN_CONFIDENCE = 0.5
+# ...and to fire together this many times more often than two independent
+# failures at their rates would, so busy incidents do not link everything
+MIN_LIFT = 2.0
+# One shared requestId is direct evidence that two failures are related
+MIN_REQUEST_JOINS = 1
+MAX_PAIRS = 20
+
+def analyze_cooccurrence(error_events, window_seconds=COOCCURRENCE_WINDOW_SECONDS):
+    """
+    Cross-source co-occurrence of (source, errorType) failures.
+
+    Events are swept once in time order. A sliding window holds the failures of
+    the last window_seconds; each event is credited as following every distinct
+    failure currently in the window, with the lag since that failure last fired.
+    The work per event is bounded by the number of distinct failures in the
+    window, not by the event count, so the sweep is linear in events. Events
+    sharing a requestId are also joined in first-seen order. Pairs with enough
+    support and lift over chance are merged into clusters, each headed by the
+    failure that most often comes first.
+    """
+    batch = EventBatch.from_dicts(error_events)
+    window_ms = window_seconds * 1000
+    nodes = {}
+    node_counts = Counter()
+    first_seen = {}
+    request_nodes = {}
+
+    sources, error_types, timestamps = batch.codes('source'), batch.codes('errorType'), batch.timestamps
+    order = sorted((i for i in range(len(batch)) if timestamps[i] > 0), key=timestamps.__getitem__)
+
+    # follows[node][leader] = [times node fired with leader in the window, total lag]
+    follows = {}
+    window = deque()
+    in_window = {}
+    last_time = {}
+    for i in order:
+        timestamp = timestamps[i]
+        node = nodes.setdefault((sources[i], error_types[i]), len(nodes))
+        node_counts[node] += 1
+        first_seen.setdefault(node, timestamp)
+
+        while window and timestamp - window[0][0] > window_ms:
+            _, expired = window.popleft()
+            remaining = in_window[expired] - 1
+            if remaining:
+                in_window[expired] = remaining
+            else:
+                del in_window[expired]
+
+        row = follows.get(node)
+        if row is None:
+            row = follows[node] = {}
+        for leader in in_window:
+            if leader != node:
+                lag = timestamp - last_time[leader]
+                stats = row.get(leader)
+                if stats is None:
+                    row[leader] = [1, lag]
+                else:
+                    stats[0] += 1
+                    stats[1] += lag
+
+        window.append((timestamp, node))
+        in_window[node] = in_window.get(node, 0) + 1
+        last_time[node] = timestamp
+
+        request_id = batch.request_ids[i]
+        if request_id:
+            seen = request_nodes.setdefault(request_id, [])
+            if node not in seen:
+                seen.append(node)
+
+    leads = Counter()
+    lag_totals = Counter()
+    for node, row in follows.items():
+        for leader, (count, lag) in row.items():
+            leads[(leader, node)] = count
+            lag_totals[(leader, node)] = lag
+
+    request_leads = Counter()
+    for seen in request_nodes.values():
+        for position, leader in enumerate(seen):
+            for follower in seen[position + 1:]:
+                request_leads[(leader, follower)] += 1
+
+    labels = {
+        node: f"{batch.decode('source', source)}:{batch.decode('errorType', error_type)}"
+        for (source, error_type), node in nodes.items()
+    }
+    # Share of the incident one window covers, for the chance co-occurrence rate
+    span_ms = timestamps[order[-1]] - timestamps[order[0]] if order else 0
+    pairs = _pair_stats(leads, lag_totals, request_leads, node_counts, window_ms / max(span_ms, window_ms))
+    clusters = _clusters(pairs, node_counts, first_seen, leads, request_leads)
+
+    return {
+        'window_seconds': window_seconds,
+        'pairs': [
+            dict(pair, leader=labels[pair['leader']], follower=labels[pair['follower']])
+            for pair in pairs[:MAX_PAIRS]
+        ],
+        'clusters': [
+            dict(cluster, root_cause=labels[cluster['root_cause']],
+                 members=[labels[node] for node in cluster['members']])
+            for cluster in clusters
+        ]
+    }
+
+def _pair_stats(leads, lag_totals, request_leads, node_counts, window_share):
+    """
+    One entry per unordered pair, oriented leader -> follower, strongest first.
+    lift compares the window co-occurrences with the count expected if the two
+    failures fired independently: each follower event then finds the leader in
+    its window with probability 1 - exp(-leader events * window_share).
+    """
+    def lift(leader, follower):
+        expected = node_counts[follower] * -math.expm1(-node_counts[leader] * window_share)
+        return leads[(leader, follower)] / expected
+
+    pairs = []
+    for a, b in {tuple(sorted(pair)) for pair in list(leads) + list(request_leads)}:
+        forward = leads[(a, b)] + request_leads[(a, b)]
+        backward = leads[(b, a)] + request_leads[(b, a)]
+        leader, follower = (a, b) if forward >= backward else (b, a)
+
+        leading = leads[(leader, follower)]
+        confidence = max(leads[(a, b)] / node_counts[b], leads[(b, a)] / node_counts[a])
+        pairs.append({
+            'leader': leader,
+            'follower': follower,
+            'window_count': leads[(a, b)] + leads[(b, a)],
+            'leader_first_count': leading,
+            'request_joins': request_leads[(a, b)] + request_leads[(b, a)],
+            'confidence': round(confidence, 3),
+            'lift': round(max(lift(a, b), lift(b, a)), 3),
+            'mean_lag_seconds': round(lag_totals[(leader, follower)] / leading / 1000, 3) if leading else None
+        })
+    pairs.sort(key=lambda p: (-(p['window_count'] + p['request_joins']), p['leader'], p['follower']))
+    return pairs
+
+def _clusters(pairs, node_counts, first_seen, leads, request_leads):
+    """Union-find over strongly linked pairs; singletons are not clusters"""
+    parent = {node: node for node in node_counts}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for pair in pairs:
+        linked = (pair['window_count'] >= MIN_SUPPORT and pair['confidence'] >= MIN_CONFIDENCE
+                  and pair['lift'] >= MIN_LIFT) \
+            or pair['request_joins'] >= MIN_REQUEST_JOINS
+        if linked:
+            root_a, root_b = find(pair['leader']), find(pair['follower'])
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    groups = {}
+    for node in node_counts:
+        groups.setdefault(find(node), []).append(node)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda node: (first_seen[node], node))
+
+        # The root cause leads its cluster-mates more often than it follows them
+        def net_lead(node):
+            return sum(
+                leads[(node, other)] + request_leads[(node, other)]
+                - leads[(other, node)] - request_leads[(other, node)]
+                for other in members if other != node
+            )
+        root_cause = max(members, key=lambda node: (net_lead(node), -first_seen[node]))
+        clusters.append({
+            'root_cause': root_cause,
+            'members': members,
+            'error_count': sum(node_counts[node] for node in members)
+        })
+    clusters.sort(key=lambda cluster: -cluster['error_count'])
+    return clusters
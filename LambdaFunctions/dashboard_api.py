@@ -1,10 +1,20 @@
 import json
-import boto3
 from datetime import datetime
+from anomaly_detector import determine_severity
+from time_series import select_series, chart_rollups
+from s3_writer import s3_client, put_objects
+from incident_index import load_index, link_incident
+from instrumentation import instrumented
+from bedrock_stream import partial_key
 
-s3 = boto3.client('s3')
+# Query parameters answered from the incident index instead of latest-incident.json
+INDEX_QUERY_PARAMS = {'signature': 'signature', 'source': 'source', 'errorType': 'error_type',
+                      'since': 'since', 'until': 'until'}
+
+s3 = s3_client()
 BUCKET_NAME = 'devangel-incident-data-1761448500'
 
+@instrumented('dashboard_api')
 def lambda_handler(event, context):
     """
     API for dashboard to get incident data
@@ -29,7 +39,12 @@ def lambda_handler(event, context):
     try:
         # Get latest incident data from S3
         if event.get('httpMethod') == 'GET':
-            return get_latest_incident(headers)
+            params = event.get('queryStringParameters') or {}
+            if any(name in params for name in INDEX_QUERY_PARAMS):
+                return query_incident_index(headers, params)
+            if params.get('partial'):
+                return get_partial_summary(headers, params['partial'])
+            return get_latest_incident(headers, params.get('resolution'))
         
         # Store new incident data (called by Step Functions)
         elif event.get('httpMethod') == 'POST':
@@ -42,7 +57,7 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_latest_incident(headers):
+def get_latest_incident(headers, resolution=None):
     """Get latest incident for dashboard"""
     
     try:
@@ -50,6 +65,14 @@ def get_latest_incident(headers):
         response = s3.get_object(Bucket=BUCKET_NAME, Key='latest-incident.json')
         incident_data = json.loads(response['Body'].read())
         
+        # Until the enhanced update lands, show the summary generated so far
+        if incident_data.get('update_type') == 'initial':
+            incident_data = overlay_partial_summary(incident_data)
+        
+        # Serve the requested chart resolution from the stored rollups
+        if resolution:
+            incident_data = select_chart_resolution(incident_data, resolution)
+        
         return {
             'statusCode': 200,
             'headers': headers,
@@ -69,6 +92,78 @@ def get_latest_incident(headers):
             })
         }
 
+def get_partial_summary(headers, incident_id):
+    """Streamed summary of one incident"""
+    partial = read_partial_summary(incident_id)
+    if partial is None:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({
+                'status': 'no_partial',
+                'message': f'No partial summary for {incident_id}'
+            })
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'status': 'success',
+            'data': partial
+        })
+    }
+
+def read_partial_summary(incident_id):
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=partial_key(incident_id))
+        return json.loads(response['Body'].read())
+    except s3.exceptions.NoSuchKey:
+        return None
+
+def overlay_partial_summary(incident_data):
+    """
+    Put the summary streamed so far into an initial update. The summarizer
+    writes it under the incident ID the fast updater stored the update with.
+    """
+    partial = read_partial_summary(incident_data['incident_id'])
+    if not partial or partial.get('status') == 'failed' or not partial.get('executive_summary'):
+        return incident_data
+    
+    analysis = incident_data.setdefault('analysis', {})
+    analysis['executive_summary'] = partial['executive_summary']
+    analysis['status'] = 'AI analysis streaming...' if partial.get('status') == 'streaming' else 'Finalizing AI analysis...'
+    analysis['partial'] = True
+    return incident_data
+
+def query_incident_index(headers, params):
+    """Past occurrences of a signature, source or errorType, from the incident index"""
+    filters = {field: params[name] for name, field in INDEX_QUERY_PARAMS.items() if name in params}
+    for field in ('since', 'until'):
+        if field in filters:
+            filters[field] = int(filters[field])
+    
+    index = load_index(s3, BUCKET_NAME)
+    occurrences = index.query(**filters)
+    body = {'status': 'success', 'occurrences': occurrences}
+    if 'signature' in filters:
+        body['last_seen'] = occurrences[-1] if occurrences else None
+    
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(body)
+    }
+
+def select_chart_resolution(incident_data, resolution):
+    """Swap the error timeline for a precomputed rollup when one exists"""
+    charts = incident_data.get('charts', {})
+    rollup = charts.get('error_timeline_rollups', {}).get(resolution)
+    if rollup is not None:
+        charts['error_timeline'] = rollup
+        charts['resolution'] = resolution
+    return incident_data
+
 def store_incident_data(event, headers):
     """Store incident data from Step Functions"""
     
@@ -85,20 +180,15 @@ def store_incident_data(event, headers):
     # Store in S3
     incident_id = dashboard_data['incident_id']
     
-    # Store specific incident
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=f'incidents/{incident_id}.json',
-        Body=json.dumps(dashboard_data),
-        ContentType='application/json'
-    )
-    
-    # Store as latest
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key='latest-incident.json',
-        Body=json.dumps(dashboard_data),
-        ContentType='application/json'
+    # Store the specific incident and the latest copy together
+    body = json.dumps(dashboard_data)
+    put_objects(s3, BUCKET_NAME, [
+        {'Key': f'incidents/{incident_id}.json', 'Body': body, 'ContentType': 'application/json'},
+        {'Key': 'latest-incident.json', 'Body': body, 'ContentType': 'application/json'}
+    ])
+    link_incident(
+        s3, BUCKET_NAME, step_functions_data.get('error_analyzer_output', {}).get('s3_analysis_location'),
+        'incident', f'incidents/{incident_id}.json'
     )
     
     return {
@@ -116,13 +206,15 @@ def format_for_dashboard(step_output):
     source_output = step_output.get('source_adapter_output', {})
     analyzer_output = step_output.get('error_analyzer_output', {})
     summarizer_output = step_output.get('error_summarizer_output', {})
+    # The stored incident carries the chart points themselves, not claim checks
+    timeline = select_series(source_output, s3_client=s3)
     
-    incident_id = f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    incident_id = step_output.get('incident_id') or f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
     
     return {
         'incident_id': incident_id,
         'timestamp': datetime.now().isoformat(),
-        'status': determine_severity(analyzer_output),
+        'status': determine_severity(analyzer_output, source_output.get('anomaly')),
         'summary': {
             'total_errors': analyzer_output.get('basic_stats', {}).get('total_errors', 0),
             'deploy_sha': analyzer_output.get('basic_stats', {}).get('deploy_sha'),
@@ -130,7 +222,7 @@ def format_for_dashboard(step_output):
             'affected_files': analyzer_output.get('basic_stats', {}).get('affected_files', 0)
         },
         'timeline': {
-            'error_series': source_output.get('series', []),
+            'error_series': timeline,
             'deploy_correlation': summarizer_output.get('timeline_analysis', {})
         },
         'analysis': {
@@ -138,21 +230,9 @@ def format_for_dashboard(step_output):
             'recommendations': summarizer_output.get('recommendations', [])
         },
         'charts': {
-            'error_timeline': source_output.get('series', []),
+            'error_timeline': timeline,
+            'error_timeline_rollups': chart_rollups(source_output, s3),
             'file_impact': source_output.get('file_hits', {}),
             'top_errors': analyzer_output.get('dashboard_ready', {}).get('top_errors', [])[:5]
         }
     }
-
-def determine_severity(analyzer_output):
-    """Determine incident severity"""
-    total_errors = analyzer_output.get('basic_stats', {}).get('total_errors', 0)
-    
-    if total_errors >= 10:
-        return 'critical'
-    elif total_errors >= 5:
-        return 'high'
-    elif total_errors >= 1:
-        return 'medium'
-    else:
-        return 'low'
@@ -1,10 +1,15 @@
 import json
 import boto3
 from datetime import datetime
+from claim_check import fetch_slice
+from s3_writer import s3_client
+from instrumentation import instrumented
 
+s3 = s3_client()
 sns = boto3.client('sns')
 SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:478047815638:DevAngelAlerts'
 
+@instrumented('email_with_bedrock')
 def lambda_handler(event, context):
     analyzer_output = event.get('error_analyzer_output', {})
     summarizer_output = event.get('error_summarizer_output', {})
@@ -32,11 +37,13 @@ TECHNICAL DETAILS:
 - Critical Errors: {critical_count}
 - Most Affected Service: {error_summary.get('most_common_source', 'Unknown')}
 - Primary Error Type: {error_summary.get('most_common_error_type', 'Unknown')}
+- Likely Root Cause: {error_summary.get('likely_root_cause') or 'No correlated failures'}
 
 CRITICAL ISSUES:
 """
-        critical_errors = analyzer_output.get('critical_errors', [])
-        for i, error in enumerate(critical_errors[:3], 1):
+        # Only the first few critical errors are read back from a claim check
+        critical_errors = fetch_slice(s3, analyzer_output.get('critical_errors', []), 0, 3)
+        for i, error in enumerate(critical_errors, 1):
             message += f"{i}. {error.get('source', 'Unknown')}: {error.get('message', 'No details')[:100]}...\n"
         
         message += f"\nReport Location: {summarizer_output.get('report_location', 'N/A')}"
@@ -52,7 +59,7 @@ CRITICAL ISSUES:
     except Exception as e:
         email_status = "failed"
     
-    # Pass through all data for next step
+    # Pass through all data for next step; bulky arrays are claim-check references
     result = event.copy()
     result['email_notification'] = {
         'incident_id': incident_id,
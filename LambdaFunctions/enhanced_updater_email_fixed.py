@@ -1,12 +1,16 @@
 import json
 import boto3
 from datetime import datetime
+from claim_check import fetch_slice
+from s3_writer import s3_client
+from instrumentation import instrumented
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 sns = boto3.client('sns')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
 SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:478047815638:DevAngelAlerts'
 
+@instrumented('enhanced_updater_email_fixed')
 def lambda_handler(event, context):
     source_output = event.get('source_adapter_output', {})
     analyzer_output = event.get('error_analyzer_output', {})
@@ -32,11 +36,12 @@ ERROR SUMMARY:
 - Critical Errors: {critical_count}
 - Most Common Source: {error_summary.get('most_common_source', 'Unknown')}
 - Most Common Error Type: {error_summary.get('most_common_error_type', 'Unknown')}
+- Likely Root Cause: {error_summary.get('likely_root_cause') or 'No correlated failures'}
 
 CRITICAL ERRORS:
 """
-        critical_errors = analyzer_output.get('critical_errors', [])
-        for i, error in enumerate(critical_errors[:3], 1):
+        critical_errors = fetch_slice(s3, analyzer_output.get('critical_errors', []), 0, 3)
+        for i, error in enumerate(critical_errors, 1):
             message += f"{i}. {error.get('source', 'Unknown')}: {error.get('errorType', 'Unknown')} - {error.get('message', 'No message')[:100]}...\n"
         
         if analyzer_output.get('needs_immediate_attention'):
@@ -1,14 +1,20 @@
 import json
 import boto3
 from datetime import datetime
+from anomaly_detector import determine_severity
+from time_series import select_series, chart_rollups
+from s3_writer import s3_client, put_objects
+from incident_index import link_incident
+from instrumentation import instrumented
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 sns = boto3.client('sns')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
 
 # Replace with your phone number (format: +1234567890)
 YOUR_PHONE_NUMBER = '+1234567890'
 
+@instrumented('enhanced_updater_sms')
 def lambda_handler(event, context):
     """
     Enhanced updater with SMS completion notification
@@ -17,13 +23,14 @@ def lambda_handler(event, context):
     source_output = event.get('source_adapter_output', {})
     analyzer_output = event.get('error_analyzer_output', {})
     summarizer_output = event.get('error_summarizer_output', {})
+    timeline = select_series(source_output, s3_client=s3)
     
-    incident_id = f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    incident_id = event.get('incident_id') or f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
     
     enhanced_data = {
         'incident_id': incident_id,
         'timestamp': datetime.now().isoformat(),
-        'status': determine_severity(analyzer_output),
+        'status': determine_severity(analyzer_output, source_output.get('anomaly')),
         'update_type': 'enhanced',
         'summary': {
             'total_errors': analyzer_output.get('basic_stats', {}).get('total_errors', 0),
@@ -32,11 +39,12 @@ def lambda_handler(event, context):
             'affected_files': analyzer_output.get('basic_stats', {}).get('affected_files', 0)
         },
         'timeline': {
-            'error_series': source_output.get('series', []),
+            'error_series': timeline,
             'deploy_correlation': summarizer_output.get('timeline_analysis', {})
         },
         'charts': {
-            'error_timeline': source_output.get('series', []),
+            'error_timeline': timeline,
+            'error_timeline_rollups': chart_rollups(source_output, s3),
             'file_impact': source_output.get('file_hits', {}),
             'top_errors': analyzer_output.get('dashboard_ready', {}).get('top_errors', [])[:5]
         },
@@ -47,25 +55,28 @@ def lambda_handler(event, context):
         }
     }
     
-    # Store enhanced data in S3
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=f'incidents/{incident_id}-enhanced.json',
-        Body=json.dumps(enhanced_data),
-        ContentType='application/json',
-        Metadata={'update-type': 'enhanced', 'incident-id': incident_id}
-    )
-    
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key='latest-incident.json',
-        Body=json.dumps(enhanced_data),
-        ContentType='application/json'
-    )
+    # Store enhanced data in S3; the incident and latest copies are written together
+    body = json.dumps(enhanced_data)
+    put_objects(s3, BUCKET_NAME, [
+        {
+            'Key': f'incidents/{incident_id}-enhanced.json',
+            'Body': body,
+            'ContentType': 'application/json',
+            'Metadata': {'update-type': 'enhanced', 'incident-id': incident_id}
+        },
+        {'Key': 'latest-incident.json', 'Body': body, 'ContentType': 'application/json'}
+    ])
     
     # Send SMS completion notification
     sms_result = send_completion_sms(incident_id, summarizer_output)
     
+    # Index the stored copy only after the notification is out, so the
+    # index write never delays it
+    link_incident(
+        s3, BUCKET_NAME, analyzer_output.get('s3_analysis_location'),
+        'incident_enhanced', f'incidents/{incident_id}-enhanced.json'
+    )
+    
     return {
         'incident_id': incident_id,
         'update_type': 'enhanced',
@@ -106,16 +117,3 @@ def send_completion_sms(incident_id, summarizer_output):
             'status': 'failed',
             'error': str(e)
         }
-
-def determine_severity(analyzer_output):
-    """Determine incident severity"""
-    total_errors = analyzer_output.get('basic_stats', {}).get('total_errors', 0)
-    
-    if total_errors >= 10:
-        return 'critical'
-    elif total_errors >= 5:
-        return 'high'
-    elif total_errors >= 1:
-        return 'medium'
-    else:
-        return 'low'
@@ -1,11 +1,24 @@
 import json
-import boto3
+from array import array
 from datetime import datetime
 from collections import Counter
+from event_batch import EventBatch, UNKNOWN
+from timing_analysis import analyze_timing
+from cooccurrence import analyze_cooccurrence
+from rule_engine import load_rules
+from claim_check import prepare_check_in, claim_check_key, inline_limit_for, is_claim_check, iter_items
+from s3_writer import s3_client, put_objects
+from incident_index import record_incident, object_key
+from instrumentation import instrumented, timed
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 BUCKET_NAME = 'devangel-incident-data-1761448500'
 
+# Severities, critical types and recommendations come from error_rules.json,
+# compiled once per container
+RULES = load_rules()
+
+@instrumented('error_analyzer')
 def lambda_handler(event, context):
     """
     Error analyzer that processes source adapter output and performs detailed error analysis
@@ -17,18 +30,29 @@ def lambda_handler(event, context):
         error_events = source_output.get('error_events', [])
         summary = source_output.get('summary', {})
         
+        # One fused pass over a columnar batch feeds every analysis below.
+        # A claim-checked array is streamed from S3 straight into the batch
+        with timed('load_error_events') as metric:
+            batch = EventBatch.from_dicts(iter_items(s3, error_events))
+            metric.items = len(batch)
+        
         # Perform error analysis
-        analysis_results = {
-            'error_patterns': analyze_error_patterns(error_events),
-            'severity_distribution': analyze_severity_distribution(error_events),
-            'source_breakdown': analyze_error_sources(error_events),
-            'time_analysis': analyze_error_timing(error_events),
-            'recommendations': generate_recommendations(error_events),
-            'analysis_timestamp': datetime.utcnow().isoformat(),
-            'total_errors_analyzed': len(error_events)
-        }
+        with timed('analyze') as metric:
+            analysis = ErrorAnalysis(batch)
+            analysis_results = {
+                'error_patterns': analysis.error_patterns(),
+                'severity_distribution': analysis.severity_distribution(),
+                'source_breakdown': analysis.source_breakdown(),
+                'time_analysis': analysis.time_analysis(),
+                'recommendations': analysis.recommendations(),
+                'cooccurrence': analyze_cooccurrence(batch),
+                'analysis_timestamp': datetime.utcnow().isoformat(),
+                'total_errors_analyzed': analysis.total
+            }
+            metric.items = analysis.total
         
-        # Create detailed error report
+        # Create detailed error report; claim-checked events stay in S3 and
+        # the report keeps the reference
         error_report = {
             'summary': summary,
             'analysis': analysis_results,
@@ -42,39 +66,60 @@ def lambda_handler(event, context):
         
         # Store analysis results in S3
         analysis_key = f"error-analysis/{datetime.utcnow().strftime('%Y/%m/%d')}/analysis-{context.aws_request_id}.json"
+        writes = [{'Key': analysis_key, 'Body': json.dumps(error_report, indent=2), 'ContentType': 'application/json'}]
         
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=analysis_key,
-            Body=json.dumps(error_report, indent=2),
-            ContentType='application/json'
+        # Critical errors travel inline when few, otherwise as their own claim check
+        if is_claim_check(error_events):
+            critical_errors = [batch[i].to_dict() for i in analysis.critical_indices]
+        else:
+            critical_errors = [error_events[i] for i in analysis.critical_indices]
+        critical_count = len(critical_errors)
+        critical_errors, critical_object = prepare_check_in(
+            BUCKET_NAME, claim_check_key(context.aws_request_id, 'critical_errors'),
+            critical_errors, inline_limit=inline_limit_for(event)
         )
         
-        # Store critical errors separately for fast access
-        critical_errors = [e for e in error_events if e.get('errorType') in ['TimeoutError', 'ConnectionError']]
-        if critical_errors:
+        critical_location = None
+        if critical_object:
+            writes.append(critical_object)
+            critical_location = f"s3://{BUCKET_NAME}/{critical_object['Key']}"
+        elif critical_errors:
+            # Store critical errors separately for fast access
             critical_key = f"critical-errors/{datetime.utcnow().strftime('%Y/%m/%d')}/critical-{context.aws_request_id}.json"
-            s3.put_object(
-                Bucket=BUCKET_NAME,
-                Key=critical_key,
-                Body=json.dumps(critical_errors, indent=2),
-                ContentType='application/json'
-            )
+            writes.append({'Key': critical_key, 'Body': json.dumps(critical_errors, indent=2), 'ContentType': 'application/json'})
+            critical_location = f"s3://{BUCKET_NAME}/{critical_key}"
+        
+        # The report and critical errors are independent, so they are written together
+        put_objects(s3, BUCKET_NAME, writes)
         
+        # Index this incident's signatures so later lookups read one object, not the bucket
+        index_keys = {
+            'analysis': analysis_key,
+            'critical': object_key(critical_location),
+            'raw': object_key(source_output.get('s3_location'))
+        }
+        record_incident(
+            s3, BUCKET_NAME, batch, context.aws_request_id,
+            {name: key for name, key in index_keys.items() if key}
+        )
+        
+        # Every key is always present: the state machines select them by path.
+        # The full analysis is in the report; the payload carries its bounded parts
         return {
             'error_analyzer_output': {
-                'analysis_results': analysis_results,
+                'analysis_results': payload_analysis(analysis_results),
                 'critical_errors': critical_errors,
-                'error_count': len(error_events),
-                'critical_issues_count': len(critical_errors),
+                'error_count': analysis.total,
+                'critical_issues_count': critical_count,
                 's3_analysis_location': f"s3://{BUCKET_NAME}/{analysis_key}",
-                's3_critical_location': f"s3://{BUCKET_NAME}/{critical_key}" if critical_errors else None,
-                'needs_immediate_attention': len(critical_errors) > 0,
+                's3_critical_location': critical_location,
+                'needs_immediate_attention': critical_count > 0,
                 'error_summary': {
-                    'total_errors': len(error_events),
-                    'critical_count': len(critical_errors),
-                    'most_common_source': get_most_common_source(error_events),
-                    'most_common_error_type': get_most_common_error_type(error_events)
+                    'total_errors': analysis.total,
+                    'critical_count': critical_count,
+                    'most_common_source': analysis.most_common_source(),
+                    'most_common_error_type': analysis.most_common_error_type(),
+                    'likely_root_cause': likely_root_cause(analysis_results['cooccurrence'])
                 }
             }
         }
@@ -86,159 +131,198 @@ def lambda_handler(event, context):
                 'analysis_results': {'error': str(e)},
                 'critical_errors': [],
                 'error_count': 0,
+                'critical_issues_count': 0,
+                's3_analysis_location': None,
+                's3_critical_location': None,
                 'needs_immediate_attention': True,
                 'error_summary': {'analyzer_error': str(e)}
             }
         }
 
-def analyze_error_patterns(error_events):
-    """Analyze common error patterns"""
-    patterns = Counter()
-    
-    for error in error_events:
-        message = error.get('message', '')
-        error_type = error.get('errorType', 'Unknown')
-        source = error.get('source', 'Unknown')
-        
-        # Create pattern signature
-        pattern = f"{source}:{error_type}"
-        patterns[pattern] += 1
-    
+def payload_analysis(analysis_results):
+    """
+    The parts of analysis_results whose size does not grow with the incident:
+    pattern details and co-occurrence pairs stay in the stored report
+    """
+    patterns = analysis_results['error_patterns']
     return {
-        'most_common_patterns': patterns.most_common(5),
-        'total_unique_patterns': len(patterns),
-        'pattern_details': dict(patterns)
+        'error_patterns': {
+            'most_common_patterns': patterns['most_common_patterns'],
+            'total_unique_patterns': patterns['total_unique_patterns']
+        },
+        'severity_distribution': analysis_results['severity_distribution'],
+        'time_analysis': analysis_results['time_analysis'],
+        'recommendations': analysis_results['recommendations'],
+        'analysis_timestamp': analysis_results['analysis_timestamp'],
+        'total_errors_analyzed': analysis_results['total_errors_analyzed']
     }
 
+def likely_root_cause(cooccurrence):
+    """Leading failure of the largest co-occurrence cluster, as source:errorType"""
+    clusters = cooccurrence.get('clusters')
+    return clusters[0]['root_cause'] if clusters else None
+
+class ErrorAnalysis:
+    """
+    Shared accumulators for every error_analyzer output, filled in one pass.
+
+    Everything the analyses count derives from the (source, errorType) pair
+    counts, kept in first-seen order so per-source, per-type and pattern counts
+    tie-break exactly as Counters over the events would. Timestamps are kept as
+    an int64 array for the vectorized timing analytics. Over an EventBatch the
+    pairs are counted straight off the interned code columns and the timestamp
+    column is used as is.
+
+    Severity, criticality and recommendations come from the compiled rule table.
+    Pairs whose errorType has a rule are resolved once per pair; only events
+    without a typed rule are matched one by one on message keywords and source.
+    Criticality is keyed on errorType alone: keyword and source matches set
+    severity and recommendations but never put an event in critical_errors.
+    """
+
+    def __init__(self, error_events, rules=None):
+        self.rules = rules or RULES
+        self.total = len(error_events)
+        self.pairs = Counter()
+        self.untyped_matches = {}
+        self.critical_indices = []
+        self.timestamps = array('q')
+
+        if isinstance(error_events, EventBatch):
+            self._scan_batch(error_events)
+        else:
+            self._scan_dicts(error_events)
+
+        self.error_types = Counter()
+        self.sources = Counter()
+        self.source_error_types = {}
+        self.severities = Counter()
+        self.rule_counts = Counter()
+        for pair, count in self.pairs.items():
+            source, error_type = pair
+            self.error_types[error_type] += count
+            self.sources[source] += count
+            self.source_error_types.setdefault(source, Counter())[error_type] += count
+
+            rule = self.rules.by_error_type.get(error_type)
+            if rule is not None or pair not in self.untyped_matches:
+                self._count_rule(rule, count)
+            else:
+                for rule in self.untyped_matches[pair]:
+                    self._count_rule(rule, 1)
+
+    def _count_rule(self, rule, count):
+        self.severities[self.rules.severity(rule)] += count
+        if rule is not None:
+            self.rule_counts[rule.id] += count
+
+    def _match_untyped(self, pair, message):
+        rule = self.rules.match_untyped(pair[0], message)
+        self.untyped_matches.setdefault(pair, []).append(rule)
+        return rule
+
+    def _scan_batch(self, batch):
+        sources, error_types = batch.codes('source'), batch.codes('errorType')
+        for (source, error_type), count in Counter(zip(sources, error_types)).items():
+            self.pairs[(batch.decode('source', source), batch.decode('errorType', error_type))] = count
+
+        type_values = batch.interners['errorType'].values
+        critical_codes = {code for code, value in enumerate(type_values) if value in self.rules.critical_error_types}
+        untyped_codes = {code for code, value in enumerate(type_values) if value not in self.rules.by_error_type}
+
+        if untyped_codes and (self.rules.keywords or self.rules.by_source):
+            for i, code in enumerate(error_types):
+                if code in critical_codes:
+                    self.critical_indices.append(i)
+                elif code in untyped_codes:
+                    self._match_untyped((batch.decode('source', sources[i]), type_values[code]), batch.messages[i])
+        elif critical_codes:
+            self.critical_indices = [i for i, code in enumerate(error_types) if code in critical_codes]
+
+        self.timestamps = batch.timestamps
+
+    def _scan_dicts(self, error_events):
+        pairs = self.pairs
+        rules = self.rules
+        match_untyped = bool(rules.keywords or rules.by_source)
+        for index, error in enumerate(error_events):
+            error_type = error.get('errorType') or UNKNOWN
+            pair = (error.get('source') or UNKNOWN, error_type)
+            pairs[pair] += 1
+
+            if error_type in rules.critical_error_types:
+                self.critical_indices.append(index)
+            elif match_untyped and error_type not in rules.by_error_type:
+                self._match_untyped(pair, error.get('message'))
+
+            timestamp = error.get('timestamp', 0)
+            if timestamp and timestamp > 0:
+                self.timestamps.append(int(timestamp))
+
+    def error_patterns(self):
+        patterns = Counter()
+        for (source, error_type), count in self.pairs.items():
+            patterns[f"{source}:{error_type}"] += count
+
+        return {
+            'most_common_patterns': patterns.most_common(5),
+            'total_unique_patterns': len(patterns),
+            'pattern_details': dict(patterns)
+        }
+
+    def severity_distribution(self):
+        return {
+            'severity_distribution': dict(self.severities),
+            'high_severity_count': self.severities.get('High', 0),
+            'requires_immediate_action': self.severities.get('High', 0) > 0
+        }
+
+    def source_breakdown(self):
+        return {
+            'source_distribution': dict(self.sources),
+            'most_problematic_source': self.sources.most_common(1)[0] if self.sources else None,
+            'source_error_types': {k: v.most_common() for k, v in self.source_error_types.items()}
+        }
+
+    def time_analysis(self):
+        if not self.total:
+            return {'no_errors': True}
+        timing = analyze_timing(self.timestamps, self.total, self.sources)
+        return timing if timing is not None else {'no_valid_timestamps': True}
+
+    def recommendations(self):
+        return self.rules.recommendations(self.rule_counts)
+
+    def most_common_source(self):
+        return self.sources.most_common(1)[0][0] if self.sources else None
+
+    def most_common_error_type(self):
+        return self.error_types.most_common(1)[0][0] if self.error_types else None
+
+def analyze_error_patterns(error_events):
+    """Analyze common error patterns"""
+    return ErrorAnalysis(error_events).error_patterns()
+
 def analyze_severity_distribution(error_events):
     """Analyze error severity distribution"""
-    severity_map = {
-        'TimeoutError': 'High',
-        'ConnectionError': 'High',
-        'ValidationException': 'Medium',
-        'AccessDenied': 'High',
-        'ThrottlingException': 'Medium',
-        'InstanceUnreachable': 'High',
-        'VisibilityTimeoutExceeded': 'Low'
-    }
-    
-    severity_counts = Counter()
-    
-    for error in error_events:
-        error_type = error.get('errorType', 'Unknown')
-        severity = severity_map.get(error_type, 'Medium')
-        severity_counts[severity] += 1
-    
-    return {
-        'severity_distribution': dict(severity_counts),
-        'high_severity_count': severity_counts.get('High', 0),
-        'requires_immediate_action': severity_counts.get('High', 0) > 0
-    }
+    return ErrorAnalysis(error_events).severity_distribution()
 
 def analyze_error_sources(error_events):
     """Analyze error sources"""
-    source_counts = Counter()
-    source_errors = {}
-    
-    for error in error_events:
-        source = error.get('source', 'Unknown')
-        source_counts[source] += 1
-        
-        if source not in source_errors:
-            source_errors[source] = []
-        source_errors[source].append(error.get('errorType', 'Unknown'))
-    
-    return {
-        'source_distribution': dict(source_counts),
-        'most_problematic_source': source_counts.most_common(1)[0] if source_counts else None,
-        'source_error_types': {k: Counter(v).most_common() for k, v in source_errors.items()}
-    }
+    return ErrorAnalysis(error_events).source_breakdown()
 
 def analyze_error_timing(error_events):
     """Analyze error timing patterns"""
-    if not error_events:
-        return {'no_errors': True}
-    
-    timestamps = [error.get('timestamp', 0) for error in error_events]
-    timestamps = [t for t in timestamps if t > 0]
-    
-    if not timestamps:
-        return {'no_valid_timestamps': True}
-    
-    time_diffs = []
-    for i in range(1, len(timestamps)):
-        diff = timestamps[i] - timestamps[i-1]
-        time_diffs.append(diff / 1000)  # Convert to seconds
-    
-    return {
-        'error_frequency': len(error_events),
-        'time_span_seconds': (max(timestamps) - min(timestamps)) / 1000 if len(timestamps) > 1 else 0,
-        'average_interval_seconds': sum(time_diffs) / len(time_diffs) if time_diffs else 0,
-        'burst_detected': any(diff < 5 for diff in time_diffs) if time_diffs else False
-    }
+    return ErrorAnalysis(error_events).time_analysis()
 
 def generate_recommendations(error_events):
     """Generate recommendations based on error analysis"""
-    recommendations = []
-    
-    # Analyze error types and generate specific recommendations
-    error_types = Counter(error.get('errorType', 'Unknown') for error in error_events)
-    sources = Counter(error.get('source', 'Unknown') for error in error_events)
-    
-    # Timeout recommendations
-    if error_types.get('TimeoutError', 0) > 0:
-        recommendations.append({
-            'priority': 'High',
-            'category': 'Performance',
-            'issue': 'Lambda timeout errors detected',
-            'recommendation': 'Increase Lambda timeout settings or optimize function performance',
-            'affected_count': error_types['TimeoutError']
-        })
-    
-    # Connection error recommendations
-    if error_types.get('ConnectionError', 0) > 0:
-        recommendations.append({
-            'priority': 'High',
-            'category': 'Infrastructure',
-            'issue': 'Database connection failures',
-            'recommendation': 'Check RDS instance health and connection pool settings',
-            'affected_count': error_types['ConnectionError']
-        })
-    
-    # Access denied recommendations
-    if error_types.get('AccessDenied', 0) > 0:
-        recommendations.append({
-            'priority': 'High',
-            'category': 'Security',
-            'issue': 'IAM permission errors',
-            'recommendation': 'Review and update IAM policies for affected resources',
-            'affected_count': error_types['AccessDenied']
-        })
-    
-    # Throttling recommendations
-    if error_types.get('ThrottlingException', 0) > 0:
-        recommendations.append({
-            'priority': 'Medium',
-            'category': 'Scaling',
-            'issue': 'API throttling detected',
-            'recommendation': 'Implement exponential backoff or increase API limits',
-            'affected_count': error_types['ThrottlingException']
-        })
-    
-    return recommendations
+    return ErrorAnalysis(error_events).recommendations()
 
 def get_most_common_source(error_events):
     """Get the most common error source"""
-    if not error_events:
-        return None
-    
-    sources = Counter(error.get('source', 'Unknown') for error in error_events)
-    return sources.most_common(1)[0][0] if sources else None
+    return ErrorAnalysis(error_events).most_common_source()
 
 def get_most_common_error_type(error_events):
     """Get the most common error type"""
-    if not error_events:
-        return None
-    
-    error_types = Counter(error.get('errorType', 'Unknown') for error in error_events)
-    return error_types.most_common(1)[0][0] if error_types else None
+    return ErrorAnalysis(error_events).most_common_error_type()
@@ -1,16 +1,63 @@
 import json
+import time
 import boto3
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from botocore.config import Config
+from time_series import select_series, parse_bucket_label, DEFAULT_RESOLUTION
+from instrumentation import instrumented, timed
+from llm_cache import ResponseCache, fingerprinted
+from s3_writer import s3_client
+from bedrock_stream import PartialSummaryWriter, stream_completion
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+BUCKET_NAME = 'devangel-incident-data-1761448500'
+MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+MAX_EXEMPLARS = 5
+# The detailed analysis and every exemplar summary are in flight at once
+MAX_WORKERS = MAX_EXEMPLARS + 1
+# Seconds to wait for a model response before using the local fallback. A call
+# that misses its deadline keeps its worker until its client's read timeout ends it
+EXEMPLAR_TIMEOUT = 20
+BATCH_TIMEOUT = 30
+DETAILED_TIMEOUT = 60
+# Output tokens allowed per exemplar summary
+EXEMPLAR_MAX_TOKENS = 200
+BEDROCK_CONFIG = Config(
+    max_pool_connections=MAX_WORKERS,
+    read_timeout=DETAILED_TIMEOUT,
+    retries={'max_attempts': 2, 'mode': 'standard'}
+)
+# Exemplar calls time out with their deadline and are not retried, so one that
+# misses it frees its worker instead of holding it into the next warm invocation.
+# A batched call that outlasts it falls back to single calls like a late one
+EXEMPLAR_CONFIG = Config(
+    max_pool_connections=MAX_WORKERS,
+    read_timeout=EXEMPLAR_TIMEOUT,
+    retries={'max_attempts': 1, 'mode': 'standard'}
+)
 
+s3 = s3_client()
+bedrock = boto3.client('bedrock-runtime', region_name='us-east-1', config=BEDROCK_CONFIG)
+exemplar_bedrock = boto3.client('bedrock-runtime', region_name='us-east-1', config=EXEMPLAR_CONFIG)
+# Recurring incidents reuse earlier summaries instead of calling the model again
+RESPONSE_CACHE = ResponseCache(s3, BUCKET_NAME)
+_executor = None
+
+def executor():
+    """Bedrock call pool created on first use and kept across warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='bedrock')
+    return _executor
+
+@instrumented('error_summarizer')
 def lambda_handler(event, context):
     # Get data from previous Lambdas
     source_output = event.get('source_adapter_output', {})
     analyzer_output = event.get('error_analyzer_output', {})
     
-    # Extract key data
-    series = source_output.get('series', [])
+    # Extract key data at whichever series resolution the caller asked for
+    series = select_series(source_output, event.get('series_resolution', DEFAULT_RESOLUTION), s3)
     exemplars = source_output.get('exemplars', [])
     file_hits = source_output.get('file_hits', {})
     deploy = source_output.get('deploy', {})
@@ -19,20 +66,34 @@ def lambda_handler(event, context):
     # Analyze timeline and deployment correlation
     timeline_analysis = analyze_error_timeline(series, deploy)
     
-    # Create detailed summary with full context
-    detailed_summary = generate_detailed_summary(
-        series, exemplars, file_hits, deploy, basic_stats, timeline_analysis
+    # When the state machine asks for it, the detailed summary streams into
+    # incidents/<incident_id>-partial.json so the dashboard can show it before
+    # the enhanced update is written
+    partial = None
+    if event.get('stream_summary', False) and event.get('incident_id'):
+        partial = PartialSummaryWriter(s3, BUCKET_NAME, event['incident_id'])
+    
+    # The detailed summary and the exemplar summaries are independent Bedrock
+    # calls, so they are issued together and collected in exemplar order.
+    # By default all exemplars share one prompt, so the deployment and timeline
+    # context is sent once instead of once per exemplar
+    started = time.monotonic()
+    detailed = executor().submit(
+        generate_detailed_summary, series, exemplars, file_hits, deploy, basic_stats, timeline_analysis, partial
     )
+    messages = [exemplar.get('message', '') for exemplar in exemplars[:MAX_EXEMPLARS]]
+    if event.get('batch_exemplars', True) and len(messages) > 1:
+        summaries = summarize_exemplars_batched(messages, deploy, timeline_analysis, file_hits)
+    else:
+        summaries = summarize_exemplars(messages, deploy, timeline_analysis, file_hits)
+    error_summaries = [summary for summary in summaries if summary]
     
-    # Create individual error summaries with context
-    error_summaries = []
-    for exemplar in exemplars[:5]:
-        error_message = exemplar.get('@message', '') or exemplar.get('message', '')
-        summary = generate_contextual_error_summary(
-            error_message, deploy, timeline_analysis, file_hits
-        )
-        if summary:
-            error_summaries.append(summary)
+    done, _ = wait([detailed], timeout=max(DETAILED_TIMEOUT - (time.monotonic() - started), 0))
+    if done:
+        detailed_summary = detailed.result()
+    else:
+        print(f"Detailed summary timed out after {DETAILED_TIMEOUT}s, using fallback")
+        detailed_summary = create_detailed_fallback_summary(deploy, timeline_analysis, basic_stats, file_hits)
     
     return {
         'detailed_analysis': detailed_summary,
@@ -41,6 +102,43 @@ def lambda_handler(event, context):
         'recommendations': generate_enhanced_recommendations(deploy, timeline_analysis, basic_stats)
     }
 
+def summarize_exemplars(messages, deploy, timeline, file_hits):
+    """One concurrent Bedrock call per exemplar, in exemplar order"""
+    pending = [
+        executor().submit(generate_contextual_error_summary, message, deploy, timeline, file_hits)
+        for message in messages
+    ]
+    wait(pending, timeout=EXEMPLAR_TIMEOUT)
+    
+    # An exemplar that missed its deadline gets the local fallback on its own
+    summaries = []
+    for message, future in zip(messages, pending):
+        if future.done():
+            summaries.append(future.result())
+        else:
+            future.cancel()
+            print(f"Exemplar summary timed out after {EXEMPLAR_TIMEOUT}s, using fallback")
+            summaries.append(create_contextual_fallback(message, deploy, timeline))
+    return summaries
+
+def summarize_exemplars_batched(messages, deploy, timeline, file_hits):
+    """All exemplars in one Bedrock call; entries that fail validation are summarized one by one"""
+    future = executor().submit(generate_batched_error_summaries, messages, deploy, timeline)
+    done, _ = wait([future], timeout=BATCH_TIMEOUT)
+    if done:
+        summaries = future.result()
+    else:
+        print(f"Batched exemplar summary timed out after {BATCH_TIMEOUT}s")
+        summaries = [None] * len(messages)
+    
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if missing:
+        print(f"Batched summary unusable for {len(missing)} of {len(messages)} exemplars, summarizing them one by one")
+        retried = summarize_exemplars([messages[i] for i in missing], deploy, timeline, file_hits)
+        for i, summary in zip(missing, retried):
+            summaries[i] = summary
+    return summaries
+
 def analyze_error_timeline(series, deploy):
     """Analyze error timeline relative to deployment"""
     
@@ -61,7 +159,7 @@ def analyze_error_timeline(series, deploy):
     # Calculate time difference
     if peak_time:
         try:
-            peak_dt = datetime.fromisoformat(peak_time.replace(' ', 'T') + ':00+00:00')
+            peak_dt = parse_bucket_label(peak_time)
             time_diff = (peak_dt - deploy_dt).total_seconds() / 60  # minutes
             
             return {
@@ -83,11 +181,9 @@ def analyze_error_timeline(series, deploy):
         'deploy_impact': True
     }
 
-def generate_detailed_summary(series, exemplars, file_hits, deploy, basic_stats, timeline):
-    """Generate comprehensive analysis with full context"""
-    
-    # Build detailed context for Bedrock
-    context_prompt = f"""
+def build_incident_prompt(series, exemplars, file_hits, deploy, basic_stats, timeline):
+    """Bedrock prompt for the full incident analysis"""
+    return f"""
 INCIDENT ANALYSIS REQUEST:
 
 TIMELINE ANALYSIS:
@@ -108,7 +204,7 @@ ERROR STATISTICS:
 - Affected Components: {basic_stats.get('affected_files', 0)} files
 
 SAMPLE ERROR MESSAGES:
-{chr(10).join([f"- {ex.get('@message', ex.get('message', ''))[:100]}..." for ex in exemplars[:3]])}
+{chr(10).join([f"- {ex.get('message', '')[:100]}..." for ex in exemplars[:3]])}
 
 Create a detailed incident analysis that includes:
 1. Executive summary with business impact
@@ -120,37 +216,93 @@ Create a detailed incident analysis that includes:
 Format as a professional incident report. Be specific about timestamps, deployment versions, and file correlations.
 """
 
+def generate_detailed_summary(series, exemplars, file_hits, deploy, basic_stats, timeline, partial=None):
+    """Generate comprehensive analysis with full context, streamed into partial when given"""
+    
+    # Not cached: the report quotes this incident's spike time, error counts
+    # and timeline length, so no earlier incident's report would fit it
+    context_prompt = build_incident_prompt(series, exemplars, file_hits, deploy, basic_stats, timeline)
+    
     try:
-        response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 800,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': context_prompt
-                    }
-                ]
-            })
-        )
-        
-        result = json.loads(response['body'].read())
-        return result['content'][0]['text'].strip()
+        if partial is None:
+            return invoke_claude(context_prompt, 800)
+        return stream_claude(context_prompt, 800, partial)
         
     except Exception as e:
         # Enhanced fallback with context
         return create_detailed_fallback_summary(deploy, timeline, basic_stats, file_hits)
 
-def generate_contextual_error_summary(error_message, deploy, timeline, file_hits):
-    """Generate error summary with deployment context"""
+def invoke_claude(prompt, max_tokens, client=None):
+    """Text of one Bedrock completion; any failure is raised for the caller's fallback"""
+    client = client or bedrock
+    with timed('bedrock.invoke_model') as metric:
+        response = client.invoke_model(modelId=MODEL_ID, body=request_body(prompt, max_tokens))
+        body = response['body'].read()
+        metric.bytes = len(body)
     
-    prompt = f"""
+    result = json.loads(body)
+    return result['content'][0]['text'].strip()
+
+def stream_claude(prompt, max_tokens, partial):
+    """invoke_claude over a response stream, writing the text to partial as it arrives"""
+    return stream_completion(bedrock, MODEL_ID, request_body(prompt, max_tokens), partial).strip()
+
+def request_body(prompt, max_tokens):
+    return json.dumps({
+        'anthropic_version': 'bedrock-2023-05-31',
+        'max_tokens': max_tokens,
+        'messages': [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+    })
+
+def build_error_prompt(error_message, deploy, timeline):
+    """Bedrock prompt for one exemplar error in its deployment context"""
+    return f"""
 CONTEXTUAL ERROR ANALYSIS:
 
 ERROR MESSAGE:
 {error_message[:400]}
+{deployment_context(deploy, timeline)}
+Analyze this specific error in context of the deployment. Explain:
+1. What specific component/file is failing
+2. How this relates to the deployment changes
+3. What user-facing functionality is impacted
+4. Confidence level that deployment caused this error
+
+Keep response to 2-3 sentences, be specific about the deployment correlation.
+"""
+
+def build_batched_error_prompt(error_messages, deploy, timeline):
+    """Bedrock prompt for several exemplar errors sharing one deployment context"""
+    numbered = '\n'.join(f"[{i}] {message[:400]}" for i, message in enumerate(error_messages, 1))
+    return f"""
+CONTEXTUAL ERROR ANALYSIS FOR {len(error_messages)} ERRORS:
 
+ERROR MESSAGES:
+{numbered}
+{deployment_context(deploy, timeline)}
+Analyze each error separately in context of the deployment. For each one explain:
+1. What specific component/file is failing
+2. How this relates to the deployment changes
+3. What user-facing functionality is impacted
+4. Confidence level that deployment caused this error
+
+Keep each summary to 2-3 sentences, be specific about the deployment correlation.
+Respond with only a JSON array holding one object per error, using the error's number as its index:
+[{{"index": 1, "summary": "..."}}, {{"index": 2, "summary": "..."}}]
+"""
+
+def deployment_context(deploy, timeline):
+    """
+    Deployment and timing lines shared by the exemplar prompts. The spike's
+    time and size are left out: they differ on every recurrence, and a cached
+    summary must not quote another incident's numbers.
+    """
+    return f"""
 DEPLOYMENT CONTEXT:
 - Deploy SHA: {deploy.get('sha', 'unknown')}
 - Deploy Time: {deploy.get('timestamp', 'unknown')}
@@ -159,38 +311,71 @@ DEPLOYMENT CONTEXT:
 
 TIMING CORRELATION:
 - Error spike occurred {timeline.get('minutes_after_deploy', 'unknown')} minutes after deployment
-- Peak errors: {timeline.get('peak_error_count', 0)} at {timeline.get('error_spike_timestamp', 'unknown')}
 - Correlation level: {timeline.get('correlation', 'unknown')}
-
-Analyze this specific error in context of the deployment. Explain:
-1. What specific component/file is failing
-2. How this relates to the deployment changes
-3. What user-facing functionality is impacted
-4. Confidence level that deployment caused this error
-
-Keep response to 2-3 sentences, be specific about the deployment correlation.
 """
 
+def generate_contextual_error_summary(error_message, deploy, timeline, file_hits):
+    """Generate error summary with deployment context"""
+    
+    prompt = build_error_prompt(error_message, deploy, timeline)
+    key_prompt = build_error_prompt(fingerprinted(error_message), deploy, timeline)
+    
+    try:
+        return RESPONSE_CACHE.complete(MODEL_ID, key_prompt, lambda: invoke_claude(prompt, EXEMPLAR_MAX_TOKENS, exemplar_bedrock))
+        
+    except Exception as e:
+        return create_contextual_fallback(error_message, deploy, timeline)
+
+def generate_batched_error_summaries(error_messages, deploy, timeline):
+    """Summaries for several exemplars from one call, None for each entry that is missing or invalid"""
+    
+    prompt = build_batched_error_prompt(error_messages, deploy, timeline)
+    key_prompt = build_batched_error_prompt(
+        [fingerprinted(message) for message in error_messages], deploy, timeline
+    )
+    count = len(error_messages)
+    
     try:
-        response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-haiku-20240307-v1:0',
-            body=json.dumps({
-                'anthropic_version': 'bedrock-2023-05-31',
-                'max_tokens': 200,
-                'messages': [
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ]
-            })
+        # Only a response with a valid entry for every exemplar is cached
+        text = RESPONSE_CACHE.complete(
+            MODEL_ID, key_prompt, lambda: invoke_claude(prompt, EXEMPLAR_MAX_TOKENS * count, exemplar_bedrock),
+            accept=lambda text: None not in parse_batched_summaries(text, count)
         )
-        
-        result = json.loads(response['body'].read())
-        return result['content'][0]['text'].strip()
+        return parse_batched_summaries(text, count)
         
     except Exception as e:
-        return create_contextual_fallback(error_message, deploy, timeline)
+        print(f"Batched exemplar summary failed: {str(e)}")
+        return [None] * len(error_messages)
+
+def parse_batched_summaries(text, count):
+    """
+    Map a model's JSON array of {"index", "summary"} objects back to exemplar
+    positions. Text around the array is ignored. An entry counts only if its
+    index is one of the 1-based exemplar numbers and its summary is non-empty
+    text; the first valid entry per index wins. Positions without one are None.
+    """
+    summaries = [None] * count
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        return summaries
+    try:
+        entries = json.loads(text[start:end + 1])
+    except ValueError:
+        return summaries
+    if not isinstance(entries, list):
+        return summaries
+    
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index, summary = entry.get('index'), entry.get('summary')
+        valid = (
+            isinstance(index, int) and not isinstance(index, bool) and 1 <= index <= count
+            and isinstance(summary, str) and summary.strip()
+        )
+        if valid and summaries[index - 1] is None:
+            summaries[index - 1] = summary.strip()
+    return summaries
 
 def generate_enhanced_recommendations(deploy, timeline, basic_stats):
     """Generate specific recommendations with deployment context"""
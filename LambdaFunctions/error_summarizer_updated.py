@@ -1,11 +1,19 @@
 import json
 import boto3
 from datetime import datetime
+from claim_check import array_length, fetch_slice
+from s3_writer import s3_client, put_objects
+from incident_index import link_incident
+from llm_cache import ResponseCache
+from instrumentation import instrumented, timed
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
+MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+RESPONSE_CACHE = ResponseCache(s3, BUCKET_NAME)
 
+@instrumented('error_summarizer_updated')
 def lambda_handler(event, context):
     try:
         analyzer_output = event.get('error_analyzer_output', {})
@@ -26,24 +34,22 @@ def lambda_handler(event, context):
         
         report_key = f"human-reports/{datetime.utcnow().strftime('%Y/%m/%d')}/report-{context.aws_request_id}.json"
         
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=report_key,
-            Body=json.dumps(final_report, indent=2),
-            ContentType='application/json'
-        )
+        put_objects(s3, BUCKET_NAME, [
+            {'Key': report_key, 'Body': json.dumps(final_report, indent=2), 'ContentType': 'application/json'}
+        ])
+        link_incident(s3, BUCKET_NAME, analyzer_output.get('s3_analysis_location'), 'report', report_key)
         
         return {
             'error_summarizer_output': {
                 'human_summary': human_summary,
                 'report_location': f"s3://{BUCKET_NAME}/{report_key}",
-                'critical_issues_count': len(critical_errors),
+                'critical_issues_count': array_length(critical_errors),
                 'requires_immediate_action': analyzer_output.get('needs_immediate_attention', False),
                 'github_issue_data': {
-                    'title': f"Critical System Errors Detected - {len(critical_errors)} Issues",
+                    'title': f"Critical System Errors Detected - {array_length(critical_errors)} Issues",
                     'body': human_summary,
                     'labels': ['bug', 'critical', 'devangel'],
-                    'priority': 'high' if len(critical_errors) > 0 else 'medium'
+                    'priority': 'high' if array_length(critical_errors) > 0 else 'medium'
                 }
             }
         }
@@ -61,33 +67,40 @@ def prepare_llm_input(analysis_results, critical_errors, error_summary):
     return {
         'error_statistics': {
             'total_errors': error_summary.get('total_errors', 0),
-            'critical_count': len(critical_errors),
+            'critical_count': array_length(critical_errors),
             'most_common_source': error_summary.get('most_common_source'),
             'most_common_error_type': error_summary.get('most_common_error_type')
         },
         'error_patterns': analysis_results.get('error_patterns', {}),
         'recommendations': analysis_results.get('recommendations', []),
-        'critical_errors_sample': critical_errors[:3] if critical_errors else []
+        'critical_errors_sample': fetch_slice(s3, critical_errors, 0, 3)
     }
 
 def generate_human_summary(llm_input):
     try:
         prompt = create_summary_prompt(llm_input)
         
+        # The prompt holds only statistics and rule recommendations, so it is its own cache key
+        return RESPONSE_CACHE.complete(MODEL_ID, prompt, lambda: invoke_summary_model(prompt))
+        
+    except Exception as e:
+        return generate_fallback_summary(llm_input)
+
+def invoke_summary_model(prompt):
+    with timed('bedrock.invoke_model') as metric:
         response = bedrock.invoke_model(
-            modelId='anthropic.claude-3-sonnet-20240229-v1:0',
+            modelId=MODEL_ID,
             body=json.dumps({
                 'anthropic_version': 'bedrock-2023-05-31',
                 'max_tokens': 800,
                 'messages': [{'role': 'user', 'content': prompt}]
             })
         )
-        
-        response_body = json.loads(response['body'].read())
-        return response_body['content'][0]['text']
-        
-    except Exception as e:
-        return generate_fallback_summary(llm_input)
+        body = response['body'].read()
+        metric.bytes = len(body)
+    
+    response_body = json.loads(body)
+    return response_body['content'][0]['text']
 
 def create_summary_prompt(llm_input):
     stats = llm_input['error_statistics']
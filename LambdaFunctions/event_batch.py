@@ -0,0 +1,154 @@
+import json
+from array import array
+from collections import Counter
+from datetime import datetime
+
+# Interned columns store small-int codes; code 0 is reserved for a missing value
+_CODED_COLUMNS = {'logLevel': 'levels', 'source': 'sources', 'errorType': 'error_types'}
+COLUMNS = ('timestamp', 'message', 'logLevel', 'requestId', 'source', 'errorType', 'processed_at')
+# Missing sources and error types are stored as this, as the dict analyzers read them
+UNKNOWN = 'Unknown'
+_LINE = '{{"timestamp":{},"message":{},"logLevel":{},"requestId":{},"source":{},"errorType":{},"processed_at":{}}}\n'
+
+class Interner:
+    """Maps repeated strings to small-int codes and back"""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class EventRow:
+    """Read-only per-event view over an EventBatch that behaves like the processed event dict"""
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    def get(self, key, default=None):
+        if key not in COLUMNS:
+            return default
+        return self.batch.value(key, self.index)
+
+    def __getitem__(self, key):
+        if key not in COLUMNS:
+            raise KeyError(key)
+        return self.batch.value(key, self.index)
+
+    def __contains__(self, key):
+        return key in COLUMNS
+
+    def keys(self):
+        return COLUMNS
+
+    def to_dict(self):
+        return {key: self.batch.value(key, self.index) for key in COLUMNS}
+
+class EventBatch:
+    """
+    Columnar batch of processed log events.
+
+    Timestamps live in an array('q') (0 when missing), level/source/errorType are
+    interned into array codes, and messages and request IDs sit in plain lists.
+    One processed_at string covers the whole batch. Analyzers can count straight
+    over the code columns, and EventRow views serve code that wants per-event
+    dict-style access. json_lines() serializes rows straight from the columns.
+    """
+
+    def __init__(self, processed_at=None):
+        self.processed_at = processed_at or datetime.utcnow().isoformat()
+        self.timestamps = array('q')
+        self.levels = array('H')
+        self.sources = array('I')
+        self.error_types = array('I')
+        self.messages = []
+        self.request_ids = []
+        self.interners = {column: Interner() for column in _CODED_COLUMNS}
+
+    @classmethod
+    def from_dicts(cls, events, processed_at=None):
+        if isinstance(events, EventBatch):
+            return events
+        batch = cls(processed_at)
+        for event in events:
+            batch.append(event)
+        return batch
+
+    def append(self, event):
+        """Add one event in the logEvents or processed-event shape and return its index"""
+        # A batch rebuilt from processed events keeps their processing time
+        if not self.messages and event.get('processed_at'):
+            self.processed_at = event['processed_at']
+        timestamp = event.get('timestamp')
+        try:
+            self.timestamps.append(int(timestamp) if timestamp else 0)
+        except (TypeError, ValueError):
+            self.timestamps.append(0)
+        self.levels.append(self.interners['logLevel'].code(event.get('logLevel', 'INFO')))
+        self.sources.append(self.interners['source'].code(event.get('source') or UNKNOWN))
+        self.error_types.append(self.interners['errorType'].code(event.get('errorType') or UNKNOWN))
+        self.messages.append(event.get('message'))
+        self.request_ids.append(event.get('requestId'))
+        return len(self.messages) - 1
+
+    def value(self, column, index):
+        if column == 'timestamp':
+            return self.timestamps[index] or None
+        if column == 'message':
+            return self.messages[index]
+        if column == 'requestId':
+            return self.request_ids[index]
+        if column == 'processed_at':
+            return self.processed_at
+        return self.interners[column].values[getattr(self, _CODED_COLUMNS[column])[index]]
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return EventRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield EventRow(self, index)
+
+    def codes(self, column):
+        """Raw code column for an interned field"""
+        return getattr(self, _CODED_COLUMNS[column])
+
+    def decode(self, column, code):
+        return self.interners[column].values[code]
+
+    def value_counts(self, column):
+        """Counter of values in an interned column, in first-seen order like a Counter over rows"""
+        values = self.interners[column].values
+        return Counter({values[code]: count for code, count in Counter(self.codes(column)).items()})
+
+    def to_dicts(self):
+        return [row.to_dict() for row in self]
+
+    def json_lines(self):
+        """Each row as one UTF-8 NDJSON line, without building per-row dicts"""
+        # Interned values and processed_at are encoded once for the whole batch
+        levels, sources, error_types = (
+            [json.dumps(value) for value in self.interners[column].values] for column in _CODED_COLUMNS
+        )
+        processed_at = json.dumps(self.processed_at)
+        dumps = json.dumps
+        for i in range(len(self.messages)):
+            yield _LINE.format(
+                self.timestamps[i] or 'null', dumps(self.messages[i]), levels[self.levels[i]],
+                dumps(self.request_ids[i], default=str), sources[self.sources[i]], error_types[self.error_types[i]],
+                processed_at
+            ).encode('utf-8')
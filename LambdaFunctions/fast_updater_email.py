@@ -1,14 +1,20 @@
 import json
 import boto3
 from datetime import datetime
+from anomaly_detector import determine_severity
+from time_series import select_series, chart_rollups
+from s3_writer import s3_client, put_objects
+from incident_index import link_incident
+from instrumentation import instrumented
 
-s3 = boto3.client('s3')
+s3 = s3_client()
 sns = boto3.client('sns')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
 
 # SNS Topic ARN
 SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:478047815638:DevAngelAlerts'
 
+@instrumented('fast_updater_email')
 def lambda_handler(event, context):
     """
     Fast updater with email notifications
@@ -16,10 +22,13 @@ def lambda_handler(event, context):
     
     source_output = event.get('source_adapter_output', {})
     analyzer_output = event.get('error_analyzer_output', {})
+    # Long series arrive as claim checks and are read back for the charts
+    timeline = select_series(source_output, s3_client=s3)
     
     # Create fast dashboard data
-    incident_id = f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-    severity = determine_severity(analyzer_output)
+    # The state machine names the incident so both branches update the same one
+    incident_id = event.get('incident_id') or f"incident-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    severity = determine_severity(analyzer_output, source_output.get('anomaly'))
     total_errors = analyzer_output.get('basic_stats', {}).get('total_errors', 0)
     deploy_sha = analyzer_output.get('basic_stats', {}).get('deploy_sha', 'unknown')
     
@@ -35,7 +44,8 @@ def lambda_handler(event, context):
             'affected_files': analyzer_output.get('basic_stats', {}).get('affected_files', 0)
         },
         'charts': {
-            'error_timeline': source_output.get('series', []),
+            'error_timeline': timeline,
+            'error_timeline_rollups': chart_rollups(source_output, s3),
             'file_impact': source_output.get('file_hits', {}),
             'top_errors': analyzer_output.get('dashboard_ready', {}).get('top_errors', [])[:5]
         },
@@ -50,24 +60,27 @@ def lambda_handler(event, context):
         }
     }
     
-    # Store in S3
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key=f'incidents/{incident_id}-initial.json',
-        Body=json.dumps(fast_data),
-        ContentType='application/json',
-        Metadata={'update-type': 'initial', 'incident-id': incident_id}
-    )
-    
-    s3.put_object(
-        Bucket=BUCKET_NAME,
-        Key='latest-incident.json',
-        Body=json.dumps(fast_data),
-        ContentType='application/json'
-    )
+    # Store in S3; the incident and latest copies are written together
+    body = json.dumps(fast_data)
+    put_objects(s3, BUCKET_NAME, [
+        {
+            'Key': f'incidents/{incident_id}-initial.json',
+            'Body': body,
+            'ContentType': 'application/json',
+            'Metadata': {'update-type': 'initial', 'incident-id': incident_id}
+        },
+        {'Key': 'latest-incident.json', 'Body': body, 'ContentType': 'application/json'}
+    ])
     
     # Send email notification
-    email_result = send_email_notification(incident_id, severity, total_errors, deploy_sha, source_output)
+    email_result = send_email_notification(incident_id, severity, total_errors, deploy_sha, timeline)
+    
+    # Index the stored copy only after the notification is out, so the
+    # index write never delays it
+    link_incident(
+        s3, BUCKET_NAME, analyzer_output.get('s3_analysis_location'),
+        'incident_initial', f'incidents/{incident_id}-initial.json'
+    )
     
     return {
         'incident_id': incident_id,
@@ -76,11 +89,10 @@ def lambda_handler(event, context):
         'email_sent': email_result
     }
 
-def send_email_notification(incident_id, severity, total_errors, deploy_sha, source_output):
+def send_email_notification(incident_id, severity, total_errors, deploy_sha, timeline):
     """Send email notification about the incident"""
     
     # Create error timeline summary
-    timeline = source_output.get('series', [])
     timeline_text = '\n'.join([f"  {point[0]}: {point[1]} errors" for point in timeline])
     
     # Create email subject
@@ -127,16 +139,3 @@ This is an automated alert from DevAngel incident detection system.
             'status': 'failed',
             'error': str(e)
         }
-
-def determine_severity(analyzer_output):
-    """Determine incident severity"""
-    total_errors = analyzer_output.get('basic_stats', {}).get('total_errors', 0)
-    
-    if total_errors >= 10:
-        return 'critical'
-    elif total_errors >= 5:
-        return 'high'
-    elif total_errors >= 1:
-        return 'medium'
-    else:
-        return 'low'
@@ -0,0 +1,93 @@
+import re
+from functools import lru_cache
+
+# Storms repeat the same lines, so a few thousand raw messages cover almost
+# every lookup while keeping the caches bounded in a warm container
+CACHE_SIZE = 4096
+MAX_SIGNATURE_LENGTH = 200
+MASK_TOKENS = ('[TIMESTAMP]', '[REQUEST_ID]', '[NUMBER]')
+
+FILE_EXTENSIONS = r'(?:py|js|java|rb|php|go|rs|cpp|c|h)'
+
+# One tokenizer pass masks timestamps, request IDs and numbers; alternatives are
+# tried left to right so a timestamp wins over the numbers inside it
+_MASK_PATTERN = re.compile(
+    r'(?P<timestamp>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2})'
+    r'|(?P<request_id>\[RequestId: [^\]]+\])'
+    r'|(?P<number>\b\d+\b)'
+)
+_MASKS = dict(zip(('timestamp', 'request_id', 'number'), MASK_TOKENS))
+
+_FILE_PATTERNS = (
+    re.compile(r'File\s+"([^"]+\.' + FILE_EXTENSIONS + r')"'),
+    re.compile(r'([/\w.-]+\.' + FILE_EXTENSIONS + r'):\d+'),
+)
+# Both file patterns need an extension followed by a quote or colon, so most
+# plain log lines are rejected with a single search
+_FILE_HINT = re.compile(r'\.' + FILE_EXTENSIONS + r'[":]')
+
+_ERROR_WORDS = re.compile(r'error|exception', re.IGNORECASE)
+
+def _mask_token(match):
+    return _MASKS[match.lastgroup]
+
+@lru_cache(maxsize=CACHE_SIZE)
+def mask_message(message):
+    """Raw log message with timestamps, request IDs and numbers masked"""
+    return _MASK_PATTERN.sub(_mask_token, message)
+
+def signature_for_message(message):
+    """Masked error signature for a raw log message"""
+    return mask_message(message)[:MAX_SIGNATURE_LENGTH]
+
+@lru_cache(maxsize=CACHE_SIZE)
+def files_for_message(message):
+    """Source files referenced by a stack trace in a raw log message"""
+    if not _FILE_HINT.search(message):
+        return ()
+    files = set()
+    for pattern in _FILE_PATTERNS:
+        files.update(pattern.findall(message))
+    return tuple(files)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def mentions_error(message):
+    """Whether a raw log message mentions an error or exception"""
+    return _ERROR_WORDS.search(message) is not None
+
+def is_error_log(log):
+    if isinstance(log, dict):
+        level = (log.get('logLevel') or '').upper()
+        if level in ('ERROR', 'FATAL'):
+            return True
+        return mentions_error(log.get('message') or '')
+    return False
+
+def get_error_signature(log):
+    if isinstance(log, dict):
+        message = log.get('message') or ''
+    else:
+        message = str(log)
+    return signature_for_message(message)
+
+def extract_files_from_stacktrace(log):
+    if isinstance(log, dict):
+        message = log.get('message') or ''
+    else:
+        message = str(log)
+    return list(files_for_message(message))
+
+def cache_stats():
+    """Hit/miss counters for the fingerprint caches"""
+    stats = {}
+    for name, cached in (('mask', mask_message),
+                         ('files', files_for_message),
+                         ('mentions_error', mentions_error)):
+        info = cached.cache_info()
+        stats[name] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+    return stats
+
+def clear_caches():
+    mask_message.cache_clear()
+    files_for_message.cache_clear()
+    mentions_error.cache_clear()
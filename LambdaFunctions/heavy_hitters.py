@@ -0,0 +1,105 @@
+import random
+
+class SpaceSaving:
+    """
+    Space-Saving top-k counter over at most capacity keys.
+
+    Keys sit in buckets by count, so incrementing a key and evicting the smallest
+    are O(1). A new key that arrives when the table is full replaces the oldest
+    key in the lowest bucket and inherits its count; that inherited amount is the
+    key's overcount, so every tracked count is within overcount of the truth and
+    any key with more than total / capacity occurrences is guaranteed to be held.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.overcounts = {}
+        self.buckets = {}
+        self.min_count = 0
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def count(self, key):
+        return self.counts.get(key, 0)
+
+    def overcount(self, key):
+        return self.overcounts.get(key, 0)
+
+    def add(self, key):
+        """Count one occurrence of key and return the key it evicted, if any"""
+        count = self.counts.get(key)
+        if count is not None:
+            self._move(key, count, count + 1)
+            return None
+
+        evicted = None
+        if len(self.counts) < self.capacity:
+            self.overcounts[key] = 0
+            self.min_count = 1
+        else:
+            lowest = self.buckets[self.min_count]
+            evicted = next(iter(lowest))
+            self._unlink(evicted, self.min_count)
+            del self.counts[evicted]
+            del self.overcounts[evicted]
+            self.overcounts[key] = self.min_count
+        self._link(key, self.overcounts[key] + 1)
+        if self.min_count not in self.buckets:
+            self.min_count += 1
+        return evicted
+
+    def restore(self, key, count, overcount=0):
+        """Reinstate a saved count, evicting the smallest key if the table is full"""
+        evicted = None
+        if key in self.counts:
+            self._unlink(key, self.counts[key])
+        elif len(self.counts) >= self.capacity:
+            evicted = next(iter(self.buckets[self.min_count]))
+            self._unlink(evicted, self.min_count)
+            del self.counts[evicted]
+            del self.overcounts[evicted]
+        self.overcounts[key] = overcount
+        self._link(key, count)
+        self.min_count = min(self.buckets)
+        return evicted
+
+    def _link(self, key, count):
+        self.counts[key] = count
+        self.buckets.setdefault(count, {})[key] = None
+
+    def _unlink(self, key, count):
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+
+    def _move(self, key, count, new_count):
+        self._unlink(key, count)
+        self._link(key, new_count)
+        if count == self.min_count and count not in self.buckets:
+            self.min_count = new_count
+
+class Reservoir:
+    """Fixed-size uniform sample of a stream (Algorithm R)"""
+
+    def __init__(self, size, rng=None, items=None, seen=0):
+        self.size = size
+        self.rng = rng or random.Random()
+        self.items = list(items or [])[:size]
+        self.seen = max(seen, len(self.items))
+
+    def offer(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
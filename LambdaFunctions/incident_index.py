@@ -0,0 +1,205 @@
+import json
+import re
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from botocore.exceptions import ClientError
+from fingerprint import signature_for_message
+from s3_writer import executor
+
+# One NDJSON shard per UTC day; deploy.sh expires shards past the retention
+# window and lookups never read further back than it
+INDEX_PREFIX = 'index/incidents'
+RETENTION_DAYS = 30
+# Stage keys are dated <prefix>/YYYY/MM/DD/..., which places an incident in its shard
+DAY_PATH = re.compile(r'/(\d{4}/\d{2}/\d{2})/')
+# Occurrences kept per signature; older ones fall off the index, not the bucket
+MAX_OCCURRENCES = 100
+MAX_WRITE_ATTEMPTS = 5
+# Error codes S3 returns when a conditional write lost a race
+CONFLICT_CODES = {'PreconditionFailed', 'ConditionalRequestConflict'}
+
+class IncidentIndex:
+    """
+    Cross-incident index of error signatures, kept as one NDJSON object per day.
+
+    Each row is one signature's occurrence in one incident: its source,
+    errorType, error count, first and last event time (epoch ms) and the keys of
+    the objects written for that incident. Rows are sorted by (signature,
+    last_seen), so the history of a signature is a contiguous run found by
+    binary search and updates are a sorted merge. A loaded index is either one
+    day's shard, which can be written back, or the merged retention window.
+    """
+
+    def __init__(self, rows=None, etag=None):
+        self.rows = rows or []
+        self.sort_keys = [_sort_key(row) for row in self.rows]
+        self.etag = etag
+        self.dirty = False
+
+    @classmethod
+    def from_ndjson(cls, body, etag=None):
+        rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        rows.sort(key=_sort_key)
+        return cls(rows, etag)
+
+    def to_ndjson(self):
+        return ''.join(json.dumps(row, sort_keys=True, separators=(',', ':')) + '\n' for row in self.rows)
+
+    def add(self, rows):
+        """Merge in one incident's rows, replacing any it already has"""
+        incidents = {row['incident'] for row in rows}
+        merged = [row for row in self.rows if row['incident'] not in incidents] + list(rows)
+        merged.sort(key=_sort_key)
+
+        # Keep the newest occurrences of each signature
+        kept = []
+        for _, occurrences in groupby(merged, key=itemgetter('signature')):
+            kept.extend(list(occurrences)[-MAX_OCCURRENCES:])
+
+        self.rows = kept
+        self.sort_keys = [_sort_key(row) for row in kept]
+        self.dirty = True
+
+    def link(self, analysis_key, name, key):
+        """Attach another object key to the rows of the incident whose analysis is at analysis_key"""
+        linked = 0
+        for row in self.rows:
+            if row['keys'].get('analysis') == analysis_key:
+                row['keys'][name] = key
+                linked += 1
+        self.dirty = self.dirty or linked > 0
+        return linked
+
+    def occurrences(self, signature):
+        """Rows of a signature, oldest first"""
+        start = bisect_left(self.sort_keys, (signature,))
+        end = bisect_right(self.sort_keys, (signature, float('inf')))
+        return self.rows[start:end]
+
+    def last_seen(self, signature):
+        """Most recent row of a signature, or None if it never fired"""
+        rows = self.occurrences(signature)
+        return rows[-1] if rows else None
+
+    def query(self, signature=None, source=None, error_type=None, since=None, until=None):
+        """Rows matching every given filter; since/until (epoch ms) keep rows whose errors overlap that range"""
+        rows = self.occurrences(signature) if signature is not None else self.rows
+        return [
+            row for row in rows
+            if (source is None or row['source'] == source)
+            and (error_type is None or row['error_type'] == error_type)
+            and (since is None or row['last_seen'] >= since)
+            and (until is None or row['first_seen'] <= until)
+        ]
+
+def _sort_key(row):
+    return (row['signature'], row['last_seen'])
+
+def incident_rows(error_events, incident, keys):
+    """One index row per (signature, source, errorType) among an incident's error events"""
+    groups = {}
+    for event in error_events:
+        group = (signature_for_message(event.get('message') or ''), event.get('source'), event.get('errorType'))
+        timestamp = event.get('timestamp') or 0
+        row = groups.get(group)
+        if row is None:
+            groups[group] = row = {
+                'signature': group[0],
+                'source': group[1],
+                'error_type': group[2],
+                'count': 0,
+                'first_seen': timestamp,
+                'last_seen': timestamp,
+                'incident': incident,
+                'keys': dict(keys)
+            }
+        row['count'] += 1
+        row['first_seen'] = min(row['first_seen'], timestamp)
+        row['last_seen'] = max(row['last_seen'], timestamp)
+    return list(groups.values())
+
+def object_key(location):
+    """Object key of an s3://bucket/key location"""
+    if location and location.startswith('s3://'):
+        return location.split('/', 3)[3]
+    return location
+
+def index_key(day):
+    return f"{INDEX_PREFIX}/{day.strftime('%Y/%m/%d')}.ndjson"
+
+def shard_key(analysis_key):
+    """Shard of the incident whose analysis is at analysis_key: the day in its path, else today"""
+    match = DAY_PATH.search(analysis_key or '')
+    return index_key(datetime.strptime(match.group(1), '%Y/%m/%d') if match else datetime.utcnow())
+
+def load_shard(s3_client, bucket, key):
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+    except s3_client.exceptions.NoSuchKey:
+        return IncidentIndex()
+    return IncidentIndex.from_ndjson(response['Body'].read().decode('utf-8'), response.get('ETag'))
+
+def load_index(s3_client, bucket, days=RETENTION_DAYS):
+    """Read-only index of the last `days` daily shards, fetched concurrently"""
+    today = datetime.utcnow()
+    keys = [index_key(today - timedelta(days=offset)) for offset in range(days)]
+    shards = executor().map(lambda key: load_shard(s3_client, bucket, key), keys)
+    rows = [row for shard in shards for row in shard.rows]
+    rows.sort(key=_sort_key)
+    return IncidentIndex(rows)
+
+def update_index(s3_client, bucket, mutate, key):
+    """
+    Read-modify-write of one shard, skipped when mutate changes nothing. The write
+    is conditional on the ETag that was read (or on the object not existing yet),
+    so concurrent stages never drop each other's rows; a writer that loses the
+    race reloads and reapplies.
+    """
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        index = load_shard(s3_client, bucket, key)
+        result = mutate(index)
+        if not index.dirty:
+            return result
+        condition = {'IfMatch': index.etag} if index.etag else {'IfNoneMatch': '*'}
+        try:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=index.to_ndjson().encode('utf-8'),
+                ContentType='application/x-ndjson',
+                Metadata={'updated-at': datetime.utcnow().isoformat()},
+                **condition
+            )
+            return result
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in CONFLICT_CODES:
+                raise
+            print(f"Index {key} changed during update, retrying ({attempt + 1}/{MAX_WRITE_ATTEMPTS})")
+    raise RuntimeError(f"Gave up updating {key} after {MAX_WRITE_ATTEMPTS} conflicting writes")
+
+def record_incident(s3_client, bucket, error_events, incident, keys):
+    """Index an incident's signatures; failures are logged, never raised into the pipeline"""
+    try:
+        rows = incident_rows(error_events, incident, keys)
+        update_index(s3_client, bucket, lambda index: index.add(rows), shard_key(keys.get('analysis')))
+        return len(rows)
+    except Exception as e:
+        print(f"Skipping incident index update for {incident}: {str(e)}")
+        return 0
+
+def link_incident(s3_client, bucket, analysis_location, name, location):
+    """Attach a later stage's object to an indexed incident; failures are logged, never raised"""
+    if not analysis_location:
+        return 0
+    analysis_key = object_key(analysis_location)
+    try:
+        return update_index(
+            s3_client, bucket,
+            lambda index: index.link(analysis_key, name, object_key(location)),
+            shard_key(analysis_key)
+        )
+    except Exception as e:
+        print(f"Skipping incident index link for {analysis_location}: {str(e)}")
+        return 0
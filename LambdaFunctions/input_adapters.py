@@ -0,0 +1,178 @@
+import calendar
+import re
+from datetime import datetime, timezone
+
+_LEVEL_PATTERN = re.compile(r'\b(FATAL|ERROR|WARN(?:ING)?|INFO|DEBUG)\b')
+_REQUEST_ID_PATTERN = re.compile(r'RequestId: ([\w-]+)')
+_ERROR_TYPE_PATTERN = re.compile(r'\b([A-Z]\w*(?:Error|Exception))\b')
+
+ERROR_LEVELS = ('ERROR', 'FATAL', 'WARN')
+
+def infer_level(message):
+    match = _LEVEL_PATTERN.search(message)
+    if not match:
+        return 'INFO'
+    level = match.group(1)
+    return 'WARN' if level == 'WARNING' else level
+
+def infer_request_id(message):
+    match = _REQUEST_ID_PATTERN.search(message)
+    return match.group(1) if match else None
+
+def infer_error_type(message):
+    match = _ERROR_TYPE_PATTERN.search(message)
+    return match.group(1) if match else None
+
+def source_for_log_group(log_group):
+    """Service name implied by a log group, e.g. /aws/lambda/foo -> lambda"""
+    parts = [part for part in log_group.split(':')[-1].split('/') if part]
+    if len(parts) >= 2 and parts[0] == 'aws':
+        return parts[1]
+    return parts[0] if parts else None
+
+class IsoTimestampDecoder:
+    """
+    Epoch-millisecond decoder for ISO-8601 timestamps.
+
+    Lines in one batch share a handful of dates, so the epoch for each
+    'YYYY-MM-DD' prefix is computed once and the time of day is sliced out as
+    integers. Anything that does not fit the fast shape goes through
+    datetime.fromisoformat.
+    """
+
+    MAX_CACHED_DAYS = 1024
+
+    def __init__(self):
+        self.day_ms = {}
+
+    def __call__(self, value):
+        if not value:
+            return None
+        try:
+            return self._fast(value)
+        except (ValueError, IndexError):
+            return self._slow(value)
+
+    def _fast(self, value):
+        if value[10] not in 'T ' or value[13] != ':' or value[16] != ':':
+            raise ValueError(value)
+
+        day = value[:10]
+        day_ms = self.day_ms.get(day)
+        if day_ms is None:
+            if len(self.day_ms) >= self.MAX_CACHED_DAYS:
+                self.day_ms.clear()
+            year, month, date = int(day[0:4]), int(day[5:7]), int(day[8:10])
+            day_ms = self.day_ms[day] = calendar.timegm((year, month, date, 0, 0, 0)) * 1000
+
+        millis = (int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])) * 1000
+        rest = value[19:]
+
+        if rest.startswith('.'):
+            end = 1
+            while end < len(rest) and rest[end].isdigit():
+                end += 1
+            millis += int(rest[1:end][:3].ljust(3, '0'))
+            rest = rest[end:]
+
+        if rest in ('', 'Z'):
+            return day_ms + millis
+        if rest[0] in '+-' and len(rest) == 6 and rest[3] == ':':
+            offset = (int(rest[1:3]) * 60 + int(rest[4:6])) * 60000
+            return day_ms + millis - offset if rest[0] == '+' else day_ms + millis + offset
+        raise ValueError(value)
+
+    def _slow(self, value):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp() * 1000)
+
+class LogEventsAdapter:
+    """CloudWatch logEvents payloads: epoch-millisecond timestamps and logLevel"""
+    schema = 'logEvents'
+
+    @staticmethod
+    def matches(payload):
+        return 'logEvents' in payload
+
+    def log_group(self, payload):
+        return payload.get('logGroupName')
+
+    def iter_events(self, payload):
+        return iter(payload.get('logEvents', []))
+
+class InsightsAdapter:
+    """Logs Insights records with @timestamp ISO strings, @message and an optional level"""
+    schema = 'insights'
+
+    @staticmethod
+    def matches(payload):
+        records = payload.get('logs')
+        return isinstance(records, list) and (not records or isinstance(records[0], dict))
+
+    def log_group(self, payload):
+        return payload.get('logGroupName')
+
+    def iter_events(self, payload):
+        decode_timestamp = IsoTimestampDecoder()
+        default_source = source_for_log_group(payload['logGroupName']) if payload.get('logGroupName') else None
+        for record in payload.get('logs', []):
+            yield self.to_log_event(record, decode_timestamp, default_source)
+
+    @staticmethod
+    def to_log_event(record, decode_timestamp, default_source=None):
+        message = record.get('@message') or ''
+        level = (record.get('level') or record.get('logLevel') or infer_level(message)).upper()
+        if level == 'WARNING':
+            level = 'WARN'
+        log = record.get('@log')
+        return {
+            'timestamp': decode_timestamp(record.get('@timestamp')),
+            'message': message,
+            'logLevel': level,
+            'requestId': record.get('@requestId') or infer_request_id(message),
+            'source': source_for_log_group(log) if log else default_source,
+            'errorType': record.get('errorType') or (infer_error_type(message) if level in ERROR_LEVELS else None)
+        }
+
+class InsightsQueryResultsAdapter(InsightsAdapter):
+    """Raw GetQueryResults rows: lists of {'field': ..., 'value': ...} cells"""
+    schema = 'insights-query-results'
+
+    @staticmethod
+    def matches(payload):
+        rows = payload.get('results')
+        return isinstance(rows, list) and (not rows or isinstance(rows[0], list))
+
+    def iter_events(self, payload):
+        decode_timestamp = IsoTimestampDecoder()
+        default_source = source_for_log_group(payload['logGroupName']) if payload.get('logGroupName') else None
+        for row in payload.get('results', []):
+            record = {cell['field']: cell.get('value') for cell in row}
+            yield self.to_log_event(record, decode_timestamp, default_source)
+
+ADAPTERS = [LogEventsAdapter(), InsightsQueryResultsAdapter(), InsightsAdapter()]
+
+def detect_adapter(payload):
+    """Pick the decoder for a payload once, from its shape rather than per line"""
+    for adapter in ADAPTERS:
+        if adapter.matches(payload):
+            return adapter
+    raise ValueError(f"Unrecognized log payload with keys: {sorted(payload)[:10]}")
+
+def normalize_log_data(payload):
+    """Log data in the logEvents schema, whatever format the payload arrived in"""
+    adapter = detect_adapter(payload)
+    log_data = {
+        'logEvents': adapter.iter_events(payload),
+        'schema': adapter.schema
+    }
+    if adapter.log_group(payload):
+        log_data['logGroupName'] = adapter.log_group(payload)
+    if payload.get('deploy'):
+        log_data['deploy'] = payload['deploy']
+    return log_data
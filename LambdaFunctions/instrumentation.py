@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from functools import wraps
+
+NAMESPACE = 'DevAngel'
+# Metrics are printed inside Lambda unless DEVANGEL_METRICS=off; local runs and
+# tests stay quiet unless it is set to on
+ENABLED = os.environ.get(
+    'DEVANGEL_METRICS', 'on' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'off'
+).lower() not in ('off', 'false', '0')
+# CloudWatch accepts at most 100 values per metric in one EMF document
+MAX_VALUES = 100
+
+_lock = threading.Lock()
+_stats = {}
+
+class timed(ContextDecorator):
+    """
+    Time a block or function as one call of the named operation.
+
+    Inside a with block the bytes and items attributes can be set to the size
+    of what the call moved; they are summed per operation. Calls from pool
+    threads are recorded too. Used as a decorator, every call gets a fresh
+    timer.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.items = 0
+
+    def _recreate_cm(self):
+        return timed(self.name)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.started) * 1000, self.bytes, self.items)
+        return False
+
+def record(name, duration_ms=None, byte_count=0, item_count=0):
+    """Add one call of an operation to the current invocation's metrics"""
+    if not ENABLED:
+        return
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = {'calls': 0, 'durations': [], 'bytes': 0, 'items': 0}
+        stats['calls'] += 1
+        stats['bytes'] += byte_count
+        stats['items'] += item_count
+        if duration_ms is not None and len(stats['durations']) < MAX_VALUES:
+            stats['durations'].append(round(duration_ms, 3))
+
+def set_enabled(enabled):
+    """Turn metric recording on or off, e.g. for a test that checks the output"""
+    global ENABLED
+    ENABLED = enabled
+    reset()
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+def emf_document(stage, request_id=None):
+    """Current metrics as one Embedded Metric Format document, dimensioned by stage"""
+    with _lock:
+        stats = {name: dict(values, durations=list(values['durations'])) for name, values in _stats.items()}
+
+    document = {'Stage': stage}
+    definitions = []
+    for name, values in sorted(stats.items()):
+        metrics = [(f"{name}.calls", 'Count', values['calls'])]
+        if values['durations']:
+            metrics.append((f"{name}.duration", 'Milliseconds', values['durations']))
+        if values['bytes']:
+            metrics.append((f"{name}.bytes", 'Bytes', values['bytes']))
+        if values['items']:
+            metrics.append((f"{name}.items", 'Count', values['items']))
+        for metric, unit, value in metrics:
+            definitions.append({'Name': metric, 'Unit': unit})
+            document[metric] = value
+
+    document['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{'Namespace': NAMESPACE, 'Dimensions': [['Stage']], 'Metrics': definitions}]
+    }
+    if request_id:
+        document['RequestId'] = request_id
+    return document
+
+def flush(stage, request_id=None):
+    """Print the invocation's metrics for CloudWatch to extract and start over"""
+    if not ENABLED or not _stats:
+        return
+    print(json.dumps(emf_document(stage, request_id), separators=(',', ':')))
+    reset()
+
+def instrumented(stage):
+    """Decorate a lambda_handler so each invocation prints its metrics as one EMF line"""
+    def decorate(handler):
+        @wraps(handler)
+        def wrapper(event, context):
+            reset()
+            try:
+                with timed('handler'):
+                    return handler(event, context)
+            finally:
+                flush(stage, getattr(context, 'aws_request_id', None))
+        return wrapper
+    return decorate
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from fingerprint import signature_for_message
+from instrumentation import record
+
+CACHE_PREFIX = 'llm-cache'
+# Bump to orphan every stored response, e.g. when the response format changes
+CACHE_VERSION = 1
+DEFAULT_TTL_SECONDS = 24 * 3600
+MAX_ENTRIES = 256
+
+class ResponseCache:
+    """
+    Model responses keyed by a hash of the model ID and a key prompt.
+
+    Callers build the key prompt with the same template as the real prompt,
+    from inputs with error messages fingerprinted and per-run values such as
+    timestamps left out, so a recurring incident maps to the same key. A warm
+    container answers from an in-memory LRU; otherwise the response is read
+    from llm-cache/<hash>.json, which records when it expires. S3 errors are
+    logged and treated as misses, and only responses the caller accepts are
+    stored, so fallbacks and malformed answers are never served from the cache.
+    """
+
+    def __init__(self, s3_client=None, bucket=None, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=MAX_ENTRIES,
+                 prefix=CACHE_PREFIX):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.entries = OrderedDict()
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def key(self, model_id, key_prompt):
+        text = json.dumps([CACHE_VERSION, model_id, key_prompt], separators=(',', ':'))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def object_key(self, key):
+        return f"{self.prefix}/{key}.json"
+
+    def complete(self, model_id, key_prompt, generate, accept=None):
+        """
+        Cached response for key_prompt, or generate() on a miss. The generated
+        text is stored unless accept(text) is false; errors from generate
+        propagate so the caller's fallback runs and is not cached.
+        """
+        key = self.key(model_id, key_prompt)
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        text = generate()
+        if text and (accept is None or accept(text)):
+            self.put(key, model_id, text)
+        return text
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+            else:
+                entry = None
+        if entry is not None:
+            self._count('memory_hit')
+            return entry[0]
+
+        stored = self._read(key)
+        if stored is not None and stored.get('version') == CACHE_VERSION and stored.get('expires_at', 0) > now:
+            self._remember(key, stored['text'], stored['expires_at'])
+            self._count('s3_hit')
+            return stored['text']
+
+        self._count('miss')
+        return None
+
+    def put(self, key, model_id, text):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, text, expires_at)
+        if self.s3 is None:
+            return
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.object_key(key),
+                Body=json.dumps({
+                    'version': CACHE_VERSION,
+                    'model_id': model_id,
+                    'created_at': int(time.time()),
+                    'expires_at': int(expires_at),
+                    'text': text
+                }),
+                ContentType='application/json'
+            )
+        except Exception as e:
+            print(f"Error caching model response {key}: {str(e)}")
+
+    def cache_stats(self):
+        with self.lock:
+            stats = dict(self.stats, entries=len(self.entries))
+        lookups = stats.get('memory_hit', 0) + stats.get('s3_hit', 0) + stats.get('miss', 0)
+        stats['hit_rate'] = round((lookups - stats.get('miss', 0)) / lookups, 3) if lookups else None
+        return stats
+
+    def _read(self, key):
+        if self.s3 is None:
+            return None
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self.object_key(key))
+            return json.loads(response['Body'].read())
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            print(f"Error reading cached model response {key}: {str(e)}")
+            return None
+
+    def _remember(self, key, text, expires_at):
+        with self.lock:
+            self.entries[key] = (text, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _count(self, outcome):
+        with self.lock:
+            self.stats[outcome] += 1
+        record(f"llm_cache.{outcome}")
+
+def fingerprinted(message):
+    """An error message with timestamps, request IDs and numbers masked, for key prompts"""
+    return signature_for_message(message or '')
@@ -0,0 +1,176 @@
+from array import array
+from datetime import datetime, timezone
+from collections import Counter
+from fingerprint import is_error_log, extract_files_from_stacktrace, files_for_message
+from template_miner import TemplateMiner
+from time_series import MultiResolutionSeries, DEFAULT_RESOLUTION, RESOLUTIONS
+from event_batch import EventBatch, EventRow
+from instrumentation import timed
+
+class LogAggregator:
+    """
+    Single-pass aggregator over a stream of CloudWatch log events.
+
+    Level counts, the multi-resolution error series, mined error templates and file
+    hits are updated as each event arrives, so memory grows with the number of
+    distinct buckets and files rather than with the number of events, and the
+    template miner tracks a bounded set of heavy-hitter templates.
+    Only ERROR/WARN events are retained, appended straight into a columnar
+    EventBatch, because they are part of the adapter output; no per-event dict
+    is kept.
+    """
+
+    def __init__(self, max_exemplars=10):
+        self.max_exemplars = max_exemplars
+        self.total_events = 0
+        self.delta_events = 0
+        self.level_counts = Counter()
+        self.error_series = MultiResolutionSeries()
+        self.templates = TemplateMiner()
+        self.file_hits = Counter()
+        self.error_events = EventBatch()
+        self.error_offsets = array('q')
+
+    def add(self, log_event):
+        """Fold one raw log event into the running aggregates"""
+        level = log_event.get('logLevel', 'INFO')
+        message = log_event.get('message')
+
+        self.total_events += 1
+        self.delta_events += 1
+        self.level_counts[level] += 1
+
+        is_error = is_error_log(log_event)
+        if is_error:
+            self.error_series.add(log_event.get('timestamp'))
+
+        for file_path in files_for_message(message or ''):
+            self.file_hits[file_path] += 1
+
+        # Collect error events for analysis straight into the batch columns;
+        # template samples are row views over it, not copies
+        if level in ('ERROR', 'WARN'):
+            index = self.error_events.append(log_event)
+            self.error_offsets.append(self.delta_events - 1)
+            if is_error:
+                self.templates.add(message, log_event.get('timestamp'), self.error_events[index])
+
+    def processed_event(self, log_event):
+        """The processed-event shape of one raw log event, as written to the raw-logs artifact"""
+        return {
+            'timestamp': log_event.get('timestamp'),
+            'message': log_event.get('message'),
+            'logLevel': log_event.get('logLevel', 'INFO'),
+            'requestId': log_event.get('requestId'),
+            'source': log_event.get('source'),
+            'errorType': log_event.get('errorType'),
+            'processed_at': self.error_events.processed_at
+        }
+
+    def to_state(self):
+        """Mergeable aggregates for a checkpoint; retained error events are not included"""
+        return {
+            'total_events': self.total_events,
+            'level_counts': dict(self.level_counts),
+            'series': self.error_series.to_state(),
+            'templates': [
+                dict(template, sample=_as_dict(template['sample']),
+                     samples=[_as_dict(sample) for sample in template['samples']])
+                for template in self.templates.to_state()
+            ],
+            'file_hits': dict(self.file_hits)
+        }
+
+    def load_state(self, state):
+        """Merge checkpointed aggregates so new events continue from them"""
+        self.total_events += state.get('total_events', 0)
+        self.level_counts.update(state.get('level_counts', {}))
+        self.error_series.load_state(state.get('series', {}))
+        self.templates.load_state(state.get('templates', []))
+        self.file_hits.update(state.get('file_hits', {}))
+        return self
+
+    def consume(self, log_events, sink=None):
+        """Aggregate an iterable of log events, handing each processed event to sink"""
+        with timed('aggregate') as metric:
+            before = self.delta_events
+            for log_event in log_events:
+                self.add(log_event)
+                if sink is not None:
+                    sink(self.processed_event(log_event))
+            metric.items = self.delta_events - before
+        return self
+
+    def series(self, resolution=DEFAULT_RESOLUTION):
+        return self.error_series.series(resolution)
+
+    def exemplars(self):
+        return [_as_dict(template.sample) for template in self.templates.top(self.max_exemplars)]
+
+    def top_templates(self):
+        return [
+            dict(template.to_dict(), sample=_as_dict(template.sample))
+            for template in self.templates.top(self.max_exemplars)
+        ]
+
+    def summary(self, log_group):
+        return {
+            'total_events': self.total_events,
+            'delta_events': self.delta_events,
+            'error_count': self.level_counts.get('ERROR', 0),
+            'warning_count': self.level_counts.get('WARN', 0),
+            'info_count': self.level_counts.get('INFO', 0),
+            'processing_timestamp': datetime.utcnow().isoformat(),
+            'log_group': log_group
+        }
+
+    def to_output(self, log_group):
+        """
+        Build the source_adapter_output fields produced by the aggregator.
+        error_events is the EventBatch itself; claim_check serializes it from its columns
+        """
+        return {
+            'series': self.series(),
+            'series_rollups': self.error_series.rollups(),
+            'exemplars': self.exemplars(),
+            'file_hits': dict(self.file_hits),
+            'summary': self.summary(log_group),
+            'error_events': self.error_events
+        }
+
+def _as_dict(sample):
+    """A template sample as a plain dict; samples from this run are EventRow views"""
+    return sample.to_dict() if isinstance(sample, EventRow) else sample
+
+@timed('generate_error_series')
+def generate_error_series(logs, resolution=DEFAULT_RESOLUTION):
+    error_series = MultiResolutionSeries({resolution: RESOLUTIONS[resolution]})
+    for log in logs:
+        if is_error_log(log):
+            error_series.add(log.get('timestamp'))
+    return error_series.series(resolution)
+
+def extract_exemplars(logs, max_exemplars=10):
+    templates = TemplateMiner()
+    for log in logs:
+        if is_error_log(log):
+            templates.add(log.get('message'), log.get('timestamp'), log)
+    return [template.sample for template in templates.top(max_exemplars)]
+
+def count_file_hits(logs):
+    file_counter = Counter()
+    for log in logs:
+        files = extract_files_from_stacktrace(log)
+        for file_path in files:
+            file_counter[file_path] += 1
+    return dict(file_counter)
+
+def extract_timestamp(log):
+    if isinstance(log, dict):
+        timestamp = log.get('timestamp')
+        if timestamp:
+            try:
+                return datetime.fromtimestamp(timestamp / 1000, timezone.utc)
+            except (TypeError, ValueError, OverflowError, OSError):
+                pass
+    return None
@@ -0,0 +1,132 @@
+import gzip
+import io
+import json
+from instrumentation import timed
+
+# S3 rejects non-final multipart parts smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+class RawLogWriter:
+    """
+    Streams processed events to S3 as gzip-compressed NDJSON.
+
+    Events are compressed into an in-memory part buffer that is shipped through a
+    multipart upload whenever it reaches part_size, so Lambda memory holds at most
+    one compressed part. Each event is one line, so an event's offset is its line
+    number. Small artifacts that never fill a part are written with one put_object.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=DEFAULT_PART_SIZE):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size {part_size} is below the S3 multipart minimum of {MIN_PART_SIZE} bytes")
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.buffer = io.BytesIO()
+        self.stream = gzip.GzipFile(fileobj=self.buffer, mode='wb')
+        self.upload_id = None
+        self.parts = []
+        self.events_written = 0
+        self.bytes_uploaded = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        return False
+
+    def write(self, event):
+        """Append one event as an NDJSON line and return its offset"""
+        line = json.dumps(event, separators=(',', ':'), default=str) + '\n'
+        self.stream.write(line.encode('utf-8'))
+        offset = self.events_written
+        self.events_written += 1
+
+        if self.buffer.tell() >= self.part_size:
+            self._upload_part()
+        return offset
+
+    def close(self):
+        """Flush the gzip trailer, finish the upload and describe the artifact"""
+        self.stream.close()
+
+        if self.upload_id is None:
+            body = self.buffer.getvalue()
+            with timed('s3.put_object') as metric:
+                metric.bytes = len(body)
+                self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=body,
+                    ContentType='application/x-ndjson'
+                )
+            self.bytes_uploaded += len(body)
+        else:
+            self._upload_part()
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+
+        return {
+            'key': self.key,
+            'format': 'ndjson+gzip',
+            'count': self.events_written,
+            'compressed_bytes': self.bytes_uploaded,
+            'parts': max(len(self.parts), 1)
+        }
+
+    def abort(self):
+        if self.upload_id is not None:
+            try:
+                self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            except Exception as e:
+                print(f"Error aborting multipart upload for {self.key}: {str(e)}")
+            self.upload_id = None
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType='application/x-ndjson'
+            )
+            self.upload_id = response['UploadId']
+
+        body = self.buffer.getvalue()
+        part_number = len(self.parts) + 1
+        with timed('s3.upload_part') as metric:
+            metric.bytes = len(body)
+            response = self.s3.upload_part(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+        self.parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        self.bytes_uploaded += len(body)
+
+        # GzipFile keeps writing at the buffer's position, so rewinding reuses it
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+def iter_raw_events(s3_client, bucket, key, offsets=None):
+    """Stream events back out of a raw-logs NDJSON artifact, optionally only at offsets"""
+    response = s3_client.get_object(Bucket=bucket, Key=key)
+    wanted = set(offsets) if offsets is not None else None
+
+    with gzip.GzipFile(fileobj=response['Body'], mode='rb') as stream:
+        for offset, line in enumerate(stream):
+            if wanted is None or offset in wanted:
+                yield offset, json.loads(line)
+                if wanted is not None:
+                    wanted.discard(offset)
+                    if not wanted:
+                        break
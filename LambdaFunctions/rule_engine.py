@@ -0,0 +1,108 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'error_rules.json')
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+_TERMINAL = None
+
+class Rule:
+    """One compiled entry of the rule table"""
+    __slots__ = ('id', 'priority', 'severity', 'critical', 'recommendation')
+
+    def __init__(self, priority, spec, default_severity):
+        self.id = spec['id']
+        self.priority = priority
+        self.severity = spec.get('severity', default_severity)
+        self.critical = bool(spec.get('critical', False))
+        self.recommendation = spec.get('recommendation')
+
+class RuleSet:
+    """
+    Error rules compiled into lookup indexes.
+
+    Rules are matched by errorType first, then by keywords in the message, then
+    by source. errorType and source are dict lookups; keywords (single words or
+    phrases) sit in a word trie walked once over the message, so the cost of a
+    match depends on the message length and not on how many rules there are.
+    When several keyword rules match, the one listed first in the table wins.
+    """
+
+    def __init__(self, rules, default_severity='Medium'):
+        self.default_severity = default_severity
+        self.rules = []
+        self.by_error_type = {}
+        self.by_source = {}
+        self.keywords = {}
+
+        for priority, spec in enumerate(rules):
+            rule = Rule(priority, spec, default_severity)
+            self.rules.append(rule)
+            for error_type in spec.get('error_types', []):
+                self.by_error_type.setdefault(error_type, rule)
+            for source in spec.get('sources', []):
+                self.by_source.setdefault(source, rule)
+            for keyword in spec.get('keywords', []):
+                node = self.keywords
+                for word in _WORD_PATTERN.findall(keyword.lower()):
+                    node = node.setdefault(word, {})
+                node.setdefault(_TERMINAL, rule)
+
+        self.critical_error_types = frozenset(
+            error_type for error_type, rule in self.by_error_type.items() if rule.critical
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            table = json.load(f)
+        return cls(table['rules'], table.get('default_severity', 'Medium'))
+
+    def match(self, error_type=None, source=None, message=None):
+        """Rule for one event, or None when nothing in the table applies"""
+        rule = self.by_error_type.get(error_type)
+        if rule is None:
+            rule = self.match_untyped(source, message)
+        return rule
+
+    def match_untyped(self, source=None, message=None):
+        """Rule for an event whose errorType has no rule of its own"""
+        rule = self.match_keywords(message) if message and self.keywords else None
+        if rule is None:
+            rule = self.by_source.get(source)
+        return rule
+
+    def match_keywords(self, message):
+        words = _WORD_PATTERN.findall(message.lower())
+        keywords = self.keywords
+        best = None
+        for start in range(len(words)):
+            node = keywords.get(words[start])
+            position = start + 1
+            while node is not None:
+                rule = node.get(_TERMINAL)
+                if rule is not None and (best is None or rule.priority < best.priority):
+                    best = rule
+                if position == len(words):
+                    break
+                node = node.get(words[position])
+                position += 1
+        return best
+
+    def severity(self, rule):
+        return rule.severity if rule is not None else self.default_severity
+
+    def recommendations(self, rule_counts):
+        """Recommendations for the rules that matched, in table order, from rule id -> event count"""
+        return [
+            dict(rule.recommendation, affected_count=rule_counts[rule.id])
+            for rule in self.rules
+            if rule.recommendation and rule_counts.get(rule.id, 0) > 0
+        ]
+
+@lru_cache(maxsize=None)
+def load_rules(path=RULES_PATH):
+    """Rule table compiled once per container and reused across warm invocations"""
+    return RuleSet.from_file(path)
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import boto3
+from botocore.config import Config
+from instrumentation import record, timed
+
+# Writes in flight at once per container; the client's connection pool is sized
+# to match so no worker waits for a connection
+MAX_WORKERS = 8
+S3_CONFIG = Config(
+    max_pool_connections=MAX_WORKERS,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+    tcp_keepalive=True
+)
+
+_executor = None
+
+def s3_client():
+    """S3 client with a connection pool sized for the shared write pool"""
+    return boto3.client('s3', config=S3_CONFIG)
+
+def executor():
+    """Write pool created on first use and kept across warm invocations"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='s3-writer')
+    return _executor
+
+def put_objects(s3_client, bucket, objects):
+    """
+    Write independent objects concurrently and wait for all of them together.
+
+    objects are put_object keyword dicts without Bucket (Key, Body, ContentType,
+    ...). Returns the seconds each write took by key. A lone object is written
+    on the calling thread. If any write fails, the first error is raised once
+    every write has finished, so none is left running into the next invocation.
+    """
+    objects = [obj for obj in objects if obj]
+    started = time.perf_counter()
+
+    if len(objects) == 1:
+        latencies = {objects[0]['Key']: _put(s3_client, bucket, objects[0])}
+    else:
+        futures = [executor().submit(_put, s3_client, bucket, obj) for obj in objects]
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        latencies = {obj['Key']: future.result() for obj, future in zip(objects, futures)}
+
+    # Each write is also timed on its own as s3.put_object
+    if latencies:
+        record('s3.put_objects', (time.perf_counter() - started) * 1000, item_count=len(latencies))
+    return latencies
+
+def _put(s3_client, bucket, obj):
+    body = obj.get('Body')
+    if isinstance(body, str):
+        # Encode up front so the byte metric counts what is uploaded, not characters
+        obj = dict(obj, Body=body.encode('utf-8'))
+    started = time.perf_counter()
+    with timed('s3.put_object') as metric:
+        metric.bytes = len(obj.get('Body') or b'')
+        s3_client.put_object(Bucket=bucket, **obj)
+    return time.perf_counter() - started
@@ -1,12 +1,29 @@
 import json
 import boto3
-import re
+from collections import Counter
 from datetime import datetime
-from collections import defaultdict, Counter
+from log_aggregator import (
+    LogAggregator, generate_error_series, extract_exemplars, count_file_hits, extract_timestamp
+)
+from fingerprint import is_error_log, get_error_signature, extract_files_from_stacktrace
+from raw_log_writer import RawLogWriter
+from cloudwatch_ingest import iter_log_group_events, ERROR_FILTER_PATTERN, DEFAULT_MAX_WORKERS
+from checkpoint import load_checkpoint, save_checkpoint, checkpoint_key
+from input_adapters import normalize_log_data
+from anomaly_detector import load_detector, save_detector
+from claim_check import prepare_check_in, claim_check_key, inline_limit_for
+from time_series import DEFAULT_RESOLUTION
+from s3_writer import s3_client, put_objects
+from instrumentation import instrumented
 
-s3 = boto3.client('s3')
+s3 = s3_client()
+logs = boto3.client('logs')
 BUCKET_NAME = 'devangel-incident-data-1761448500'
+DEFAULT_LOG_GROUP = '/aws/lambda/devangel-functions'
+# The payload keeps the most-hit files; the raw-data object has all of them
+MAX_PAYLOAD_FILE_HITS = 50
 
+@instrumented('source_adapter')
 def lambda_handler(event, context):
     """
     Source adapter that processes CloudWatch logs and extracts relevant data
@@ -14,94 +31,179 @@ def lambda_handler(event, context):
     
     try:
         # Load simulated CloudWatch logs from event or use embedded default
-        log_data = event.get('logData', {})
+        log_data = event.get('logData') or event.get('incident_input', {})
+        log_query = event.get('logQuery')
+        
+        # Resume from the incident checkpoint so only the new delta is parsed
+        checkpoint = None
+        if event.get('checkpoint'):
+            log_group = (log_data or log_query or {}).get('logGroupName', DEFAULT_LOG_GROUP)
+            checkpoint = load_checkpoint(s3, BUCKET_NAME, event.get('checkpointKey') or checkpoint_key(log_group))
+        
+        # Pull an incident window straight from CloudWatch Logs when asked to
+        if not log_data and log_query:
+            log_data = query_log_data(log_query, checkpoint.last_timestamp if checkpoint else 0)
         
         # If no log data in event, use embedded simulated data
         if not log_data:
             log_data = get_embedded_simulated_logs()
         
-        # Process log events
-        processed_events = []
-        error_events = []
-        
-        for log_event in log_data.get('logEvents', []):
-            processed_event = {
-                'timestamp': log_event.get('timestamp'),
-                'message': log_event.get('message'),
-                'logLevel': log_event.get('logLevel', 'INFO'),
-                'requestId': log_event.get('requestId'),
-                'source': log_event.get('source'),
-                'errorType': log_event.get('errorType'),
-                'processed_at': datetime.utcnow().isoformat()
+        # Detect the payload schema once (logEvents or Logs Insights) and decode
+        # timestamps and levels into the logEvents shape as events stream through
+        log_data = normalize_log_data(log_data)
+        
+        aggregator = LogAggregator()
+        log_events = log_data.get('logEvents', [])
+        if checkpoint:
+            if checkpoint.state:
+                aggregator.load_state(checkpoint.state)
+            log_events = checkpoint.new_events(log_events)
+        
+        # Stream every processed event into the raw-logs artifact while
+        # aggregating, so the full event list is never held in memory
+        raw_prefix = f"raw-logs/{datetime.utcnow().strftime('%Y/%m/%d')}/processed-{context.aws_request_id}"
+        raw_data_key = f"{raw_prefix}.json"
+        
+        with RawLogWriter(s3, BUCKET_NAME, f"{raw_prefix}.ndjson.gz") as writer:
+            aggregator.consume(log_events, sink=writer.write)
+            events_artifact = writer.close()
+        
+        output = aggregator.to_output(log_data.get('logGroupName', DEFAULT_LOG_GROUP))
+        series = output['series']
+        series_rollups = output['series_rollups']
+        exemplars = output['exemplars']
+        file_hits = output['file_hits']
+        summary = output['summary']
+        error_events = output['error_events']
+        
+        if checkpoint:
+            summary['checkpoint'] = {
+                'key': checkpoint.key,
+                'last_timestamp': checkpoint.last_timestamp,
+                # Counting this run, which is committed below
+                'runs': checkpoint.runs + 1,
+                'skipped_events': checkpoint.skipped_events
             }
-            
-            processed_events.append(processed_event)
-            
-            # Collect error events for analysis
-            if processed_event['logLevel'] in ['ERROR', 'WARN']:
-                error_events.append(processed_event)
-        
-        # Generate analysis using existing functions
-        series = generate_error_series(processed_events)
-        exemplars = extract_exemplars(error_events)
-        file_hits = count_file_hits(processed_events)
-        
-        # Create summary
-        summary = {
-            'total_events': len(processed_events),
-            'error_count': len([e for e in processed_events if e['logLevel'] == 'ERROR']),
-            'warning_count': len([e for e in processed_events if e['logLevel'] == 'WARN']),
-            'info_count': len([e for e in processed_events if e['logLevel'] == 'INFO']),
-            'processing_timestamp': datetime.utcnow().isoformat(),
-            'log_group': log_data.get('logGroupName', '/aws/lambda/devangel-functions')
-        }
         
-        # Store raw processed data in S3
-        raw_data_key = f"raw-logs/{datetime.utcnow().strftime('%Y/%m/%d')}/processed-{context.aws_request_id}.json"
+        # Score this run's error buckets against the service's stored baseline;
+        # the updated baseline is saved once the run is committed
+        anomaly, detector = detect_anomaly(aggregator, summary['log_group'])
         
+        # Small side object; error events are line offsets into the NDJSON artifact
         raw_data = {
             'summary': summary,
-            'events': processed_events,
-            'error_events': error_events,
+            'events': events_artifact,
+            'error_event_offsets': aggregator.error_offsets.tolist(),
             'analysis': {
                 'series': series,
+                'series_rollups': series_rollups,
                 'exemplars': exemplars,
-                'file_hits': file_hits
+                'templates': aggregator.top_templates(),
+                'file_hits': file_hits,
+                'anomaly': anomaly
             }
         }
         
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=raw_data_key,
-            Body=json.dumps(raw_data, indent=2),
-            ContentType='application/json'
+        print(f"Processed {aggregator.delta_events} {log_data['schema']} events, found {len(error_events)} errors")
+        
+        # Large incidents pass error_events on as an S3 claim check so the
+        # Step Functions payload stays small; both objects are written together
+        inline_limit = inline_limit_for(event)
+        error_events, error_events_object = prepare_check_in(
+            BUCKET_NAME, claim_check_key(context.aws_request_id, 'error_events'),
+            error_events, inline_limit=inline_limit
         )
         
-        print(f"Processed {len(processed_events)} events, found {len(error_events)} errors")
+        # Rollups grow with the incident's length (checkpointed runs keep adding
+        # 10s buckets), so each long one is claim-checked too
+        payload_rollups, rollup_objects = {}, []
+        for resolution, points in series_rollups.items():
+            payload_rollups[resolution], rollup_object = prepare_check_in(
+                BUCKET_NAME, claim_check_key(context.aws_request_id, f"series_{resolution}"),
+                points, inline_limit=inline_limit
+            )
+            rollup_objects.append(rollup_object)
+        payload_series = payload_rollups.get(DEFAULT_RESOLUTION, series)
         
-        return {
-            'source_adapter_output': {
-                'series': series,
-                'exemplars': exemplars,
-                'file_hits': file_hits,
-                'summary': summary,
-                'error_events': error_events,
-                's3_location': f"s3://{BUCKET_NAME}/{raw_data_key}"
-            }
+        put_objects(s3, BUCKET_NAME, [
+            {'Key': raw_data_key, 'Body': json.dumps(raw_data, indent=2), 'ContentType': 'application/json'},
+            error_events_object
+        ] + rollup_objects)
+        
+        # Saving the checkpoint commits the run: if any write above failed,
+        # the next run processes the same events again. The baseline is saved
+        # after it, so those runs also score the same buckets again
+        if checkpoint:
+            checkpoint.state = aggregator.to_state()
+            save_checkpoint(s3, BUCKET_NAME, checkpoint)
+        if detector:
+            save_baseline(detector)
+        
+        # Every key is always present: the state machines select them by path
+        source_adapter_output = {
+            'series': payload_series,
+            'series_rollups': payload_rollups,
+            'exemplars': exemplars,
+            'file_hits': dict(Counter(file_hits).most_common(MAX_PAYLOAD_FILE_HITS)),
+            'summary': summary,
+            'error_events': error_events,
+            'anomaly': anomaly,
+            's3_location': f"s3://{BUCKET_NAME}/{raw_data_key}",
+            's3_events_location': f"s3://{BUCKET_NAME}/{events_artifact['key']}",
+            'deploy': log_data.get('deploy') or {}
         }
         
+        return {'source_adapter_output': source_adapter_output}
+        
     except Exception as e:
         print(f"Error in source adapter: {str(e)}")
         return {
             'source_adapter_output': {
                 'series': [],
+                'series_rollups': {},
                 'exemplars': [],
                 'file_hits': {},
                 'summary': {'error': str(e)},
-                'error_events': []
+                'error_events': [],
+                'anomaly': None,
+                's3_location': None,
+                's3_events_location': None,
+                'deploy': {}
             }
         }
 
+def detect_anomaly(aggregator, log_group):
+    """Anomaly report for the error series and its updated detector, or (None, None) if the baseline is unavailable"""
+    try:
+        detector = load_detector(s3, BUCKET_NAME, log_group)
+        return detector.observe(aggregator.error_series.counts(detector.resolution)), detector
+    except Exception as e:
+        print(f"Skipping anomaly detection for {log_group}: {str(e)}")
+        return None, None
+
+def save_baseline(detector):
+    """Store the updated baseline; if this fails, a later run folds the same buckets in again"""
+    try:
+        save_detector(s3, BUCKET_NAME, detector)
+    except Exception as e:
+        print(f"Skipping baseline update for {detector.service}: {str(e)}")
+
+def query_log_data(log_query, since=0):
+    """Log data backed by a live FilterLogEvents scan of a log group and time range"""
+    log_group = log_query['logGroupName']
+    return {
+        'logEvents': iter_log_group_events(
+            logs,
+            log_group,
+            max(log_query['startTime'], since),
+            log_query['endTime'],
+            filter_pattern=log_query.get('filterPattern', ERROR_FILTER_PATTERN),
+            stream_names=log_query.get('logStreamNames'),
+            max_workers=log_query.get('maxWorkers', DEFAULT_MAX_WORKERS)
+        ),
+        'logGroupName': log_group
+    }
+
 def get_embedded_simulated_logs():
     """Embedded simulated CloudWatch logs for testing"""
     return {
@@ -171,77 +273,3 @@ def get_embedded_simulated_logs():
         ],
         "logGroupName": "/aws/lambda/devangel-functions"
     }
-
-def generate_error_series(logs):
-    error_counts = defaultdict(int)
-    for log in logs:
-        if is_error_log(log):
-            timestamp = extract_timestamp(log)
-            if timestamp:
-                minute_key = timestamp.strftime('%Y-%m-%d %H:%M')
-                error_counts[minute_key] += 1
-    return [[k, v] for k, v in sorted(error_counts.items())]
-
-def extract_exemplars(logs, max_exemplars=10):
-    error_logs = [log for log in logs if is_error_log(log)]
-    error_groups = defaultdict(list)
-    for log in error_logs:
-        error_signature = get_error_signature(log)
-        error_groups[error_signature].append(log)
-    exemplars = []
-    for signature, group in error_groups.items():
-        exemplars.append(group[0])
-        if len(exemplars) >= max_exemplars:
-            break
-    return exemplars[:max_exemplars]
-
-def count_file_hits(logs):
-    file_counter = Counter()
-    for log in logs:
-        files = extract_files_from_stacktrace(log)
-        for file_path in files:
-            file_counter[file_path] += 1
-    return dict(file_counter)
-
-def is_error_log(log):
-    if isinstance(log, dict):
-        level = log.get('logLevel', '').upper()
-        message = log.get('message', '').lower()
-        return level in ['ERROR', 'FATAL'] or 'error' in message or 'exception' in message
-    return False
-
-def extract_timestamp(log):
-    if isinstance(log, dict):
-        timestamp = log.get('timestamp')
-        if timestamp:
-            try:
-                return datetime.fromtimestamp(timestamp / 1000)
-            except:
-                pass
-    return datetime.now()
-
-def get_error_signature(log):
-    if isinstance(log, dict):
-        message = log.get('message', '')
-    else:
-        message = str(log)
-    signature = re.sub(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}', '[TIMESTAMP]', message)
-    signature = re.sub(r'\[RequestId: [^\]]+\]', '[REQUEST_ID]', signature)
-    signature = re.sub(r'\b\d+\b', '[NUMBER]', signature)
-    return signature[:200]
-
-def extract_files_from_stacktrace(log):
-    files = []
-    if isinstance(log, dict):
-        message = log.get('message', '')
-    else:
-        message = str(log)
-    
-    patterns = [
-        r'File\s+"([^"]+\.(?:py|js|java|rb|php|go|rs|cpp|c|h))"',
-        r'([/\w.-]+\.(?:py|js|java|rb|php|go|rs|cpp|c|h)):\d+',
-    ]
-    for pattern in patterns:
-        matches = re.findall(pattern, message)
-        files.extend(matches)
-    return list(set(files))
@@ -0,0 +1,189 @@
+import random
+from functools import lru_cache
+from fingerprint import CACHE_SIZE, MASK_TOKENS, mask_message
+from heavy_hitters import SpaceSaving, Reservoir
+
+PARAM = '<*>'
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tokenize(message):
+    """Whitespace tokens of a masked log message"""
+    return tuple(mask_message(message).split())
+
+def _is_variable(token):
+    return token in MASK_TOKENS or any(c.isdigit() for c in token)
+
+class LogTemplate:
+    """
+    One mined log template with its running volume, first/last sighting and a
+    reservoir of sample events. count includes overcount inherited from the
+    template it displaced when the miner was full.
+    """
+
+    def __init__(self, template_id, tokens, timestamp, samples):
+        self.template_id = template_id
+        self.tokens = list(tokens)
+        self.count = 0
+        self.overcount = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.samples = samples
+
+    @property
+    def template(self):
+        return ' '.join(self.tokens)
+
+    @property
+    def sample(self):
+        return self.samples.items[0] if self.samples.items else None
+
+    def similarity(self, tokens):
+        """Share of positions where the template and tokens agree; wildcards count as params"""
+        matches = params = 0
+        for template_token, token in zip(self.tokens, tokens):
+            if template_token == PARAM:
+                params += 1
+            elif template_token == token:
+                matches += 1
+        return matches / len(tokens), params
+
+    def merge(self, tokens):
+        for i, (template_token, token) in enumerate(zip(self.tokens, tokens)):
+            if template_token != token:
+                self.tokens[i] = PARAM
+
+    def observe(self, timestamp, sample):
+        if sample is not None:
+            self.samples.offer(sample)
+        if timestamp:
+            if not self.first_seen or timestamp < self.first_seen:
+                self.first_seen = timestamp
+            if not self.last_seen or timestamp > self.last_seen:
+                self.last_seen = timestamp
+
+    def to_dict(self):
+        return {
+            'template_id': self.template_id,
+            'template': self.template,
+            'count': self.count,
+            'overcount': self.overcount,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'sample': self.sample
+        }
+
+class TemplateMiner:
+    """
+    Online Drain-style log template miner with bounded memory.
+
+    Messages are routed through a fixed-depth parse tree keyed on token count and
+    the first depth - 2 tokens, so each line is compared only against the handful
+    of templates in its leaf. Tokens that look variable route to a wildcard child,
+    and a full node sends new tokens to the wildcard child as well.
+
+    At most max_templates templates are tracked. Volumes are kept by a
+    Space-Saving counter, so a new template arriving when the miner is full
+    replaces the smallest one, and each template keeps a seeded reservoir of
+    sample_size events rather than every event it has seen.
+    """
+
+    def __init__(self, depth=4, similarity_threshold=0.5, max_children=100,
+                 max_templates=1000, sample_size=5, seed=0):
+        self.prefix_length = max(depth - 2, 1)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+        self.root = {}
+        self.templates = {}
+        self.leaves = {}
+        self.counts = SpaceSaving(max_templates)
+        self.next_id = 0
+
+    def add(self, message, timestamp=None, sample=None):
+        """Cluster one message into a template and return it"""
+        tokens = tokenize(message or '')
+        leaf = self._leaf(tokens)
+
+        template = self._best_match(leaf, tokens)
+        if template is None:
+            template = self._track(tokens, timestamp, leaf)
+        else:
+            template.merge(tokens)
+            self.counts.add(template.template_id)
+
+        template.count = self.counts.count(template.template_id)
+        template.observe(timestamp, sample)
+        return template
+
+    def top(self, n):
+        """Templates with the most volume, earliest template first on ties"""
+        return sorted(self.templates.values(), key=lambda t: (-t.count, t.template_id))[:n]
+
+    def to_state(self):
+        return [
+            dict(template.to_dict(), tokens=template.tokens, samples=template.samples.items)
+            for template in self.templates.values()
+        ]
+
+    def load_state(self, state):
+        """Restore saved templates and route them back into the parse tree"""
+        for saved in state:
+            count, overcount = saved['count'], saved.get('overcount', 0)
+            samples = Reservoir(self.sample_size, self.rng, saved.get('samples') or [saved['sample']],
+                                seen=count - overcount)
+            template = LogTemplate(self.next_id, saved['tokens'], saved['first_seen'], samples)
+            self.next_id += 1
+            template.count, template.overcount = count, overcount
+            template.last_seen = saved['last_seen']
+
+            evicted = self.counts.restore(template.template_id, count, overcount)
+            if evicted is not None:
+                self._forget(evicted)
+            self._register(template, self._leaf(tuple(template.tokens)))
+        return self
+
+    def _track(self, tokens, timestamp, leaf):
+        template = LogTemplate(self.next_id, tokens, timestamp, Reservoir(self.sample_size, self.rng))
+        self.next_id += 1
+
+        evicted = self.counts.add(template.template_id)
+        if evicted is not None:
+            self._forget(evicted)
+        template.overcount = self.counts.overcount(template.template_id)
+        self._register(template, leaf)
+        return template
+
+    def _register(self, template, leaf):
+        self.templates[template.template_id] = template
+        self.leaves[template.template_id] = leaf
+        leaf.append(template)
+
+    def _forget(self, template_id):
+        template = self.templates.pop(template_id)
+        self.leaves.pop(template_id).remove(template)
+
+    def _leaf(self, tokens):
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.prefix_length]:
+            key = PARAM if _is_variable(token) else token
+            child = node.get(key)
+            if child is None:
+                if len(node) >= self.max_children:
+                    key = PARAM
+                child = node.setdefault(key, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf, tokens):
+        if not tokens:
+            return leaf[0] if leaf else None
+
+        best, best_score = None, (-1.0, -1)
+        for template in leaf:
+            score = template.similarity(tokens)
+            if score > best_score:
+                best, best_score = template, score
+        if best is not None and best_score[0] >= self.similarity_threshold:
+            return best
+        return None
@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from collections import defaultdict
+from claim_check import is_claim_check, iter_items
+
+# Bucket widths in seconds; every width must be a multiple of the finest one
+RESOLUTIONS = {'10s': 10, '1m': 60, '5m': 300, '1h': 3600}
+DEFAULT_RESOLUTION = '1m'
+
+_MINUTE_FORMAT = '%Y-%m-%d %H:%M'
+_SECOND_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+class MultiResolutionSeries:
+    """
+    Error counts bucketed on integer epoch seconds in UTC at several resolutions.
+
+    Each event costs one modulo and one dict increment on the finest resolution;
+    coarser rollups are summed from those buckets when requested, so every
+    resolution comes out of the same pass. Events without a usable timestamp are
+    counted separately instead of landing in the current minute.
+    """
+
+    def __init__(self, resolutions=None):
+        self.resolutions = dict(resolutions or RESOLUTIONS)
+        self.width = min(self.resolutions.values())
+        for name, seconds in self.resolutions.items():
+            if seconds % self.width:
+                raise ValueError(f"Resolution {name} ({seconds}s) is not a multiple of {self.width}s")
+        self.buckets = defaultdict(int)
+        self.untimed = 0
+
+    def add(self, timestamp_ms, count=1):
+        try:
+            seconds = int(timestamp_ms) // 1000
+        except (TypeError, ValueError):
+            seconds = 0
+        if seconds <= 0:
+            self.untimed += count
+            return
+        self.buckets[seconds - seconds % self.width] += count
+
+    def counts(self, resolution=DEFAULT_RESOLUTION):
+        """Bucket start (epoch seconds) -> count at the requested resolution"""
+        width = self.resolutions[resolution]
+        if width == self.width:
+            return dict(self.buckets)
+        rolled = defaultdict(int)
+        for start, count in self.buckets.items():
+            rolled[start - start % width] += count
+        return dict(rolled)
+
+    def series(self, resolution=DEFAULT_RESOLUTION):
+        width = self.resolutions[resolution]
+        return [[bucket_label(start, width), count] for start, count in sorted(self.counts(resolution).items())]
+
+    def rollups(self):
+        return {name: self.series(name) for name in self.resolutions}
+
+    def to_state(self):
+        return {
+            'width': self.width,
+            'buckets': {str(start): count for start, count in self.buckets.items()},
+            'untimed': self.untimed
+        }
+
+    def load_state(self, state):
+        """Fold a saved series into this one; bucket widths must match"""
+        if state.get('width', self.width) != self.width:
+            raise ValueError(f"Cannot merge {state['width']}s buckets into {self.width}s buckets")
+        for start, count in state.get('buckets', {}).items():
+            self.buckets[int(start)] += count
+        self.untimed += state.get('untimed', 0)
+        return self
+
+def bucket_label(bucket_start, width=60):
+    """UTC label for a bucket; sub-minute buckets keep their seconds"""
+    label_format = _SECOND_FORMAT if width < 60 else _MINUTE_FORMAT
+    return datetime.fromtimestamp(bucket_start, timezone.utc).strftime(label_format)
+
+def parse_bucket_label(label):
+    """Timezone-aware UTC datetime for a bucket label at any resolution"""
+    label_format = _SECOND_FORMAT if label.count(':') == 2 else _MINUTE_FORMAT
+    return datetime.strptime(label, label_format).replace(tzinfo=timezone.utc)
+
+def select_series(source_output, resolution=DEFAULT_RESOLUTION, s3_client=None):
+    """
+    Series at the requested resolution from source_adapter_output, without
+    recomputing. Long series travel as claim checks and are read back with s3_client
+    """
+    rollups = source_output.get('series_rollups') or {}
+    series = rollups[resolution] if resolution in rollups else source_output.get('series', [])
+    return resolve_series(s3_client, series)
+
+def chart_rollups(source_output, s3_client=None):
+    """Every rollup in source_adapter_output as inline points, for the incident charts"""
+    return {
+        resolution: resolve_series(s3_client, series)
+        for resolution, series in (source_output.get('series_rollups') or {}).items()
+    }
+
+def resolve_series(s3_client, series):
+    if is_claim_check(series):
+        return list(iter_items(s3_client, series))
+    return series or []
@@ -0,0 +1,152 @@
+from array import array
+from bisect import bisect_left
+
+# NumPy is optional: the Lambda layer may not ship it, so every statistic has a
+# pure-Python path that returns the same values
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 90, 99)
+# Errors closer together than this many seconds count as a burst
+BURST_INTERVAL_SECONDS = 5
+BURST_WINDOW_SECONDS = 60
+BURST_MIN_ERRORS = 10
+# Bin width for bounding the peak window in the NumPy path, as a fraction of the window
+PEAK_BINS_PER_WINDOW = 64
+
+def analyze_timing(timestamps, total=None, source_counts=None, window_seconds=BURST_WINDOW_SECONDS,
+                   burst_min_errors=BURST_MIN_ERRORS, use_numpy=True):
+    """
+    Timing analytics for epoch-millisecond timestamps in any order.
+
+    Timestamps are sorted before gaps are taken, so out-of-order delivery (e.g.
+    interleaved CloudWatch streams) no longer produces negative gaps. Missing
+    timestamps (None or 0) are ignored. Returns the original time_analysis keys
+    plus gap percentiles, windowed burst counts and per-source error rates.
+    Returns None when there are no valid timestamps.
+    """
+    if use_numpy and np is not None:
+        stats = _numpy_stats(timestamps, window_seconds * 1000, burst_min_errors)
+    else:
+        stats = _python_stats(timestamps, window_seconds * 1000, burst_min_errors)
+    if stats is None:
+        return None
+
+    count, first, last, percentiles, min_gap, peak_window, burst_windows = stats
+    span_seconds = (last - first) / 1000
+    # Rates over incidents shorter than a minute are per that minute
+    span_minutes = max(span_seconds / 60, 1)
+
+    return {
+        'error_frequency': count if total is None else total,
+        'time_span_seconds': span_seconds,
+        'average_interval_seconds': span_seconds / (count - 1) if count > 1 else 0,
+        'burst_detected': min_gap is not None and min_gap < BURST_INTERVAL_SECONDS * 1000,
+        'gap_percentiles_seconds': {
+            f"p{q}": round(value / 1000, 3) for q, value in zip(PERCENTILES, percentiles)
+        },
+        'burst_window_seconds': window_seconds,
+        'peak_errors_in_window': peak_window,
+        'burst_windows': burst_windows,
+        'source_rates_per_minute': {
+            source: round(source_count / span_minutes, 3) for source, source_count in (source_counts or {}).items()
+        }
+    }
+
+def _numpy_stats(timestamps, window_ms, burst_min_errors):
+    if isinstance(timestamps, array) and timestamps.typecode == 'q':
+        values = np.frombuffer(timestamps, dtype=np.int64)
+    else:
+        values = np.fromiter((t or 0 for t in timestamps), dtype=np.int64)
+    if values.size and values.min() <= 0:
+        values = values[values > 0]
+    if not values.size:
+        return None
+
+    # One unstable sort: equal timestamps are interchangeable, and it is far faster than the stable one
+    values = np.sort(values)
+    gaps = np.diff(values)
+
+    if gaps.size:
+        percentiles = _numpy_percentiles(gaps)
+        min_gap = int(gaps.min())
+    else:
+        percentiles, min_gap = [0.0] * len(PERCENTILES), None
+
+    # window_counts[i] >= k exactly when the error k - 1 places later is inside the window
+    burst_windows = 0
+    if values.size >= burst_min_errors:
+        lead = values[burst_min_errors - 1:] - values[:values.size - burst_min_errors + 1]
+        burst_windows = int(np.count_nonzero(lead < window_ms))
+
+    return (int(values.size), int(values[0]), int(values[-1]), percentiles, min_gap,
+            _numpy_peak_window(values, window_ms), burst_windows)
+
+def _numpy_peak_window(values, window_ms):
+    """
+    Most errors in a window starting at any error, for sorted times.
+
+    Errors are counted into bins a fraction of the window wide (np.bincount, at
+    most about one bin per error). A window starting at the first error of a
+    bin covers the bins that fit inside it, which bounds the peak from below;
+    no window starting in a bin reaches past the bins it overlaps, which bounds
+    it from above. Only errors in bins whose upper bound beats the best lower
+    bound are counted exactly, so the binary search runs over a few windows
+    instead of every error.
+    """
+    span = int(values[-1] - values[0])
+    width = max(window_ms // PEAK_BINS_PER_WINDOW, span // values.size + 1, 1)
+    counts = np.bincount((values - values[0]) // width)
+    cumulative = np.concatenate(([0], np.cumsum(counts)))
+
+    def covered(bins):
+        return cumulative[np.minimum(np.arange(counts.size) + bins, counts.size)] - cumulative[:-1]
+
+    peak = max(int(covered(window_ms // width).max()), 1)
+    candidates = np.flatnonzero((counts > 0) & (covered(-(-window_ms // width) + 1) > peak))
+    if not candidates.size:
+        return peak
+
+    # Positions of every error in a candidate bin
+    lengths = counts[candidates]
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.repeat(cumulative[candidates], lengths) + offsets
+    ends = np.searchsorted(values, values[positions] + window_ms, side='left')
+    return max(peak, int((ends - positions).max()))
+
+def _numpy_percentiles(gaps):
+    """
+    Gap percentiles by linear interpolation, like _percentile. np.percentile
+    partitions rather than sorts, so the cost is linear in the number of gaps
+    and does not depend on how large they are
+    """
+    return [float(p) for p in np.percentile(gaps, PERCENTILES)]
+
+def _python_stats(timestamps, window_ms, burst_min_errors):
+    values = sorted(t for t in timestamps if t and t > 0)
+    if not values:
+        return None
+
+    gaps = sorted(b - a for a, b in zip(values, values[1:]))
+    if gaps:
+        percentiles = [_percentile(gaps, q) for q in PERCENTILES]
+        min_gap = gaps[0]
+    else:
+        percentiles, min_gap = [0.0] * len(PERCENTILES), None
+
+    peak_window = burst_windows = 0
+    for i, timestamp in enumerate(values):
+        in_window = bisect_left(values, timestamp + window_ms, i) - i
+        peak_window = max(peak_window, in_window)
+        if in_window >= burst_min_errors:
+            burst_windows += 1
+    return len(values), values[0], values[-1], percentiles, min_gap, peak_window, burst_windows
+
+def _percentile(sorted_values, q):
+    """Linear-interpolated percentile, matching numpy.percentile's default method"""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the error fingerprint engine.
+
+Scales simulated_cloudwatch_logs.json up to N events and measures events/sec for
+the per-event classification work (is_error_log, signature, stack trace files)
+using the original uncompiled helpers and the cached fingerprint module.
+
+Two storm shapes are measured:
+  replayed - the same raw lines repeated, the best case for the raw-message cache
+  varied   - every line gets its own timestamp and request ID, the worst case
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'LambdaFunctions'))
+
+import fingerprint
+
+def legacy_is_error_log(log):
+    if isinstance(log, dict):
+        level = log.get('logLevel', '').upper()
+        message = log.get('message', '').lower()
+        return level in ['ERROR', 'FATAL'] or 'error' in message or 'exception' in message
+    return False
+
+def legacy_get_error_signature(log):
+    message = log.get('message', '')
+    signature = re.sub(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}', '[TIMESTAMP]', message)
+    signature = re.sub(r'\[RequestId: [^\]]+\]', '[REQUEST_ID]', signature)
+    signature = re.sub(r'\b\d+\b', '[NUMBER]', signature)
+    return signature[:200]
+
+def legacy_extract_files_from_stacktrace(log):
+    files = []
+    message = log.get('message', '')
+    patterns = [
+        r'File\s+"([^"]+\.(?:py|js|java|rb|php|go|rs|cpp|c|h))"',
+        r'([/\w.-]+\.(?:py|js|java|rb|php|go|rs|cpp|c|h)):\d+',
+    ]
+    for pattern in patterns:
+        matches = re.findall(pattern, message)
+        files.extend(matches)
+    return list(set(files))
+
+def load_events(path):
+    with open(path) as f:
+        return json.load(f)['logEvents']
+
+def scale_events(base_events, count, varied):
+    """Repeat the base events up to count, optionally making every line unique"""
+    events = []
+    for i in range(count):
+        event = dict(base_events[i % len(base_events)])
+        if varied:
+            # Shift the embedded timestamp and request ID like a real storm would
+            seconds = i % 60
+            event['message'] = re.sub(r':\d{2}\.\d{3}Z', f':{seconds:02d}.{i % 1000:03d}Z', event['message'], count=1)
+            event['message'] = re.sub(r'RequestId: [^\]]+', f'RequestId: req-{i:08x}', event['message'], count=1)
+        events.append(event)
+    return events
+
+def run(events, is_error, signature, files):
+    start = time.perf_counter()
+    for event in events:
+        if is_error(event):
+            signature(event)
+        files(event)
+    return len(events) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--input', default=os.path.join(ROOT, 'simulated_cloudwatch_logs.json'))
+    args = parser.parse_args()
+
+    base_events = load_events(args.input)
+    results = {}
+
+    for shape, varied in (('replayed', False), ('varied', True)):
+        events = scale_events(base_events, args.events, varied)
+
+        # Both implementations must agree before their speed is compared
+        for event in base_events:
+            assert fingerprint.get_error_signature(event) == legacy_get_error_signature(event)
+            assert fingerprint.is_error_log(event) == legacy_is_error_log(event)
+
+        before = run(events, legacy_is_error_log, legacy_get_error_signature, legacy_extract_files_from_stacktrace)
+        fingerprint.clear_caches()
+        after = run(events, fingerprint.is_error_log, fingerprint.get_error_signature, fingerprint.extract_files_from_stacktrace)
+
+        results[shape] = {
+            'events': len(events),
+            'before_events_per_sec': round(before),
+            'after_events_per_sec': round(after),
+            'speedup': round(after / before, 2),
+            'cache': fingerprint.cache_stats()
+        }
+        print(f"{shape:>8}: {before:>12,.0f} -> {after:>12,.0f} events/sec ({after / before:.1f}x)")
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Throughput and peak-memory benchmarks for the processing stages.
+
+Each size runs synthetic_logs events through the source_adapter helpers and
+handler, the error_analyzer analyses and handler, and the summarizer prompt
+builders and handler. S3 is an in-memory stub and Bedrock returns canned
+text, so only local work is measured. Stages are timed first; peak memory is
+measured in a second tracemalloc pass, since tracing slows the code down.
+
+Results are written as sorted JSON so runs from two versions can be diffed,
+or compared directly:
+
+  python benchmarks/run_benchmarks.py --sizes 1000,100000 --output before.json
+  python benchmarks/run_benchmarks.py --sizes 1000,100000 --compare before.json
+
+Events for a size are generated up front; 10M events need several GB.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'LambdaFunctions'))
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
+# The handler modules create their boto3 clients at import
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import source_adapter
+import error_analyzer
+import error_summarizer
+import bedrock_summarizer
+import error_summarizer_updated
+from log_aggregator import LogAggregator
+from event_batch import EventBatch
+from cooccurrence import analyze_cooccurrence
+from time_series import select_series, DEFAULT_RESOLUTION
+from llm_cache import ResponseCache
+from synthetic_logs import iter_log_events, parse_mix
+
+DEFAULT_SIZES = '1000,10000,100000'
+LOG_GROUP = '/aws/lambda/synthetic'
+
+class StubS3:
+    """Keeps written objects in memory; reads of unknown keys raise NoSuchKey"""
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.encode('utf-8')
+        return {'ETag': f'"{len(self.objects)}"'}
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[Key]
+        if Range:
+            first, last = Range[len('bytes='):].split('-')
+            body = body[int(first):int(last) + 1]
+        return {'Body': io.BytesIO(body), 'ETag': None}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b''.join(parts[p['PartNumber']] for p in MultipartUpload['Parts'])
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        return {}
+
+class StubBedrock:
+    """Answers every invoke_model, streamed or not, with the same canned completion"""
+    def __init__(self, text='Canned incident summary.'):
+        self.body = json.dumps({'content': [{'type': 'text', 'text': text}]}).encode('utf-8')
+        delta = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text}}
+        self.chunk = json.dumps(delta).encode('utf-8')
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        return {'body': io.BytesIO(self.body)}
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.calls += 1
+        return {'body': iter([{'chunk': {'bytes': self.chunk}}])}
+
+class Context:
+    aws_request_id = 'benchmark'
+
+def install_stubs():
+    s3, bedrock = StubS3(), StubBedrock()
+    for module in (source_adapter, error_analyzer, error_summarizer, bedrock_summarizer, error_summarizer_updated):
+        module.s3 = s3
+    for module in (error_summarizer, bedrock_summarizer, error_summarizer_updated):
+        module.bedrock = bedrock
+    error_summarizer.exemplar_bedrock = bedrock
+    return s3, bedrock
+
+def prepare(events):
+    """Untimed inputs for every stage, produced by the stages before it"""
+    with redirect_stdout(io.StringIO()):
+        source_output = source_adapter.lambda_handler(
+            {'logData': {'logGroupName': LOG_GROUP, 'logEvents': events}}, Context()
+        )
+        analyzer_output = error_analyzer.lambda_handler(source_output, Context())
+
+    source = source_output['source_adapter_output']
+    analyzer = analyzer_output['error_analyzer_output']
+    error_events = list(error_analyzer.iter_items(error_analyzer.s3, source['error_events']))
+    batch = EventBatch.from_dicts(error_events)
+    return {
+        'events': events,
+        'error_events': error_events,
+        'batch': batch,
+        'source_output': source_output,
+        'analyzer_output': analyzer_output,
+        'source': source,
+        'analyzer': analyzer,
+        'series': select_series(source, DEFAULT_RESOLUTION, source_adapter.s3),
+        'critical_sample': bedrock_summarizer.fetch_slice(bedrock_summarizer.s3, analyzer['critical_errors'], 0, 3)
+    }
+
+def stage_aggregate(inputs):
+    aggregator = LogAggregator()
+    aggregator.consume(inputs['events'])
+    aggregator.to_output(LOG_GROUP)
+
+def stage_source_adapter(inputs):
+    source_adapter.lambda_handler({'logData': {'logGroupName': LOG_GROUP, 'logEvents': inputs['events']}}, Context())
+
+def stage_event_batch(inputs):
+    EventBatch.from_dicts(inputs['error_events'])
+
+def stage_error_analysis(inputs):
+    analysis = error_analyzer.ErrorAnalysis(inputs['batch'])
+    analysis.error_patterns()
+    analysis.severity_distribution()
+    analysis.source_breakdown()
+    analysis.time_analysis()
+    analysis.recommendations()
+
+def stage_cooccurrence(inputs):
+    analyze_cooccurrence(inputs['batch'])
+
+def stage_error_analyzer(inputs):
+    error_analyzer.lambda_handler(inputs['source_output'], Context())
+
+def stage_prompts(inputs):
+    source, analyzer = inputs['source'], inputs['analyzer']
+    deploy = source.get('deploy', {})
+    basic_stats = analyzer.get('basic_stats', {})
+    timeline = error_summarizer.analyze_error_timeline(inputs['series'], deploy)
+    error_summarizer.build_incident_prompt(
+        inputs['series'], source['exemplars'], source['file_hits'], deploy, basic_stats, timeline
+    )
+    for exemplar in source['exemplars'][:5]:
+        error_summarizer.build_error_prompt(exemplar.get('message', ''), deploy, timeline)
+
+    recommendations = analyzer['analysis_results']['recommendations']
+    bedrock_summarizer.build_summary_prompt(analyzer['error_summary'], inputs['critical_sample'], recommendations)
+    error_summarizer_updated.create_summary_prompt(error_summarizer_updated.prepare_llm_input(
+        analyzer['analysis_results'], analyzer['critical_errors'], analyzer['error_summary']
+    ))
+
+def stage_error_summarizer(inputs):
+    # Every run starts cold, so repeats measure the model calls rather than cache hits
+    error_summarizer.RESPONSE_CACHE = ResponseCache()
+    event = dict(inputs['source_output'], **inputs['analyzer_output'])
+    error_summarizer.lambda_handler(event, Context())
+
+# name, stage, input the throughput is counted over
+STAGES = (
+    ('aggregate', stage_aggregate, 'events'),
+    ('source_adapter', stage_source_adapter, 'events'),
+    ('event_batch', stage_event_batch, 'error_events'),
+    ('error_analysis', stage_error_analysis, 'error_events'),
+    ('cooccurrence', stage_cooccurrence, 'error_events'),
+    ('error_analyzer', stage_error_analyzer, 'error_events'),
+    ('prompts', stage_prompts, 'events'),
+    ('error_summarizer', stage_error_summarizer, 'events'),
+)
+
+def measure(stage, inputs, repeat, memory):
+    """Best wall time of repeat runs, then the peak traced allocation of one more run"""
+    best = None
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            stage(inputs)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            try:
+                stage(inputs)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    return best, peak
+
+def run(sizes, stages, options, repeat=3, memory=True):
+    results = {}
+    for size in sizes:
+        install_stubs()
+        inputs = prepare(list(iter_log_events(size, **options)))
+        results[str(size)] = size_results = {}
+        for name, stage, counted in STAGES:
+            if name not in stages:
+                continue
+            items = len(inputs[counted])
+            seconds, peak = measure(stage, inputs, repeat, memory)
+            size_results[name] = {
+                'items': items,
+                'seconds': round(seconds, 6),
+                'items_per_sec': round(items / seconds) if seconds else None,
+                'peak_bytes': peak
+            }
+            print(f"{size:>10,} {name:>16}: {items:>10,} items in {seconds * 1000:>10.1f} ms"
+                  f"{'' if peak is None else f', peak {peak / 2 ** 20:>8.1f} MiB'}", file=sys.stderr)
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline):
+    """Print current/baseline ratios for the stages both runs measured"""
+    print(f"{'size':>10} {'stage':>16} {'time':>8} {'memory':>8}")
+    for size, stages in results.items():
+        for name, current in stages.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            time_ratio = current['seconds'] / before['seconds'] if before['seconds'] else float('nan')
+            memory = '-'
+            if current['peak_bytes'] and before.get('peak_bytes'):
+                memory = f"{current['peak_bytes'] / before['peak_bytes']:.2f}x"
+            print(f"{size:>10} {name:>16} {time_ratio:>7.2f}x {memory:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated event counts')
+    parser.add_argument('--stages', default=','.join(name for name, _, _ in STAGES))
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage; the best is kept')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    parser.add_argument('--mix', type=parse_mix)
+    parser.add_argument('--signatures', type=int, default=50)
+    parser.add_argument('--traceback-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results JSON here instead of stdout')
+    parser.add_argument('--compare', help='results JSON of an earlier run to print ratios against')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = args.stages.split(',')
+    unknown = set(stages) - {name for name, _, _ in STAGES}
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    options = dict(error_rate=args.error_rate, mix=args.mix, signatures=args.signatures,
+                   traceback_rate=args.traceback_rate, seed=args.seed)
+
+    document = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'commit': git_commit(),
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'repeat': args.repeat,
+            'generator': options
+        },
+        'results': run(sizes, stages, options, args.repeat, not args.no_memory)
+    }
+
+    text = json.dumps(document, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as out:
+            out.write(text + '\n')
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(document['results'], json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic CloudWatch logs in the logEvents schema.
+
+Events look like simulated_cloudwatch_logs.json: a timestamped message with a
+RequestId, logLevel, requestId, source and, for failures, errorType. The same
+seed and options always give the same events, so benchmark runs are comparable
+across versions.
+
+  --error-rate       share of events that are ERROR/WARN failures
+  --mix              relative weight per errorType, e.g. TimeoutError=3,ConnectionError=1
+  --signatures       distinct error signatures (after numbers and IDs are masked)
+  --traceback-rate   share of failures carrying a multi-line Python traceback
+                     (tracebacks name one of 20 handler files, adding signature variants)
+
+Usage: python benchmarks/synthetic_logs.py 1000000 --output /tmp/logs-1m.json
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+from datetime import datetime, timezone
+
+DEFAULT_START = 1698345600000
+DEFAULT_INTERVAL_MS = 100
+
+# source, errorType, logLevel, message; {name} varies per signature, {n} per event
+ERROR_KINDS = (
+    ('rds', 'ConnectionError', 'ERROR', 'RDS connection failed: Could not connect to database {name} after {n} ms'),
+    ('lambda', 'TimeoutError', 'ERROR', 'Lambda timeout: Task timed out after {n}.00 seconds in {name}'),
+    ('apigateway', 'ThrottlingException', 'WARN', 'API Gateway throttling detected on {name}: Rate exceeded'),
+    ('iam', 'AccessDenied', 'ERROR', 'IAM permission denied: User is not authorized to perform {name}:GetItem'),
+    ('dynamodb', 'ValidationException', 'ERROR',
+     'DynamoDB operation failed on table {name}: The provided key element does not match the schema'),
+    ('ec2', 'InstanceUnreachable', 'ERROR', 'EC2 instance health check failed: Instance {name} is unreachable'),
+    ('sqs', 'VisibilityTimeoutExceeded', 'WARN', 'SQS visibility timeout exceeded for queue {name} after {n} seconds'),
+)
+INFO_KINDS = (
+    ('lambda', 'Lambda function started successfully'),
+    ('s3', 'S3 object uploaded successfully to bucket: devangel-data'),
+    ('cloudwatch', 'CloudWatch metric published successfully'),
+    ('sns', 'SNS message sent successfully to topic: DevAngelAlerts'),
+    ('stepfunctions', 'Step Function execution completed successfully'),
+    ('elb', 'ELB health check passed for target group'),
+)
+TRACEBACK_FILES = 20
+
+def parse_mix(text):
+    """errorType weights from 'TimeoutError=3,ConnectionError=1'; unnamed types get weight 0"""
+    if not text:
+        return None
+    mix = {}
+    for part in text.split(','):
+        error_type, _, weight = part.partition('=')
+        mix[error_type.strip()] = float(weight or 1)
+    unknown = set(mix) - {kind[1] for kind in ERROR_KINDS}
+    if unknown:
+        raise ValueError(f"Unknown error types in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+def signature_name(index):
+    """Letters-only name, so the fingerprint masking keeps signatures distinct"""
+    letters = []
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters.append(string.ascii_lowercase[remainder])
+    return 'svc' + ''.join(reversed(letters))
+
+def iter_log_events(count, error_rate=0.2, mix=None, signatures=50, traceback_rate=0.1, seed=0,
+                    start=DEFAULT_START, interval_ms=DEFAULT_INTERVAL_MS):
+    """Yield count synthetic events in timestamp order"""
+    rng = random.Random(seed)
+    weights = [(mix or {}).get(kind[1], 0 if mix else 1) for kind in ERROR_KINDS]
+    if not any(weights):
+        raise ValueError('The error mix gives every error type zero weight')
+
+    # Each signature is one error kind with its own name, drawn in proportion to the mix
+    kinds = rng.choices(range(len(ERROR_KINDS)), weights, k=max(signatures, 1))
+    signature_kinds = [(ERROR_KINDS[kind], signature_name(index)) for index, kind in enumerate(kinds)]
+
+    stamp_second = None
+    for i in range(count):
+        timestamp = start + i * interval_ms + rng.randrange(interval_ms)
+        if timestamp // 1000 != stamp_second:
+            stamp_second = timestamp // 1000
+            stamp = datetime.fromtimestamp(stamp_second, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        request_id = f"{rng.getrandbits(48):012x}"
+
+        if rng.random() < error_rate:
+            (source, error_type, level, template), name = signature_kinds[rng.randrange(len(signature_kinds))]
+            text = template.format(name=name, n=rng.randrange(1, 1000))
+            if rng.random() < traceback_rate:
+                module = signature_name(rng.randrange(TRACEBACK_FILES))
+                text += (
+                    "\nTraceback (most recent call last):\n"
+                    f'  File "/var/task/handlers/{module}.py", line {rng.randrange(10, 400)}, in handle\n'
+                    f'  File "/var/task/lib/{source}_client.py", line {rng.randrange(10, 400)}, in call\n'
+                    f"{error_type}: {template.split(':')[0]}"
+                )
+            event = {'timestamp': timestamp, 'logLevel': level, 'requestId': request_id,
+                     'source': source, 'errorType': error_type}
+        else:
+            source, text = INFO_KINDS[rng.randrange(len(INFO_KINDS))]
+            level = 'INFO'
+            event = {'timestamp': timestamp, 'logLevel': level, 'requestId': request_id, 'source': source}
+
+        # Second precision like simulated_cloudwatch_logs.json: the fingerprint
+        # masks the timestamp only up to the seconds
+        event['message'] = f"{stamp}.000Z {level} [RequestId: {request_id}] {text}"
+        yield event
+
+def write_log_file(out, count, log_group='/aws/lambda/synthetic', **options):
+    """Stream events to out as a {logEvents, logGroupName} document without holding them in memory"""
+    out.write('{"logGroupName": ' + json.dumps(log_group) + ', "logEvents": [')
+    for i, event in enumerate(iter_log_events(count, **options)):
+        out.write(('\n' if i == 0 else ',\n') + json.dumps(event))
+    out.write('\n]}\n')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('events', type=int, help='number of events to generate')
+    parser.add_argument('--output', help='write here instead of stdout')
+    parser.add_argument('--error-rate', type=float, default=0.2)
+    parser.add_argument('--mix', type=parse_mix, help='errorType weights, e.g. TimeoutError=3,ConnectionError=1')
+    parser.add_argument('--signatures', type=int, default=50)
+    parser.add_argument('--traceback-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(error_rate=args.error_rate, mix=args.mix, signatures=args.signatures,
+                   traceback_rate=args.traceback_rate, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w') as out:
+            write_log_file(out, args.events, **options)
+    else:
+        write_log_file(sys.stdout, args.events, **options)
+
+if __name__ == '__main__':
+    main()
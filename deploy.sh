@@ -14,70 +14,101 @@ ROLE_ARN="arn:aws:iam::478047815638:role/lambda-execution-role"
 echo "📦 Creating S3 bucket..."
 aws s3 mb s3://$BUCKET --region $REGION 2>/dev/null || echo "Bucket already exists"
 
+# Daily incident index shards expire once they leave the 30-day lookup window
+# (RETENTION_DAYS in incident_index.py). put-bucket-lifecycle-configuration
+# replaces the whole configuration, so merge the rule into whatever rules the
+# bucket already has (a bucket without any reports NoSuchLifecycleConfiguration)
+INDEX_RULE='{"ID":"incident-index-retention","Filter":{"Prefix":"index/incidents/"},"Status":"Enabled","Expiration":{"Days":31}}'
+if ! EXISTING_RULES=$(aws s3api get-bucket-lifecycle-configuration \
+  --bucket $BUCKET \
+  --query Rules \
+  --output json \
+  --region $REGION 2>/tmp/lifecycle_error); then
+  grep -q NoSuchLifecycleConfiguration /tmp/lifecycle_error || { cat /tmp/lifecycle_error >&2; exit 1; }
+  EXISTING_RULES='[]'
+fi
+LIFECYCLE=$(python3 -c '
+import json, sys
+rule = json.loads(sys.argv[2])
+rules = [r for r in json.loads(sys.argv[1]) or [] if r.get("ID") != rule["ID"]]
+print(json.dumps({"Rules": rules + [rule]}))
+' "$EXISTING_RULES" "$INDEX_RULE")
+aws s3api put-bucket-lifecycle-configuration \
+  --bucket $BUCKET \
+  --lifecycle-configuration "$LIFECYCLE" \
+  --region $REGION
+
 # Package and deploy Lambda functions
 cd LambdaFunctions
 
+# Handlers import sibling modules, so each zip carries every module its
+# handler imports, directly or through another module
+INDEX_MODULES="incident_index.py fingerprint.py s3_writer.py instrumentation.py"
+UPDATER_MODULES="anomaly_detector.py time_series.py claim_check.py $INDEX_MODULES"
+
+# package <zip> <files...>: rebuild a zip from scratch so no stale module lingers
+package() {
+  local zip_file=$1
+  shift
+  rm -f "$zip_file"
+  zip -qj "$zip_file" "$@"
+}
+
+# deploy_lambda <function name> <handler module> <timeout>: create or update
+# the function from <handler module>.zip
+deploy_lambda() {
+  aws lambda create-function \
+    --function-name "$1" \
+    --runtime python3.9 \
+    --role $ROLE_ARN \
+    --handler "$2.lambda_handler" \
+    --zip-file "fileb://$2.zip" \
+    --timeout "$3" \
+    --region $REGION 2>/dev/null || \
+  aws lambda update-function-code \
+    --function-name "$1" \
+    --zip-file "fileb://$2.zip" \
+    --region $REGION
+}
+
 echo "📤 Deploying Source Adapter..."
-zip -q source_adapter.zip source_adapter.py
-aws lambda create-function \
-  --function-name SourceAdapter \
-  --runtime python3.9 \
-  --role $ROLE_ARN \
-  --handler source_adapter.lambda_handler \
-  --zip-file fileb://source_adapter.zip \
-  --timeout 60 \
-  --region $REGION 2>/dev/null || \
-aws lambda update-function-code \
-  --function-name SourceAdapter \
-  --zip-file fileb://source_adapter.zip \
-  --region $REGION
+package source_adapter.zip source_adapter.py log_aggregator.py fingerprint.py template_miner.py raw_log_writer.py cloudwatch_ingest.py time_series.py checkpoint.py event_batch.py input_adapters.py heavy_hitters.py anomaly_detector.py claim_check.py s3_writer.py instrumentation.py
+deploy_lambda SourceAdapter source_adapter 60
 
 echo "📤 Deploying Error Analyzer..."
-zip -q error_analyzer.zip error_analyzer.py
-aws lambda create-function \
-  --function-name ErrorAnalyzer \
-  --runtime python3.9 \
-  --role $ROLE_ARN \
-  --handler error_analyzer.lambda_handler \
-  --zip-file fileb://error_analyzer.zip \
-  --timeout 60 \
-  --region $REGION 2>/dev/null || \
-aws lambda update-function-code \
-  --function-name ErrorAnalyzer \
-  --zip-file fileb://error_analyzer.zip \
-  --region $REGION
+package error_analyzer.zip error_analyzer.py event_batch.py timing_analysis.py rule_engine.py error_rules.json claim_check.py cooccurrence.py $INDEX_MODULES
+deploy_lambda ErrorAnalyzer error_analyzer 60
 
 echo "📤 Deploying Error Summarizer..."
-zip -q error_summarizer.zip error_summarizer.py
-aws lambda create-function \
-  --function-name ErrorSummarizer \
-  --runtime python3.9 \
-  --role $ROLE_ARN \
-  --handler error_summarizer.lambda_handler \
-  --zip-file fileb://error_summarizer.zip \
-  --timeout 120 \
-  --region $REGION 2>/dev/null || \
-aws lambda update-function-code \
-  --function-name ErrorSummarizer \
-  --zip-file fileb://error_summarizer.zip \
-  --region $REGION
+package error_summarizer.zip error_summarizer.py time_series.py claim_check.py llm_cache.py bedrock_stream.py fingerprint.py s3_writer.py instrumentation.py
+deploy_lambda ErrorSummarizer error_summarizer 120
+
+echo "📤 Deploying Fast Updater..."
+package fast_updater_email.zip fast_updater_email.py $UPDATER_MODULES
+deploy_lambda FastUpdater fast_updater_email 30
+
+echo "📤 Deploying Enhanced Updater..."
+package enhanced_updater_email.zip enhanced_updater_email.py $UPDATER_MODULES
+deploy_lambda EnhancedUpdater enhanced_updater_email 30
+
+echo "📤 Deploying Dashboard API..."
+package dashboard_api.zip dashboard_api.py bedrock_stream.py $UPDATER_MODULES
+deploy_lambda DashboardAPI dashboard_api 30
+
+# Alternative handlers, deployable in place of EnhancedUpdater or
+# ErrorSummarizer with update-function-code
+echo "📦 Packaging alternative handlers..."
+package enhanced_updater_sms.zip enhanced_updater_sms.py $UPDATER_MODULES
+package enhanced_updater_email_fixed.zip enhanced_updater_email_fixed.py claim_check.py s3_writer.py instrumentation.py
+package email_with_bedrock.zip email_with_bedrock.py claim_check.py s3_writer.py instrumentation.py
+package bedrock_summarizer.zip bedrock_summarizer.py claim_check.py llm_cache.py $INDEX_MODULES
+package error_summarizer_updated.zip error_summarizer_updated.py claim_check.py llm_cache.py $INDEX_MODULES
 
 cd ..
 
 echo "📤 Deploying GitHub Issue Creator..."
-zip -q CreateIssueForQ.zip CreateIssueForQ.py
-aws lambda create-function \
-  --function-name CreateIssueForQ \
-  --runtime python3.9 \
-  --role $ROLE_ARN \
-  --handler CreateIssueForQ.lambda_handler \
-  --zip-file fileb://CreateIssueForQ.zip \
-  --timeout 30 \
-  --region $REGION 2>/dev/null || \
-aws lambda update-function-code \
-  --function-name CreateIssueForQ \
-  --zip-file fileb://CreateIssueForQ.zip \
-  --region $REGION
+package CreateIssueForQ.zip CreateIssueForQ.py LambdaFunctions/instrumentation.py
+deploy_lambda CreateIssueForQ CreateIssueForQ 30
 
 echo "🔧 Creating Step Functions State Machine..."
 aws stepfunctions create-state-machine \
@@ -3,23 +3,208 @@
 Test script to verify the DevAngel pipeline works end-to-end
 """
 
+import gzip
+import io
 import json
 import sys
+import threading
 import os
-from datetime import datetime
+import random
+import re
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
 
-# Add the LambdaFunctions directory to the path
+# Add the LambdaFunctions and benchmarks directories to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'LambdaFunctions'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'benchmarks'))
 
 # Import the Lambda functions
 import source_adapter
 import error_analyzer
+import error_summarizer
+import bedrock_summarizer
+from log_aggregator import LogAggregator
+from template_miner import TemplateMiner
+from raw_log_writer import RawLogWriter, iter_raw_events, MIN_PART_SIZE
+from cloudwatch_ingest import iter_log_group_events
+from event_batch import EventBatch
+from archive_reader import ArchiveReader
+from timing_analysis import analyze_timing
+from cooccurrence import analyze_cooccurrence
+from rule_engine import RuleSet, load_rules
+from anomaly_detector import SpikeDetector, determine_severity, load_detector, save_detector
+from input_adapters import IsoTimestampDecoder, detect_adapter, normalize_log_data
+from claim_check import check_in, fetch_slice, is_claim_check, iter_items, INDEX_STRIDE
+from s3_writer import put_objects
+from incident_index import IncidentIndex, load_index, record_incident, link_incident, update_index, shard_key, RETENTION_DAYS
+from fingerprint import signature_for_message
+from time_series import select_series, chart_rollups
+from synthetic_logs import iter_log_events
+import instrumentation
+import dashboard_api
+from llm_cache import ResponseCache
+from bedrock_stream import PartialSummaryWriter, iter_text_deltas
 
 class MockContext:
     """Mock AWS Lambda context for testing"""
     def __init__(self):
         self.aws_request_id = f"test-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
 
+class FakeS3:
+    """In-memory stand-in for the S3 calls used by the Lambda functions"""
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+    
+    def __init__(self):
+        self.objects = {}
+        self.etags = {}
+        self.writes = 0
+        self.uploads = {}
+    
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if (IfNoneMatch == '*' and Key in self.objects) or (IfMatch and self.etags.get(Key) != IfMatch):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.encode('utf-8')
+        self.writes += 1
+        self.etags[Key] = f'"{self.writes}"'
+        return {'ETag': self.etags[Key]}
+    
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        body = self.objects[Key]
+        if Range:
+            first, last = Range[len('bytes='):].split('-')
+            body = body[int(first):int(last) + 1]
+        return {'Body': io.BytesIO(body), 'ETag': self.etags.get(Key)}
+    
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+    
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'"{UploadId}-{PartNumber}"'}
+    
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        # Like S3, every part but the last must be at least 5 MiB
+        sizes = [len(parts[p['PartNumber']]) for p in MultipartUpload['Parts']]
+        if any(size < 5 * 1024 * 1024 for size in sizes[:-1]):
+            raise ClientError({'Error': {'Code': 'EntityTooSmall'}}, 'CompleteMultipartUpload')
+        self.objects[Key] = b''.join(parts[p['PartNumber']] for p in MultipartUpload['Parts'])
+        return {}
+    
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        return {}
+
+class StubBedrock:
+    """
+    Bedrock stand-in; respond(prompt) gives the delay in seconds and the reply
+    text. max_in_flight is the most calls that were ever underway at once.
+    """
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+    
+    def invoke_model(self, modelId, body):
+        text = self._reply(body)
+        return {'body': io.BytesIO(json.dumps({'content': [{'type': 'text', 'text': text}]}).encode('utf-8'))}
+    
+    def invoke_model_with_response_stream(self, modelId, body):
+        """The reply as a local event stream of 16-character text deltas"""
+        return {'body': iter(stream_events(self._reply(body)))}
+    
+    def _reply(self, body):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay, text = self.respond(json.loads(body)['messages'][0]['content'])
+            time.sleep(delay)
+            return text
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+def stream_events(text, size=16):
+    events = [{'type': 'message_start'}, {'type': 'content_block_start', 'index': 0}]
+    events += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text[i:i + size]}}
+               for i in range(0, len(text), size)]
+    events += [{'type': 'content_block_stop', 'index': 0}, {'type': 'message_stop'}]
+    return [{'chunk': {'bytes': json.dumps(event).encode('utf-8')}} for event in events]
+
+def select_result(state, result, machine='state_machine_complete.json'):
+    """A task result as a state machine's ResultSelector passes it on"""
+    with open(os.path.join(os.path.dirname(__file__), 'LambdaFunctions', machine)) as f:
+        selector = json.load(f)['States'][state]['ResultSelector']
+    selected = {}
+    for name, path in selector.items():
+        value = result
+        for part in path[len('$.'):].split('.'):
+            value = value[part]
+        selected[name[:-len('.$')]] = value
+    return selected
+
+def baseline_exemplars(logs, max_exemplars=10):
+    """Exemplars as the original source adapter picked them: the first error of each exact signature"""
+    groups = {}
+    for log in logs:
+        level = log.get('logLevel', '').upper()
+        message = log.get('message', '')
+        if level not in ['ERROR', 'FATAL'] and 'error' not in message.lower() and 'exception' not in message.lower():
+            continue
+        signature = re.sub(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}', '[TIMESTAMP]', message)
+        signature = re.sub(r'\[RequestId: [^\]]+\]', '[REQUEST_ID]', signature)
+        signature = re.sub(r'\b\d+\b', '[NUMBER]', signature)[:200]
+        groups.setdefault(signature, log)
+    return list(groups.values())[:max_exemplars]
+
+class StubLogsClient:
+    """Offline stand-in for CloudWatch Logs with paged FilterLogEvents responses"""
+    def __init__(self, streams=8, events_per_stream=2000, page_size=500, latency=0.002):
+        self.page_size = page_size
+        self.latency = latency
+        self.streams = {}
+        for s in range(streams):
+            self.streams[f"2023/10/26/[$LATEST]stream{s}"] = [
+                {
+                    'timestamp': 1698345600000 + i * 100,
+                    'message': f"2023-10-26T12:00:00.000Z {'ERROR' if i % 4 == 0 else 'INFO'} "
+                               f"[RequestId: s{s}-{i}] Lambda timeout: TimeoutError after {i % 30} seconds\n",
+                    'logStreamName': f"2023/10/26/[$LATEST]stream{s}"
+                }
+                for i in range(events_per_stream)
+            ]
+    
+    def describe_log_streams(self, logGroupName, **kwargs):
+        return {'logStreams': [
+            {'logStreamName': name, 'lastEventTimestamp': events[-1]['timestamp']}
+            for name, events in self.streams.items()
+        ]}
+    
+    def filter_log_events(self, logGroupName, logStreamNames, startTime, endTime, filterPattern=None, nextToken=None):
+        time.sleep(self.latency)
+        events = [
+            e for name in logStreamNames for e in self.streams[name]
+            if startTime <= e['timestamp'] <= endTime and (not filterPattern or 'ERROR' in e['message'])
+        ]
+        start = int(nextToken or 0)
+        page = events[start:start + self.page_size]
+        response = {'events': page}
+        if start + self.page_size < len(events):
+            response['nextToken'] = str(start + self.page_size)
+        return response
+
 def test_source_adapter():
     """Test the source adapter with simulated logs"""
     print("🔍 Testing Source Adapter...")
@@ -43,6 +228,945 @@ def test_source_adapter():
         print(f"❌ Source Adapter Failed: {str(e)}")
         return None
 
+def test_log_aggregator():
+    """Test the single-pass aggregator against the list-based helpers"""
+    print("\n🔍 Testing Log Aggregator...")
+    
+    log_events = source_adapter.get_embedded_simulated_logs()['logEvents']
+    
+    try:
+        # Feed events through a generator so nothing is materialized up front
+        aggregator = LogAggregator().consume(event for event in log_events)
+        output = aggregator.to_output('/aws/lambda/devangel-functions')
+        
+        error_events = [e for e in log_events if e.get('logLevel') in ['ERROR', 'WARN']]
+        assert output['series'] == source_adapter.generate_error_series(log_events)
+        assert output['file_hits'] == source_adapter.count_file_hits(log_events)
+        # Every embedded error is distinct, so mined templates must pick the same
+        # exemplars, in first-seen order, as exact-signature grouping did
+        expected = [e['message'] for e in baseline_exemplars(log_events)]
+        assert len(expected) == 5
+        assert [e['message'] for e in output['exemplars']] == expected
+        assert [e['message'] for e in source_adapter.extract_exemplars(error_events)] == expected
+        assert output['summary']['total_events'] == len(log_events)
+        
+        # Every rollup comes from the same pass and accounts for the same errors
+        rollups = output['series_rollups']
+        assert rollups['1m'] == output['series']
+        assert len({sum(count for _, count in points) for points in rollups.values()}) == 1
+        assert rollups['10s'][0][0] == '2023-10-26 18:40:00', rollups['10s'][0]
+        assert len(output['error_events']) == len(error_events)
+        
+        print(f"✅ Log Aggregator Success!")
+        print(f"   - Aggregated {output['summary']['total_events']} events in one pass")
+        
+        return True
+        
+    except AssertionError as e:
+        print(f"❌ Log Aggregator Failed: output does not match list-based helpers {e}")
+        return False
+
+def test_template_miner():
+    """Test that near-identical errors share a template and rank by volume"""
+    print("\n🔍 Testing Template Miner...")
+    
+    miner = TemplateMiner()
+    miner.add("ERROR [RequestId: a1] RDS connection failed for /db/orders", 1000)
+    for i in range(3):
+        miner.add(f"ERROR [RequestId: b{i}] Lambda timeout in handler /var/task/app_{i}.py", 2000 + i)
+    
+    top = miner.top(1)[0]
+    assert top.count == 3, top.to_dict()
+    assert top.first_seen == 2000 and top.last_seen == 2002
+    assert len(miner.templates) == 2
+    
+    # A storm of one-off messages must not push out the heavy hitters or grow the miner
+    miner = TemplateMiner(max_templates=20, sample_size=3)
+    for i in range(20000):
+        if i % 4 == 0:
+            message = f"ERROR Lambda timeout in handler after {i} ms"
+        elif i % 4 == 1:
+            message = f"ERROR RDS connection refused on attempt {i}"
+        else:
+            word = ''.join(chr(97 + (i >> shift) % 26) for shift in (0, 5, 10))
+            message = f"ERROR unexpected{word} token{word} in{word}"
+        miner.add(message, i, {'index': i})
+    
+    heavy = miner.top(2)
+    assert len(miner.templates) <= 20
+    assert {t.template.split()[1] for t in heavy} == {'Lambda', 'RDS'}, [t.to_dict() for t in heavy]
+    assert all(t.count - t.overcount <= 5000 <= t.count for t in heavy)
+    assert all(len(t.samples.items) == 3 for t in heavy)
+    assert any(t.sample['index'] >= 4 for t in heavy)
+    
+    restored = TemplateMiner(max_templates=20, sample_size=3).load_state(miner.to_state())
+    snapshot = lambda t: (t.template, t.count, t.overcount, t.sample)
+    assert [snapshot(t) for t in restored.top(2)] == [snapshot(t) for t in heavy]
+    
+    print(f"✅ Template Miner Success!")
+    print(f"   - Top template: {top.template}")
+    print(f"   - Storm of 20000 lines kept {len(miner.templates)} templates, top count {heavy[0].count}")
+    return True
+
+def test_raw_log_writer():
+    """Test streaming events to S3 as gzip NDJSON through a multipart upload"""
+    print("\n🔍 Testing Raw Log Writer...")
+    
+    fake_s3 = FakeS3()
+    base_events = source_adapter.get_embedded_simulated_logs()['logEvents']
+    # Random payloads keep the compressed artifact above one minimum-size part
+    rng = random.Random(4)
+    log_events = [
+        dict(base_events[i % len(base_events)], requestId=f"req-{i:06d}", timestamp=1698345600000 + i,
+             message=f"{base_events[i % len(base_events)]['message']} {rng.randbytes(1024).hex()}")
+        for i in range(8000)
+    ]
+    
+    # Parts below the S3 minimum are refused up front rather than at completion
+    try:
+        RawLogWriter(fake_s3, 'test-bucket', 'raw-logs/small.ndjson.gz', part_size=1024)
+        assert False, 'undersized parts must be rejected'
+    except ValueError:
+        pass
+    
+    # The smallest part size S3 accepts sends the artifact through the multipart path
+    with RawLogWriter(fake_s3, 'test-bucket', 'raw-logs/test.ndjson.gz', part_size=MIN_PART_SIZE) as writer:
+        aggregator = LogAggregator().consume(log_events, sink=writer.write)
+        artifact = writer.close()
+    
+    assert artifact['count'] == len(log_events)
+    assert artifact['parts'] > 1, artifact
+    
+    lines = gzip.decompress(fake_s3.objects['raw-logs/test.ndjson.gz']).splitlines()
+    assert len(lines) == len(log_events)
+    
+    # Error events are referenced by offset instead of being stored twice
+    offsets = aggregator.error_offsets[:3]
+    for offset, event in iter_raw_events(fake_s3, 'test-bucket', 'raw-logs/test.ndjson.gz', offsets):
+        assert event['logLevel'] in ['ERROR', 'WARN']
+        assert event['message'] == log_events[offset]['message']
+    
+    print(f"✅ Raw Log Writer Success!")
+    print(f"   - Wrote {artifact['count']} events in {artifact['parts']} parts ({artifact['compressed_bytes']} bytes)")
+    return True
+
+def test_cloudwatch_ingest():
+    """Test concurrent FilterLogEvents ingestion against the stub Logs client"""
+    print("\n🔍 Testing CloudWatch Logs Ingestion...")
+    
+    logs_client = StubLogsClient()
+    start = time.perf_counter()
+    events = iter_log_group_events(logs_client, '/aws/lambda/devangel-functions', 1698345600000, 1698345900000)
+    aggregator = LogAggregator().consume(events)
+    elapsed = time.perf_counter() - start
+    
+    # The ERROR pattern is pushed down, so only every fourth event comes back
+    assert aggregator.total_events == 8 * 2000 // 4, aggregator.total_events
+    assert aggregator.level_counts['ERROR'] == aggregator.total_events
+    assert aggregator.error_events[0]['source'] == 'lambda'
+    assert aggregator.error_events[0]['errorType'] == 'TimeoutError'
+    
+    print(f"✅ CloudWatch Logs Ingestion Success!")
+    print(f"   - Ingested {aggregator.total_events} events at {aggregator.total_events / elapsed:,.0f} events/sec")
+    return True
+
+def test_checkpointed_runs():
+    """Test that checkpointed runs only process the delta and merge aggregates"""
+    print("\n🔍 Testing Checkpointed Processing...")
+    
+    log_data = source_adapter.get_embedded_simulated_logs()
+    log_events = log_data['logEvents']
+    full_run = LogAggregator().consume(log_events).to_output(log_data['logGroupName'])
+    
+    class FailingArtifactS3(FakeS3):
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            if Key.startswith('raw-logs/') and Key.endswith('.json'):
+                raise RuntimeError('S3 unavailable')
+            return super().put_object(Bucket, Key, Body, **kwargs)
+    
+    real_s3 = source_adapter.s3
+    source_adapter.s3 = FakeS3()
+    try:
+        # The first run sees part of the incident, the second sees all of it again
+        first = source_adapter.lambda_handler(
+            {'checkpoint': True, 'logData': dict(log_data, logEvents=log_events[:5])}, MockContext()
+        )['source_adapter_output']
+        
+        # A run whose artifacts fail to write leaves the checkpoint and the baseline where they were
+        failing = FailingArtifactS3()
+        failing.objects = source_adapter.s3.objects
+        saved = {key: body for key, body in failing.objects.items() if key.startswith(('checkpoints/', 'baselines/'))}
+        source_adapter.s3, stored = failing, FakeS3()
+        with redirect_stdout(io.StringIO()):
+            failed = source_adapter.lambda_handler({'checkpoint': True, 'logData': log_data}, MockContext())
+        assert 'error' in failed['source_adapter_output']['summary']
+        assert len(saved) == 2 and all(failing.objects[key] == body for key, body in saved.items())
+        stored.objects = failing.objects
+        source_adapter.s3 = stored
+        
+        second = source_adapter.lambda_handler(
+            {'checkpoint': True, 'logData': log_data}, MockContext()
+        )['source_adapter_output']
+    finally:
+        source_adapter.s3 = real_s3
+    
+    assert first['summary']['delta_events'] == 5
+    assert second['summary']['delta_events'] == len(log_events) - 5, second['summary']
+    assert second['summary']['total_events'] == len(log_events)
+    assert second['summary']['error_count'] == full_run['summary']['error_count']
+    assert second['series_rollups'] == full_run['series_rollups']
+    assert [e['message'] for e in second['exemplars']] == [e['message'] for e in full_run['exemplars']]
+    assert second['summary']['checkpoint']['runs'] == 2
+    
+    print(f"✅ Checkpointed Processing Success!")
+    print(f"   - Second run processed {second['summary']['delta_events']} new events of {len(log_events)}")
+    return True
+
+def test_event_batch():
+    """Test that analyzers give the same answers over columns as over dicts"""
+    print("\n🔍 Testing Columnar Event Batch...")
+    
+    log_events = source_adapter.get_embedded_simulated_logs()['logEvents']
+    aggregated = LogAggregator().consume(log_events).to_output('test')['error_events']
+    error_events = aggregated.to_dicts()
+    batch = EventBatch.from_dicts(error_events)
+    
+    assert len(batch) == len(error_events)
+    assert batch[0].to_dict() == error_events[0]
+    assert batch.to_dicts() == error_events
+    assert [json.loads(line) for line in aggregated.json_lines()] == error_events
+    
+    # Missing sources and error types read the same over columns and over dicts
+    untyped = [{'timestamp': 1, 'logLevel': 'ERROR', 'message': 'boom'}, {'logLevel': 'WARN', 'source': None}]
+    analyze_patterns = lambda events: error_analyzer.analyze_error_patterns(events)['pattern_details']
+    assert analyze_patterns(EventBatch.from_dicts(untyped)) == analyze_patterns(untyped) == {'Unknown:Unknown': 2}
+    for analyze in [error_analyzer.analyze_error_patterns, error_analyzer.analyze_severity_distribution,
+                    error_analyzer.analyze_error_sources, error_analyzer.analyze_error_timing,
+                    error_analyzer.generate_recommendations, error_analyzer.get_most_common_source]:
+        assert analyze(batch) == analyze(error_events), analyze.__name__
+    
+    critical = [e for e in error_events if e.get('errorType') in error_analyzer.RULES.critical_error_types]
+    assert [error_events[i] for i in error_analyzer.ErrorAnalysis(batch).critical_indices] == critical
+    
+    print(f"✅ Columnar Event Batch Success!")
+    print(f"   - {len(batch)} events across {len(batch.interners['source'].values) - 1} interned sources")
+    return True
+
+def test_input_adapters():
+    """Test that Logs Insights payloads decode into the same shape as logEvents"""
+    print("\n🔍 Testing Input Adapters...")
+    
+    with open(os.path.join(os.path.dirname(__file__), 'LambdaFunctions', 'cloudwatch_test.json')) as f:
+        incident_input = json.load(f)['incident_input']
+    
+    assert detect_adapter(incident_input).schema == 'insights'
+    assert detect_adapter(source_adapter.get_embedded_simulated_logs()).schema == 'logEvents'
+    
+    decode = IsoTimestampDecoder()
+    for value in ['2025-10-25T21:54:30.123Z', '2025-10-25T21:54:30Z', '2025-10-25 21:54:30.1',
+                  '2025-10-25T23:54:30.123456+02:00', '2025-10-25T16:54:30-05:00']:
+        expected = datetime.fromisoformat(value.replace('Z', '+00:00').ljust(19))
+        if expected.tzinfo is None:
+            expected = expected.replace(tzinfo=timezone.utc)
+        assert decode(value) == int(expected.timestamp() * 1000), value
+    assert decode('not a timestamp') is None
+    
+    log_data = normalize_log_data(incident_input)
+    log_events = list(log_data['logEvents'])
+    assert log_data['deploy']['sha'] == incident_input['deploy']['sha']
+    assert all(isinstance(log_event['timestamp'], int) for log_event in log_events)
+    assert log_events[1]['errorType'] == 'TimeoutError'
+    
+    output = LogAggregator().consume(log_events).to_output('/aws/lambda/payment-service')
+    assert output['summary']['total_events'] == len(incident_input['logs'])
+    assert output['series'] and output['exemplars']
+    
+    print(f"✅ Input Adapters Success!")
+    print(f"   - {len(log_events)} Insights records, {output['summary']['error_count']} errors")
+    return True
+
+def test_archive_reader(tmp_dir='/tmp'):
+    """Test that a memory-mapped archive streams the same events as json.load"""
+    print("\n🔍 Testing Archive Reader...")
+    
+    archive_path = os.path.join(os.path.dirname(__file__), 'simulated_cloudwatch_logs.json')
+    with open(archive_path) as f:
+        archive = json.load(f)
+    assert list(ArchiveReader(archive_path)) == archive['logEvents']
+    
+    # Tiny chunks split events, numbers and multi-byte characters across reads
+    log_events = [dict(log_event, message=log_event['message'] + ' — café') for log_event in archive['logEvents']]
+    path = os.path.join(tmp_dir, f'devangel-archive-{os.getpid()}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'logEvents': log_events, 'logGroupName': '/aws/lambda/replay', 'deploy': {'sha': 'abc'}},
+                  f, ensure_ascii=False, indent=1)
+    try:
+        reader = ArchiveReader(path, chunk_size=7)
+        assert list(reader) == log_events
+        assert reader.metadata == {'logGroupName': '/aws/lambda/replay', 'deploy': {'sha': 'abc'}}
+        assert reader.bytes_read == os.path.getsize(path)
+    finally:
+        os.remove(path)
+    
+    print(f"✅ Archive Reader Success!")
+    print(f"   - Streamed {len(log_events)} events in 7-byte chunks")
+    return True
+
+def test_timing_analysis():
+    """Test that timing analytics ignore arrival order and agree with and without NumPy"""
+    print("\n🔍 Testing Timing Analysis...")
+    
+    base = 1698345600000
+    # Two interleaved streams: a steady trickle and a 30-error burst
+    timestamps = [base + i * 20000 for i in range(30)] + [base + 300000 + i * 500 for i in range(30)]
+    shuffled = timestamps[1::2] + timestamps[::2] + [0, None]
+    
+    timing = analyze_timing(shuffled, source_counts={'lambda': 30, 'rds': 30})
+    assert timing == analyze_timing(sorted(timestamps), source_counts={'lambda': 30, 'rds': 30})
+    assert timing == analyze_timing(shuffled, source_counts={'lambda': 30, 'rds': 30}, use_numpy=False)
+    assert timing['error_frequency'] == 60 and timing['burst_detected']
+    assert timing['gap_percentiles_seconds']['p50'] == 0.5
+    assert timing['peak_errors_in_window'] >= 30
+    assert timing['source_rates_per_minute']['rds'] == round(30 / (timing['time_span_seconds'] / 60), 3)
+    assert analyze_timing([0, None]) is None
+    
+    # A few errors spread over an hour give large gaps; both paths still agree
+    sparse = [base, base + 1234567, base + 2400001, base + 3599999]
+    assert analyze_timing(sparse) == analyze_timing(sparse, use_numpy=False)
+
+    # A steady trickle with a spike straddling window boundaries: the NumPy path
+    # counts only the windows its bin bounds cannot rule out, and still finds the peak
+    spiky = [base + i * 1000 for i in range(3600)] + [base + 1800000 + i * 317 for i in range(400)]
+    assert analyze_timing(spiky[::-1]) == analyze_timing(spiky, use_numpy=False)
+    assert analyze_timing(spiky)['peak_errors_in_window'] == 60 + 190
+
+    print(f"✅ Timing Analysis Success!")
+    print(f"   - Gap percentiles: {timing['gap_percentiles_seconds']}, peak {timing['peak_errors_in_window']} per minute")
+    return True
+
+def test_anomaly_detector():
+    """Test that severity follows deviation from a persisted per-service baseline"""
+    print("\n🔍 Testing Anomaly Detector...")
+    
+    start = 1698345600
+    # A busy service: 40 +/- 3 errors a minute for two hours is its normal
+    busy = {start + i * 60: 37 + (i * 5) % 7 for i in range(120)}
+    s3 = FakeS3()
+    detector = load_detector(s3, 'bucket', '/aws/lambda/busy')
+    assert detector.observe(busy)['severity'] == 'low'
+    save_detector(s3, 'bucket', detector)
+    
+    # 45 errors is business as usual there but a spike for a quiet service
+    restored = load_detector(s3, 'bucket', '/aws/lambda/busy')
+    assert restored.baseline.to_dict() == detector.baseline.to_dict()
+    assert restored.observe({start + 119 * 60: 40, start + 120 * 60: 45})['severity'] == 'low'
+    # The newest bucket may still be filling: it is scored, and folded in once a later run closes it
+    assert restored.baseline.last_bucket == start + 119 * 60
+    assert restored.observe({start + 120 * 60: 45, start + 121 * 60: 400})['severity'] == 'critical'
+    assert restored.baseline.last_bucket == start + 120 * 60
+    # Buckets already folded in are not counted twice
+    assert restored.observe({start + 120 * 60: 45})['severity'] is None
+    
+    quiet = SpikeDetector('/aws/lambda/quiet')
+    quiet.observe({start + i * 60: i % 2 for i in range(60)})
+    spike = quiet.observe({start + 60 * 60: 45})
+    assert spike['severity'] == 'critical' and spike['peak_count'] == 45
+    
+    # No warm baseline yet: the static error-count thresholds still apply
+    cold = SpikeDetector('/aws/lambda/new').observe({start: 45})
+    assert cold['method'] == 'static' and cold['baseline_buckets'] == 0
+    assert determine_severity({'basic_stats': {'total_errors': 7}}, cold) == 'high'
+    assert determine_severity({}, spike) == 'critical'
+    
+    print(f"✅ Anomaly Detector Success!")
+    print(f"   - Quiet service spike z={spike['peak_z_score']} over baseline {spike['baseline_mean']}")
+    return True
+
+def test_rule_engine():
+    """Test that the compiled rule table matches by errorType, keyword phrase and source"""
+    print("\n🔍 Testing Rule Engine...")
+    
+    assert load_rules() is load_rules()
+    
+    # Hundreds of generated rules plus a few hand-written ones
+    specs = [{'id': f'internal-{i}', 'error_types': [f'Internal{i}Error'], 'keywords': [f'subsystem {i} down'],
+              'severity': 'Low'} for i in range(500)]
+    specs += [
+        {'id': 'timeout', 'error_types': ['TimeoutError'], 'keywords': ['timed out'], 'severity': 'High', 'critical': True},
+        {'id': 'rds', 'sources': ['rds'], 'severity': 'High'}
+    ]
+    rules = RuleSet(specs)
+    
+    assert rules.match('Internal421Error').id == 'internal-421'
+    assert rules.match(None, 'lambda', 'Task timed out after 30s').id == 'timeout'
+    assert rules.match(None, 'lambda', 'ALERT: Subsystem 77 down since 12:00').id == 'internal-77'
+    # Typed rules win over keywords, keywords over source, earlier rules over later ones
+    assert rules.match('Internal3Error', 'rds', 'request timed out').id == 'internal-3'
+    assert rules.match(None, 'rds', 'request timed out, subsystem 9 down').id == 'internal-9'
+    assert rules.match(None, 'rds', 'slow query').id == 'rds'
+    assert rules.match(None, 'lambda', 'timed') is None
+    assert rules.critical_error_types == {'TimeoutError'}
+    
+    untyped = [{'timestamp': 1, 'message': '[ERROR] Timeout connecting to payment service', 'source': 'lambda'}]
+    # A keyword match sets severity and recommendations; only errorType makes an event critical
+    for events in (untyped, EventBatch.from_dicts(untyped)):
+        analysis = error_analyzer.ErrorAnalysis(events)
+        assert analysis.critical_indices == []
+        assert analysis.severity_distribution()['high_severity_count'] == 1
+        assert analysis.recommendations()[0]['affected_count'] == 1
+    
+    print(f"✅ Rule Engine Success!")
+    print(f"   - {len(rules.rules)} rules compiled, {len(rules.by_error_type)} error types indexed")
+    return True
+
+def test_claim_check():
+    """Test that bulky arrays pass between stages as S3 references with ranged slice reads"""
+    print("\n🔍 Testing Claim-Check Payloads...")
+    
+    s3 = FakeS3()
+    items = [{'i': i, 'message': f"event {i} " + 'x' * (i % 13)} for i in range(3 * INDEX_STRIDE + 17)]
+    assert check_in(s3, 'bucket', 'small.ndjson', items[:5]) == items[:5]
+    assert 'small.ndjson' not in s3.objects
+    
+    ref = check_in(s3, 'bucket', 'big.ndjson', items)
+    assert is_claim_check(ref) and ref['count'] == len(items)
+    assert len(json.dumps(ref)) < 1024
+    assert list(iter_items(s3, ref)) == items
+    for start, stop in [(0, 3), (INDEX_STRIDE - 1, INDEX_STRIDE + 1), (300, 700), (-5, None), (10, 10)]:
+        assert fetch_slice(s3, ref, start, stop) == items[start:stop], (start, stop)
+    
+    # The same incident through both stages, inline and claim-checked
+    real_s3 = source_adapter.s3, error_analyzer.s3
+    source_adapter.s3 = error_analyzer.s3 = s3
+    try:
+        outputs = {}
+        for mode in (False, True):
+            source_output = source_adapter.lambda_handler({'claimCheck': mode}, MockContext())
+            analyzer_output = error_analyzer.lambda_handler(
+                dict(source_output, claimCheck=mode), MockContext()
+            )['error_analyzer_output']
+            outputs[mode] = source_output['source_adapter_output'], analyzer_output
+    finally:
+        source_adapter.s3, error_analyzer.s3 = real_s3
+    
+    (inline_source, inline), (checked_source, checked) = outputs[False], outputs[True]
+    # The runs were processed at different times
+    unstamped = lambda events: [dict(e, processed_at=None) for e in events]
+    assert is_claim_check(checked_source['error_events']) and is_claim_check(checked['critical_errors'])
+    assert unstamped(iter_items(s3, checked_source['error_events'])) == unstamped(inline_source['error_events'])
+    assert unstamped(fetch_slice(s3, checked['critical_errors'], 0, 3)) == unstamped(inline['critical_errors'][:3])
+    assert checked['error_summary'] == inline['error_summary']
+    assert checked['critical_issues_count'] == inline['critical_issues_count'] > 0
+    assert checked['analysis_results']['error_patterns'] == inline['analysis_results']['error_patterns']
+    assert set(checked) == set(inline)
+    assert 'pattern_details' not in checked['analysis_results']['error_patterns']
+    
+    # Claim-checked rollups read back as the inline points
+    assert all(is_claim_check(rollup) for rollup in checked_source['series_rollups'].values())
+    assert checked_source['series'] == checked_source['series_rollups']['1m']
+    assert chart_rollups(checked_source, s3) == inline_source['series_rollups']
+    assert select_series(checked_source, '10s', s3) == inline_source['series_rollups']['10s']
+    indexed = load_index(s3, 'bucket').rows
+    assert indexed and {row['keys']['critical'] for row in indexed} >= {checked['critical_errors']['key']}
+    
+    # A summarizer fed the payload the ErrorAnalyzer selector passes on still
+    # sees the critical errors and the recommendations
+    prompts = []
+    def respond(prompt):
+        prompts.append(prompt)
+        return 0, 'executive summary'
+    
+    original = (bedrock_summarizer.s3, bedrock_summarizer.bedrock, bedrock_summarizer.RESPONSE_CACHE)
+    bedrock_summarizer.s3, bedrock_summarizer.bedrock = s3, StubBedrock(respond)
+    bedrock_summarizer.RESPONSE_CACHE = ResponseCache()
+    try:
+        for machine in ('state_machine_complete.json', 'state_machine_progressive.json'):
+            selected = select_result('ErrorAnalyzer', {'error_analyzer_output': checked}, machine)
+            summary = bedrock_summarizer.lambda_handler({'error_analyzer_output': selected}, MockContext())
+            assert summary['error_summarizer_output']['github_issue_data']['priority'] == 'high'
+    finally:
+        bedrock_summarizer.s3, bedrock_summarizer.bedrock, bedrock_summarizer.RESPONSE_CACHE = original
+    recommendation = checked['analysis_results']['recommendations'][0]['recommendation']
+    critical = fetch_slice(s3, checked['critical_errors'], 0, 1)[0]
+    assert len(prompts) == 1 and recommendation in prompts[0] and critical['message'][:100] in prompts[0]
+    
+    print(f"✅ Claim-Check Payloads Success!")
+    print(f"   - {len(items)} items behind a {len(json.dumps(ref))}-byte reference")
+    return True
+
+def test_s3_writer():
+    """Test that independent S3 writes overlap and report per-object latency"""
+    print("\n🔍 Testing Concurrent S3 Writes...")
+    
+    class SlowS3(FakeS3):
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            time.sleep(0.05)
+            if Key == 'broken.json':
+                raise IOError('write failed')
+            return super().put_object(Bucket, Key, Body, **kwargs)
+    
+    s3 = SlowS3()
+    objects = [{'Key': f"incidents/{i}.json", 'Body': json.dumps({'i': i}), 'ContentType': 'application/json'}
+               for i in range(8)]
+    started = time.perf_counter()
+    latencies = put_objects(s3, 'bucket', objects + [None])
+    elapsed = time.perf_counter() - started
+    
+    assert list(latencies) == [o['Key'] for o in objects]
+    assert all(seconds >= 0.05 for seconds in latencies.values())
+    assert elapsed < 0.05 * len(objects) / 2, elapsed
+    assert json.loads(s3.objects['incidents/7.json']) == {'i': 7}
+    
+    # A failed write surfaces once the others have landed
+    try:
+        put_objects(s3, 'bucket', [{'Key': 'broken.json', 'Body': '{}'}, {'Key': 'latest.json', 'Body': '{}'}])
+        assert False, 'write error was swallowed'
+    except IOError:
+        pass
+    assert 'latest.json' in s3.objects
+    
+    print(f"✅ Concurrent S3 Writes Success!")
+    print(f"   - {len(objects)} writes of ~50 ms each finished in {elapsed * 1000:.0f} ms")
+    return True
+
+def test_incident_index():
+    """Test cross-incident lookups against the daily sorted index shards"""
+    print("\n🔍 Testing Incident Index...")
+    
+    s3 = FakeS3()
+    timeout = {'message': '[ERROR] Task timed out after 30.00 seconds', 'source': 'lambda', 'errorType': 'TimeoutError'}
+    denied = {'message': '[ERROR] User 4411 is not authorized', 'source': 'iam', 'errorType': 'AccessDenied'}
+    first = [dict(timeout, timestamp=1000), dict(timeout, timestamp=1500), dict(denied, timestamp=1200)]
+    second = [dict(timeout, timestamp=9000, message='[ERROR] Task timed out after 29.50 seconds')]
+    
+    assert record_incident(s3, 'bucket', first, 'run-1', {'analysis': 'error-analysis/run-1.json'}) == 2
+    assert record_incident(s3, 'bucket', second, 'run-2', {'analysis': 'error-analysis/run-2.json'}) == 1
+    assert link_incident(s3, 'bucket', 's3://bucket/error-analysis/run-1.json', 'report', 's3://bucket/human-reports/r1.json') == 2
+    
+    index = load_index(s3, 'bucket')
+    signature = index.query(error_type='TimeoutError')[0]['signature']
+    # Masked numbers make both timeouts the same signature
+    assert [row['incident'] for row in index.occurrences(signature)] == ['run-1', 'run-2']
+    assert index.last_seen(signature)['last_seen'] == 9000
+    assert index.last_seen('never fired') is None
+    run_1 = index.query(signature=signature, until=2000)[0]
+    assert (run_1['count'], run_1['first_seen'], run_1['last_seen']) == (2, 1000, 1500)
+    assert run_1['keys'] == {'analysis': 'error-analysis/run-1.json', 'report': 'human-reports/r1.json'}
+    assert {row['source'] for row in index.query(since=1100, until=1300)} == {'iam', 'lambda'}
+    
+    # Re-recording an incident replaces its rows; a link to nothing writes nothing
+    writes = s3.writes
+    assert link_incident(s3, 'bucket', 's3://bucket/error-analysis/unknown.json', 'report', 'x') == 0
+    assert s3.writes == writes
+    record_incident(s3, 'bucket', first[:1], 'run-1', {'analysis': 'error-analysis/run-1.json'})
+    assert len(load_index(s3, 'bucket').rows) == 2
+    
+    # Incidents land in the shard of their analysis day; lookups stop at the retention window
+    today = datetime.utcnow()
+    for age, incident in [(1, 'run-old'), (RETENTION_DAYS, 'run-expired')]:
+        analysis_key = f"error-analysis/{(today - timedelta(days=age)).strftime('%Y/%m/%d')}/{incident}.json"
+        record_incident(s3, 'bucket', second, incident, {'analysis': analysis_key})
+        assert link_incident(s3, 'bucket', f's3://bucket/{analysis_key}', 'report', f'human-reports/{incident}.json') == 1
+        assert shard_key(analysis_key) in s3.objects and shard_key(analysis_key) != shard_key(None)
+    assert sorted(row['incident'] for row in load_index(s3, 'bucket').occurrences(signature)) == ['run-1', 'run-2', 'run-old']
+    
+    # A writer that loses the race to another stage reloads instead of dropping its rows
+    class RacingS3(FakeS3):
+        raced = False
+        def put_object(self, Bucket, Key, Body, **kwargs):
+            if Key == shard_key(None) and self.raced is False and Key in self.objects:
+                self.raced = True
+                super().put_object(Bucket, Key, self.objects[Key] + json.dumps(dict(
+                    second[0], signature='other', source='s3', error_type=None, count=1,
+                    first_seen=1, last_seen=1, incident='run-3', keys={})).encode('utf-8') + b'\n')
+            return super().put_object(Bucket, Key, Body, **kwargs)
+    
+    racing = RacingS3()
+    record_incident(racing, 'bucket', first, 'run-1', {})
+    record_incident(racing, 'bucket', second, 'run-2', {})
+    assert racing.raced
+    assert {row['incident'] for row in load_index(racing, 'bucket').rows} == {'run-1', 'run-2', 'run-3'}
+    
+    print(f"✅ Incident Index Success!")
+    print(f"   - {len(index.rows)} signature rows across 2 incidents in {len(s3.objects[shard_key(None)])} bytes")
+    return True
+
+def test_cooccurrence():
+    """Test that cascading failures across sources group into one root-cause cluster"""
+    print("\n🔍 Testing Co-occurrence Clustering...")
+    
+    # Each cascade: RDS refuses connections, the same request times out in Lambda,
+    # then API Gateway throttles; unrelated S3 denials land minutes later
+    start = 1698345600000
+    error_events = []
+    for n in range(20):
+        base = start + n * 600000
+        error_events += [
+            {'timestamp': base + 5000, 'source': 'apigateway', 'errorType': 'ThrottlingException', 'message': 'Rate exceeded'},
+            {'timestamp': base + 2000, 'source': 'lambda', 'errorType': 'TimeoutError', 'requestId': f"req-{n}", 'message': 'Task timed out'},
+            {'timestamp': base, 'source': 'rds', 'errorType': 'ConnectionError', 'requestId': f"req-{n}", 'message': 'Could not connect'},
+            {'timestamp': base + 300000, 'source': 's3', 'errorType': 'AccessDenied', 'message': 'Access denied'}
+        ]
+    
+    result = analyze_cooccurrence(error_events)
+    assert result == analyze_cooccurrence(EventBatch.from_dicts(error_events))
+    
+    cluster, = result['clusters']
+    assert cluster['root_cause'] == 'rds:ConnectionError'
+    assert cluster['members'] == ['rds:ConnectionError', 'lambda:TimeoutError', 'apigateway:ThrottlingException']
+    assert cluster['error_count'] == 60
+    
+    top = result['pairs'][0]
+    assert (top['leader'], top['follower']) == ('rds:ConnectionError', 'lambda:TimeoutError')
+    assert (top['window_count'], top['request_joins'], top['mean_lag_seconds']) == (20, 20, 2.0)
+    assert all('s3:AccessDenied' not in (p['leader'], p['follower']) for p in result['pairs'])
+    
+    # Independent failures interleaved with the cascades co-occur only as often as
+    # their rates predict, so they neither cluster nor join the cascade's cluster
+    rng = random.Random(7)
+    span = 20 * 600000
+    noise = [{'timestamp': start + rng.randrange(span), 'source': f"svc{rng.randrange(10)}",
+              'errorType': f"Error{rng.randrange(4)}", 'message': 'unrelated'} for _ in range(20000)]
+    assert analyze_cooccurrence(noise)['clusters'] == []
+    sparse = [event for event in noise if event['source'] in ('svc0', 'svc1') and event['errorType'] == 'Error0']
+    assert 0.8 < analyze_cooccurrence(sparse)['pairs'][0]['lift'] < 1.25 and not analyze_cooccurrence(sparse)['clusters']
+    mixed, = analyze_cooccurrence(error_events + sparse)['clusters']
+    assert mixed['members'] == cluster['members'] and mixed['root_cause'] == 'rds:ConnectionError'
+    assert top['lift'] > 5
+    
+    # Shrinking the window below the cascade's spread leaves only the requestId join
+    narrow = analyze_cooccurrence(error_events, window_seconds=1)
+    assert narrow['clusters'][0]['members'] == ['rds:ConnectionError', 'lambda:TimeoutError']
+    assert analyze_cooccurrence([]) == {'window_seconds': 60, 'pairs': [], 'clusters': []}
+    
+    print(f"✅ Co-occurrence Clustering Success!")
+    print(f"   - Root cause {cluster['root_cause']} leads {len(cluster['members']) - 1} correlated failures")
+    return True
+
+def test_synthetic_logs():
+    """Test that the benchmark log generator is deterministic and honours its options"""
+    print("\n🔍 Testing Synthetic Log Generator...")
+    
+    events = list(iter_log_events(5000, signatures=12, traceback_rate=0, seed=7))
+    assert events == list(iter_log_events(5000, signatures=12, traceback_rate=0, seed=7))
+    assert events != list(iter_log_events(5000, signatures=12, traceback_rate=0, seed=8))
+    assert [e['timestamp'] for e in events] == sorted(e['timestamp'] for e in events)
+    
+    failures = [e for e in events if 'errorType' in e]
+    assert 800 < len(failures) < 1200
+    assert len({signature_for_message(e['message']) for e in failures}) == 12
+    
+    # A mix restricted to one type produces only that type
+    timeouts = [e for e in iter_log_events(1000, mix={'TimeoutError': 1}) if 'errorType' in e]
+    assert {e['errorType'] for e in timeouts} == {'TimeoutError'}
+    
+    # The stages take the generated document as it is
+    aggregator = LogAggregator()
+    aggregator.consume(events)
+    assert aggregator.to_output('/aws/lambda/synthetic')['summary']['error_count'] == \
+        sum(e['logLevel'] == 'ERROR' for e in events)
+    
+    print(f"✅ Synthetic Log Generator Success!")
+    print(f"   - {len(failures)} failures over 12 signatures from 5000 events")
+    return True
+
+def test_instrumentation():
+    """Test that handlers print one EMF document per invocation, and nothing in no-op mode"""
+    print("\n🔍 Testing EMF Instrumentation...")
+    
+    s3 = FakeS3()
+    
+    @instrumentation.instrumented('test_stage')
+    def handler(event, context):
+        # Bytes are counted after encoding: 'é' is two bytes in UTF-8
+        put_objects(s3, 'bucket', [{'Key': f"k{i}", 'Body': 'x' * 8 + 'é'} for i in range(3)])
+        with instrumentation.timed('parse') as metric:
+            metric.items = len(event['events'])
+        return 'done'
+    
+    def invoke():
+        out = io.StringIO()
+        with redirect_stdout(out):
+            assert handler({'events': [1, 2, 3, 4]}, MockContext()) == 'done'
+        return [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{')]
+    
+    instrumentation.set_enabled(True)
+    try:
+        document, = invoke()
+    finally:
+        instrumentation.set_enabled(False)
+    
+    directive, = document['_aws']['CloudWatchMetrics']
+    assert directive['Namespace'] == 'DevAngel' and directive['Dimensions'] == [['Stage']]
+    assert document['Stage'] == 'test_stage'
+    assert {m['Name'] for m in directive['Metrics']} <= set(document)
+    assert document['s3.put_object.calls'] == 3 and document['s3.put_object.bytes'] == 30
+    assert len(document['s3.put_object.duration']) == 3
+    assert document['parse.items'] == 4 and document['handler.calls'] == 1
+    assert {m['Unit'] for m in directive['Metrics'] if m['Name'] == 'handler.duration'} == {'Milliseconds'}
+    
+    # Local runs stay quiet
+    assert invoke() == []
+    
+    print(f"✅ EMF Instrumentation Success!")
+    print(f"   - {len(directive['Metrics'])} metrics in one EMF document")
+    return True
+
+def test_summarizer_fanout():
+    """Test that exemplar summaries run concurrently, stay in order and time out one by one"""
+    print("\n🔍 Testing Concurrent Bedrock Fan-out...")
+    
+    exemplars = [{'message': f"ERROR exemplar-{name} database unavailable"} for name in 'abcd']
+    exemplars.insert(2, {'message': 'ERROR exemplar-slow Task timed out'})
+    event = {
+        'source_adapter_output': {'series': [], 'exemplars': exemplars, 'file_hits': {}, 'deploy': {'sha': 'abc123'}},
+        'error_analyzer_output': {'basic_stats': {'total_errors': 5}},
+        'batch_exemplars': False
+    }
+    
+    def respond(prompt):
+        if 'INCIDENT ANALYSIS REQUEST' in prompt:
+            return 0.2, 'incident report'
+        name = re.search(r'exemplar-\w+', prompt).group()
+        return (1.5 if name == 'exemplar-slow' else 0.2), f"summary of {name}"
+    
+    original = (error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.EXEMPLAR_TIMEOUT, error_summarizer.RESPONSE_CACHE)
+    error_summarizer.bedrock = error_summarizer.exemplar_bedrock = StubBedrock(respond)
+    error_summarizer.s3 = FakeS3()
+    error_summarizer.EXEMPLAR_TIMEOUT = 0.6
+    error_summarizer.RESPONSE_CACHE = ResponseCache()
+    try:
+        started = time.perf_counter()
+        result = error_summarizer.lambda_handler(event, MockContext())
+        elapsed = time.perf_counter() - started
+        max_in_flight = error_summarizer.bedrock.max_in_flight
+    finally:
+        error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.EXEMPLAR_TIMEOUT, error_summarizer.RESPONSE_CACHE = original
+    
+    # The detailed call and all five exemplar calls were underway together
+    assert max_in_flight == 6, max_in_flight
+    assert result['detailed_analysis'] == 'incident report'
+    summaries = result['error_summaries']
+    assert len(summaries) == 5
+    assert summaries[:2] + summaries[3:] == [f"summary of exemplar-{name}" for name in 'abcd']
+    assert summaries[2] == error_summarizer.create_contextual_fallback(
+        exemplars[2]['message'], {'sha': 'abc123'}, result['timeline_analysis']
+    )
+    
+    print(f"✅ Concurrent Bedrock Fan-out Success!")
+    print(f"   - {max_in_flight} concurrent calls in {elapsed:.2f}s, 1 exemplar fell back after its deadline")
+    return True
+
+def test_summarizer_batching():
+    """Test that exemplars share one structured call and only invalid entries are retried"""
+    print("\n🔍 Testing Batched Exemplar Summaries...")
+    
+    parse = error_summarizer.parse_batched_summaries
+    assert parse('Here you go:\n```json\n[{"index": 2, "summary": " b "}, {"index": 1, "summary": "a"}]\n```', 3) == ['a', 'b', None]
+    assert parse('[{"index": 1, "summary": "first"}, {"index": 1, "summary": "second"}]', 1) == ['first']
+    assert parse('[{"index": true, "summary": "x"}, {"index": 3, "summary": "x"}, {"index": 1, "summary": ""}]', 2) == [None, None]
+    assert parse('{"index": 1, "summary": "x"}', 1) == [None]
+    assert parse('[not json]', 2) == [None, None]
+    
+    exemplars = [{'message': f"ERROR exemplar-{name} failed"} for name in 'abcde']
+    event = {
+        'source_adapter_output': {'series': [], 'exemplars': exemplars, 'file_hits': {}, 'deploy': {'sha': 'abc123'}},
+        'error_analyzer_output': {'basic_stats': {'total_errors': 5}}
+    }
+    prompts = []
+    
+    def respond(prompt):
+        prompts.append(prompt)
+        if 'INCIDENT ANALYSIS REQUEST' in prompt:
+            return 0, 'incident report'
+        if 'ERRORS:' in prompt:
+            # Entry 4 comes back empty, so only that exemplar is asked again
+            entries = [{'index': i + 1, 'summary': '' if i == 3 else f"batched exemplar-{name}"} for i, name in enumerate('abcde')]
+            return 0, json.dumps(entries)
+        return 0, 'single ' + re.search(r'exemplar-\w+', prompt).group()
+    
+    original = (error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.RESPONSE_CACHE)
+    error_summarizer.bedrock = error_summarizer.exemplar_bedrock = StubBedrock(respond)
+    error_summarizer.s3 = FakeS3()
+    error_summarizer.RESPONSE_CACHE = ResponseCache()
+    try:
+        result = error_summarizer.lambda_handler(event, MockContext())
+        calls = error_summarizer.bedrock.calls
+    finally:
+        error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.RESPONSE_CACHE = original
+    
+    assert calls == 3
+    assert result['error_summaries'] == ['batched exemplar-a', 'batched exemplar-b', 'batched exemplar-c',
+                                         'single exemplar-d', 'batched exemplar-e']
+    batched, = [p for p in prompts if 'ERRORS:' in p]
+    assert batched.count('DEPLOYMENT CONTEXT') == 1 and all(f"[{i}] ERROR exemplar" in batched for i in range(1, 6))
+    
+    print(f"✅ Batched Exemplar Summaries Success!")
+    print(f"   - 5 exemplars in {calls - 1} Bedrock calls instead of 5")
+    return True
+
+def test_llm_cache():
+    """Test that recurring incidents are answered from the response cache"""
+    print("\n🔍 Testing LLM Response Cache...")
+    
+    s3 = FakeS3()
+    cache = ResponseCache(s3, 'bucket')
+    generated = []
+    
+    def generate(text):
+        def call():
+            generated.append(text)
+            return text
+        return call
+    
+    assert cache.complete('model', 'prompt', generate('first')) == 'first'
+    assert cache.complete('model', 'prompt', generate('second')) == 'first'
+    assert cache.complete('other-model', 'prompt', generate('third')) == 'third'
+    
+    # A cold container finds the response in S3
+    cold = ResponseCache(s3, 'bucket')
+    assert cold.complete('model', 'prompt', generate('fourth')) == 'first'
+    assert cold.cache_stats()['s3_hit'] == 1 and generated == ['first', 'third']
+    stored = json.loads(s3.objects[f"llm-cache/{cache.key('model', 'prompt')}.json"])
+    assert stored['text'] == 'first' and stored['expires_at'] > time.time()
+    
+    # Expired, rejected and failed responses are not served
+    ResponseCache(s3, 'bucket', ttl_seconds=-1).complete('model', 'stale', generate('old'))
+    assert ResponseCache(s3, 'bucket').complete('model', 'stale', generate('new')) == 'new'
+    assert cache.complete('model', 'bad', generate('junk'), accept=lambda text: False) == 'junk'
+    assert cache.complete('model', 'bad', generate('good')) == 'good'
+    try:
+        cache.complete('model', 'failing', lambda: 1 / 0)
+        assert False, 'generate errors must reach the caller'
+    except ZeroDivisionError:
+        pass
+    
+    # Least recently used entries are evicted first
+    small = ResponseCache(max_entries=2)
+    for prompt in ('a', 'b', 'a', 'c'):
+        small.complete('model', prompt, generate(prompt))
+    assert list(small.entries) == [small.key('model', 'a'), small.key('model', 'c')]
+    
+    # The same failure recurring with new timestamps, request IDs and numbers reuses the summary
+    prompts = []
+    def respond(prompt):
+        prompts.append(prompt)
+        return 0, 'cached exemplar summary'
+    
+    timelines = [{'correlation': 'high', 'error_spike_timestamp': f"2023-10-26T12:0{i}", 'peak_error_count': 40 + i}
+                 for i in range(3)]
+    original = (error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.RESPONSE_CACHE)
+    error_summarizer.bedrock = error_summarizer.exemplar_bedrock = StubBedrock(respond)
+    error_summarizer.RESPONSE_CACHE = ResponseCache(FakeS3(), 'bucket')
+    try:
+        summaries = [
+            error_summarizer.generate_contextual_error_summary(
+                f"2023-10-26T12:0{i}:00.000Z ERROR [RequestId: req-{i}] Timed out after {30 + i} seconds",
+                {'sha': 'abc123'}, timelines[i], {}
+            )
+            for i in range(3)
+        ]
+        calls = error_summarizer.bedrock.calls
+        stats = error_summarizer.RESPONSE_CACHE.cache_stats()
+        # The detailed report quotes the incident's own spike, so every incident gets its own call
+        for timeline in timelines[:2]:
+            error_summarizer.generate_detailed_summary([], [], {}, {'sha': 'abc123'}, {}, timeline)
+        detailed_calls = error_summarizer.bedrock.calls - calls
+    finally:
+        error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.RESPONSE_CACHE = original
+    assert summaries == ['cached exemplar summary'] * 3 and calls == 1
+    assert stats['memory_hit'] == 2 and stats['miss'] == 1 and stats['hit_rate'] == 0.667
+    # A cached exemplar summary cannot quote the spike of the incident it was generated for
+    assert 'peak' not in prompts[0].lower() and '2023-10-26T12:00' not in prompts[0].split('DEPLOYMENT CONTEXT')[1]
+    assert detailed_calls == 2 and '41 errors at 2023-10-26T12:01' in prompts[-1]
+    
+    print(f"✅ LLM Response Cache Success!")
+    print(f"   - 3 recurring exemplars answered with 1 model call")
+    return True
+
+def test_streaming_summary():
+    """Test that the detailed summary streams into a bounded partial the dashboard serves"""
+    print("\n🔍 Testing Streaming Summary...")
+    
+    text = 'Deploy abc123 introduced a connection leak in the order service. ' * 8
+    assert ''.join(iter_text_deltas({'body': iter(stream_events(text))})) == text
+    try:
+        list(iter_text_deltas({'body': iter([{'throttlingException': {'message': 'slow down'}}])}))
+        assert False, 'stream errors must be raised'
+    except RuntimeError:
+        pass
+    
+    # One delta per 0.1 s of a 1 s interval: about one write per ten deltas, plus the final one
+    s3, now = FakeS3(), [0.0]
+    writer = PartialSummaryWriter(s3, 'bucket', 'incident-1', interval=1.0, clock=lambda: now[0])
+    for i in range(100):
+        now[0] += 0.1
+        writer.add('x')
+    writer.close()
+    assert 9 <= writer.flushes <= 11 and s3.writes == writer.flushes
+    partial = json.loads(s3.objects['incidents/incident-1-partial.json'])
+    assert partial['status'] == 'complete' and partial['executive_summary'] == 'x' * 100
+    
+    # The handler streams the detailed summary under the incident ID the state machine gives it
+    event = {
+        'source_adapter_output': {'series': [], 'exemplars': [{'message': 'ERROR pool exhausted'}],
+                                  'file_hits': {}, 'deploy': {'sha': 'abc123'}},
+        'error_analyzer_output': {'basic_stats': {'total_errors': 1}},
+        'incident_id': 'incident-stream',
+        'stream_summary': True
+    }
+    
+    def respond(prompt):
+        return 0, text if 'INCIDENT ANALYSIS REQUEST' in prompt else 'exemplar summary'
+    
+    s3 = FakeS3()
+    original = (error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.RESPONSE_CACHE)
+    error_summarizer.bedrock = error_summarizer.exemplar_bedrock = StubBedrock(respond)
+    error_summarizer.s3 = s3
+    error_summarizer.RESPONSE_CACHE = ResponseCache()
+    try:
+        result = error_summarizer.lambda_handler(event, MockContext())
+        # Streaming is opt-in: a plain call writes nothing
+        unstreamed = FakeS3()
+        error_summarizer.s3 = unstreamed
+        error_summarizer.lambda_handler(dict(event, stream_summary=False), MockContext())
+    finally:
+        error_summarizer.bedrock, error_summarizer.exemplar_bedrock, error_summarizer.s3, error_summarizer.RESPONSE_CACHE = original
+    assert result['detailed_analysis'] == text.strip()
+    partial = json.loads(s3.objects['incidents/incident-stream-partial.json'])
+    assert partial['status'] == 'complete' and partial['executive_summary'] == text
+    assert unstreamed.writes == 0
+    
+    # An initial update shows its own incident's streamed text until the enhanced update replaces it
+    initial = {'incident_id': 'incident-stream', 'timestamp': '2000-01-01T00:00:00', 'update_type': 'initial',
+               'analysis': {'status': 'Processing AI analysis...',
+                            'executive_summary': 'Incident detected. AI analysis in progress...'}}
+    s3.put_object(Bucket='bucket', Key='latest-incident.json', Body=json.dumps(initial))
+    original = dashboard_api.s3
+    dashboard_api.s3 = s3
+    try:
+        latest = json.loads(dashboard_api.lambda_handler({'httpMethod': 'GET'}, MockContext())['body'])['data']
+        by_id = dashboard_api.lambda_handler(
+            {'httpMethod': 'GET', 'queryStringParameters': {'partial': 'incident-stream'}}, MockContext()
+        )
+        missing = dashboard_api.lambda_handler(
+            {'httpMethod': 'GET', 'queryStringParameters': {'partial': 'incident-none'}}, MockContext()
+        )
+        s3.put_object(Bucket='bucket', Key='latest-incident.json', Body=json.dumps(dict(initial, incident_id='incident-next')))
+        other = json.loads(dashboard_api.lambda_handler({'httpMethod': 'GET'}, MockContext())['body'])['data']
+        s3.put_object(Bucket='bucket', Key='latest-incident.json', Body=json.dumps(dict(initial, update_type='enhanced')))
+        enhanced = json.loads(dashboard_api.lambda_handler({'httpMethod': 'GET'}, MockContext())['body'])['data']
+    finally:
+        dashboard_api.s3 = original
+    assert latest['analysis']['executive_summary'] == text and latest['analysis']['partial']
+    assert json.loads(by_id['body'])['data']['executive_summary'] == text and missing['statusCode'] == 404
+    assert other['analysis']['executive_summary'] == initial['analysis']['executive_summary']
+    assert enhanced['analysis']['executive_summary'] == initial['analysis']['executive_summary']
+    
+    print(f"✅ Streaming Summary Success!")
+    print(f"   - 100 deltas written in {writer.flushes} partial flushes")
+    return True
+
 def test_error_analyzer(source_output):
     """Test the error analyzer with source adapter output"""
     print("\n🔍 Testing Error Analyzer...")
@@ -78,6 +1202,31 @@ def test_pipeline():
         print("❌ Pipeline failed at Source Adapter")
         return False
     
+    if not test_log_aggregator():
+        print("❌ Pipeline failed at Log Aggregator")
+        return False
+    
+    test_template_miner()
+    test_raw_log_writer()
+    test_cloudwatch_ingest()
+    test_checkpointed_runs()
+    test_event_batch()
+    test_input_adapters()
+    test_archive_reader()
+    test_timing_analysis()
+    test_anomaly_detector()
+    test_rule_engine()
+    test_claim_check()
+    test_s3_writer()
+    test_incident_index()
+    test_cooccurrence()
+    test_synthetic_logs()
+    test_instrumentation()
+    test_summarizer_fanout()
+    test_summarizer_batching()
+    test_llm_cache()
+    test_streaming_summary()
+    
     # Step 2: Test Error Analyzer
     analyzer_result = test_error_analyzer(source_result)
     if not analyzer_result: